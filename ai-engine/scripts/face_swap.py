@@ -20,6 +20,19 @@ except ImportError:
 face_app = None
 face_swapper = None
 
+# Same settings (and defaults) as the backend's app/services/face_engine.py;
+# this script runs in the separately deployed ai-engine, so it reads the env directly
+FACE_PROVIDERS = [
+    p.strip() for p in os.getenv('FACE_PROVIDERS', 'CPUExecutionProvider').split(',') if p.strip()
+]
+FACE_DET_SIZE = int(os.getenv('FACE_DET_SIZE', '640'))
+INSWAPPER_PATH = os.getenv('INSWAPPER_PATH') or os.path.join(
+    os.path.expanduser('~'),
+    '.insightface',
+    'models',
+    'inswapper_128.onnx'
+)
+
 
 def get_face_app():
     """Initialize face analyzer (downloads model on first run)"""
@@ -28,9 +41,9 @@ def get_face_app():
         print("Loading face detection model...", file=sys.stderr)
         face_app = FaceAnalysis(
             name='buffalo_l',
-            providers=['CPUExecutionProvider']
+            providers=FACE_PROVIDERS
         )
-        face_app.prepare(ctx_id=0, det_size=(640, 640))
+        face_app.prepare(ctx_id=0, det_size=(FACE_DET_SIZE, FACE_DET_SIZE))
         print("Face detection model loaded!", file=sys.stderr)
     return face_app
 
@@ -41,12 +54,7 @@ def get_face_swapper():
     if face_swapper is not None:
         return face_swapper
 
-    model_path = os.path.join(
-        os.path.expanduser('~'),
-        '.insightface',
-        'models',
-        'inswapper_128.onnx'
-    )
+    model_path = INSWAPPER_PATH
 
     if not os.path.exists(model_path):
         print(json.dumps({
@@ -58,7 +66,7 @@ def get_face_swapper():
     print("Loading face swap model...", file=sys.stderr)
     face_swapper = insightface.model_zoo.get_model(
         model_path,
-        providers=['CPUExecutionProvider']
+        providers=FACE_PROVIDERS
     )
     print("Face swap model loaded!", file=sys.stderr)
     return face_swapper
@@ -6,4 +6,78 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
 FAL_KEY = os.getenv("FAL_KEY")
-MONGO_URI = os.getenv("MONGO_URI")
\ No newline at end of file
+MONGO_URI = os.getenv("MONGO_URI")
+
+# Number of detected child faces kept in memory, keyed by photo content hash
+SOURCE_FACE_CACHE_SIZE = int(os.getenv("SOURCE_FACE_CACHE_SIZE", "256"))
+
+# Pages of one personalized book rendered concurrently (onnxruntime releases the GIL)
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Job queue / worker (see worker.py)
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+
+# inswapper micro-batching (SWAP_BATCH_SIZE=1 disables it)
+SWAP_BATCH_SIZE = int(os.getenv("SWAP_BATCH_SIZE", "8"))
+SWAP_BATCH_MAX_WAIT_MS = float(os.getenv("SWAP_BATCH_MAX_WAIT_MS", "15"))
+
+# Content-addressed cache of swapped pages (generated_images/swaps)
+SWAP_CACHE_MAX_MB = int(os.getenv("SWAP_CACHE_MAX_MB", "2048"))
+
+# NVIDIA SDXL image endpoint (point SDXL_INVOKE_URL at scripts/mock_sdxl_server.py for local runs)
+SDXL_INVOKE_URL = os.getenv("SDXL_INVOKE_URL", "https://ai.api.nvidia.com/v1/genai/stabilityai/stable-diffusion-xl")
+SDXL_TIMEOUT_SECONDS = float(os.getenv("SDXL_TIMEOUT_SECONDS", "30"))
+SDXL_CONCURRENCY = int(os.getenv("SDXL_CONCURRENCY", "4"))
+SDXL_RATE_PER_SEC = float(os.getenv("SDXL_RATE_PER_SEC", "2"))
+SDXL_MAX_RETRIES = int(os.getenv("SDXL_MAX_RETRIES", "3"))
+
+# Prompt → image cache for SDXL (same URL + payload → same image, see _seed_from_prompt)
+SDXL_CACHE_DISABLED = os.getenv("SDXL_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+SDXL_CACHE_MAX_MB = int(os.getenv("SDXL_CACHE_MAX_MB", "4096"))
+SDXL_CACHE_TTL_HOURS = float(os.getenv("SDXL_CACHE_TTL_HOURS", "720"))
+
+# edge-tts narrations synthesized at once per book
+NARRATION_CONCURRENCY = int(os.getenv("NARRATION_CONCURRENCY", "4"))
+
+# Content-addressed narration store (generated_audio/narration)
+NARRATION_CACHE_MAX_MB = int(os.getenv("NARRATION_CACHE_MAX_MB", "1024"))
+
+# PDF page images: "screen" (150 dpi) or "print" (300 dpi); PDF_IMAGE_DPI overrides the profile
+PDF_IMAGE_PROFILE = os.getenv("PDF_IMAGE_PROFILE", "screen")
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "300" if PDF_IMAGE_PROFILE == "print" else "150"))
+PDF_JPEG_QUALITY = int(os.getenv("PDF_JPEG_QUALITY", "85"))
+PDF_IMAGE_CACHE_MAX_MB = int(os.getenv("PDF_IMAGE_CACHE_MAX_MB", "1024"))
+
+# Cached single-page PDF fragments (generated_pdfs/pages) merged into books
+PDF_PAGE_CACHE_MAX_MB = int(os.getenv("PDF_PAGE_CACHE_MAX_MB", "2048"))
+
+# /face-swap template downloads: shared pooled client, per-request timeout, size cap, ETag cache
+TEMPLATE_FETCH_CONCURRENCY = int(os.getenv("TEMPLATE_FETCH_CONCURRENCY", "8"))
+TEMPLATE_FETCH_TIMEOUT_SECONDS = float(os.getenv("TEMPLATE_FETCH_TIMEOUT_SECONDS", "15"))
+TEMPLATE_FETCH_MAX_MB = float(os.getenv("TEMPLATE_FETCH_MAX_MB", "20"))
+TEMPLATE_CACHE_MAX_MB = int(os.getenv("TEMPLATE_CACHE_MAX_MB", "1024"))
+
+# Face detection / swap work from API routes: worker threads and max queued + running tasks
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "64"))
+
+# Shared InsightFace engine (app/services/face_engine.py): ONNX providers in priority order,
+# detector input size, inswapper_128 path (default: backend/models, then ~/.insightface/models)
+FACE_PROVIDERS = [p.strip() for p in os.getenv("FACE_PROVIDERS", "CPUExecutionProvider").split(",") if p.strip()]
+FACE_DET_SIZE = int(os.getenv("FACE_DET_SIZE", "640"))
+INSWAPPER_PATH = os.getenv("INSWAPPER_PATH", "")
+FACE_ENGINE_WARMUP = os.getenv("FACE_ENGINE_WARMUP", "1").lower() in ("1", "true", "yes")
+
+# onnxruntime sessions of the face engine. 0 threads = onnxruntime default (all physical cores),
+# so set ORT_INTRA_OP_THREADS to cores / concurrent swaps to avoid oversubscription.
+# Graph optimization: disable | basic | extended | all
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "0"))
+ORT_GRAPH_OPTIMIZATION = os.getenv("ORT_GRAPH_OPTIMIZATION", "all").lower()
+ORT_CPU_MEM_ARENA = os.getenv("ORT_CPU_MEM_ARENA", "1").lower() in ("1", "true", "yes")
+
+# Face model weights: fp32 (original) | int8 | fp16 (variants written by scripts/quantize_models.py)
+FACE_MODEL_VARIANT = os.getenv("FACE_MODEL_VARIANT", "fp32").lower()
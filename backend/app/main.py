@@ -1,11 +1,53 @@
-from fastapi import FastAPI
-from app.routes import upload, story, generate_book, pdf, book, personalized_book, face_swap
+from contextlib import asynccontextmanager
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.routes import upload, story, generate_book, pdf, book, personalized_book, face_swap, narration
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 from pathlib import Path
+from app.services.db import ensure_indexes
+from app.services.job_queue import ensure_job_indexes
+from app.services.template_service import register_template_versions
+from app.config import FACE_ENGINE_WARMUP
+from app.services import face_engine, template_fetcher
+from app.services.inference_executor import InferenceQueueFull, inference_executor
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        ensure_indexes()
+        ensure_job_indexes()
+    except Exception as e:
+        print(f"[Startup] Could not create MongoDB indexes: {e}")
+    try:
+        # Orders reference template versions; keep this one resolvable after edits
+        register_template_versions()
+    except Exception as e:
+        print(f"[Startup] Could not snapshot template versions: {e}")
+    if FACE_ENGINE_WARMUP:
+        # Load the face models before serving, so no request pays the cold start
+        try:
+            print(f"[Startup] Face engine warm: {await asyncio.to_thread(face_engine.warm_up)}")
+        except Exception as e:
+            print(f"[Startup] Face engine warm-up failed: {e}")
+    yield
+    await template_fetcher.close_client()
+    inference_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full(request: Request, exc: InferenceQueueFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Face engine is busy, please retry shortly", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # Ensure folders exist
 os.makedirs("generated_images", exist_ok=True)
@@ -24,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Narration-Key", "Retry-After"],
 )
 
 # Routes
@@ -35,11 +78,14 @@ app.include_router(pdf.router)
 app.include_router(book.router)
 app.include_router(personalized_book.router)
 app.include_router(face_swap.router)
+app.include_router(narration.router)
 
 # Static Files
 app.mount("/generated_images", StaticFiles(directory="generated_images"), name="generated_images")
 app.mount("/generated_pdfs", StaticFiles(directory="generated_pdfs"), name="generated_pdfs")
 app.mount("/generated_audio", StaticFiles(directory="generated_audio"), name="generated_audio")
+# /face-swap job output (app/static/generated/<job_id>/swapped-N.png); created by the face_swap router
+app.mount("/static", StaticFiles(directory="app/static"), name="static")
 defaults_dir = Path(__file__).resolve().parents[2] / "frontend" / "public" / "defaults"
 if defaults_dir.exists():
     app.mount("/defaults", StaticFiles(directory=str(defaults_dir)), name="defaults")
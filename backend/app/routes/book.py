@@ -1,6 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+import base64
+import json
 from app.services.db import db
+from app.services.template_service import TemplateVersionMissing, resolve_order_story
 
 router = APIRouter()
 
@@ -11,8 +16,13 @@ def get_book(order_id: str):
     if not order:
         return {"error": "Book not found"}
 
+    try:
+        story = resolve_order_story(order)
+    except TemplateVersionMissing as e:
+        return {"error": str(e)}
+
     # Use story title if available, otherwise order title, otherwise default
-    title = order.get("story", {}).get("title") or order.get("title") or "My Magical Story"
+    title = story.get("title") or order.get("title") or "My Magical Story"
 
     generated_pages = order.get("generated_pages", [])
 
@@ -27,7 +37,7 @@ def get_book(order_id: str):
             })
     else:
         # Fallback to template pages if no generation done yet
-        for pg in order.get("story", {}).get("pages", []):
+        for pg in story.get("pages", []):
             final_pages.append({
                 "page_number": pg.get("page_number"),
                 "text": pg.get("text"),
@@ -52,14 +62,72 @@ def get_book(order_id: str):
     }
 
 
+BOOKS_PAGE_SIZE = 24
+BOOKS_MAX_PAGE_SIZE = 100
+
+# Only what a library card needs (no page texts / image prompts)
+BOOK_LISTING_PROJECTION = {
+    "title": 1,
+    "story.title": 1,
+    "story_overrides.title": 1,
+    "template_version": 1,
+    "status": 1,
+    "created_at": 1,
+    "template_id": 1,
+    "cover_image": 1,
+    "generated_pages": {"$slice": 1},
+}
+
+
+def _encode_cursor(order):
+    created_at = order.get("created_at")
+    data = {"c": created_at.isoformat() if created_at else None, "id": str(order["_id"])}
+    return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = datetime.fromisoformat(data["c"]) if data["c"] else None
+        return created_at, ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/books")
-def get_all_books():
-    # Fetch all orders that have a story generated
-    orders = db.orders.find({"story": {"$ne": None}}).sort("created_at", -1)
+def get_all_books(limit: int = Query(BOOKS_PAGE_SIZE, ge=1, le=BOOKS_MAX_PAGE_SIZE), cursor: str | None = None):
+    """
+    Newest books first, one page at a time. Pass the returned next_cursor
+    to get the following page; it is null on the last page.
+    """
+    # Free-form orders carry a generated story; template orders reference their template
+    filters = [{"$or": [{"story": {"$ne": None}}, {"template_id": {"$ne": None}}]}]
+    if cursor:
+        # Keyset pagination: everything strictly after the last (created_at, _id) seen
+        created_at, last_id = _decode_cursor(cursor)
+        filters.append({"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+            {"created_at": None},  # undated orders sort last
+        ] if created_at else [
+            {"created_at": None, "_id": {"$lt": last_id}},
+        ]})
+
+    orders = list(
+        db.orders.find({"$and": filters}, BOOK_LISTING_PROJECTION)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    has_more = len(orders) > limit
+    orders = orders[:limit]
 
     books_list = []
     for order in orders:
-        title = order.get("story", {}).get("title") or order.get("title") or "My Magical Story"
+        try:
+            story_title = resolve_order_story(order).get("title")
+        except TemplateVersionMissing:
+            story_title = None
+        title = story_title or order.get("title") or "My Magical Story"
         template_id = order.get("template_id")
 
         # Determine cover image: personalized cover or default template page-1
@@ -81,7 +149,10 @@ def get_all_books():
             "cover_image": cover_image,
         })
 
-    return books_list
+    return {
+        "books": books_list,
+        "next_cursor": _encode_cursor(orders[-1]) if has_more else None
+    }
 
 
 
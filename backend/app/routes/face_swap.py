@@ -1,10 +1,16 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from app.services.face_swap_service import swap_face_batch
+from fastapi.responses import StreamingResponse
+from app.services import face_engine
+from app.services.face_swap_service import detect_source_face, swap_target
+from app.services.inference_executor import InferenceQueueFull, inference_executor
+from app.services.template_fetcher import fetch_templates
+from contextlib import aclosing
+import asyncio
 import json
 import os
+import time
 import uuid
 import shutil
-import requests
 
 router = APIRouter(prefix="/face-swap")
 
@@ -15,85 +21,244 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
+def _parse_template_urls(template_urls):
+    try:
+        urls_list = json.loads(template_urls)
+        if not isinstance(urls_list, list) or not all(isinstance(url, str) for url in urls_list):
+            raise ValueError
+    except (json.JSONDecodeError, ValueError):
+        raise HTTPException(
+            status_code=400,
+            detail="template_urls must be a valid JSON array of strings"
+        )
+
+    if not urls_list:
+        raise HTTPException(
+            status_code=400,
+            detail="template_urls cannot be empty"
+        )
+    return urls_list
+
+
+async def _create_job(baby_image):
+    """Creates the job folders and saves the child photo; returns (job_id, input dir, output dir, photo path)."""
+    job_id = str(uuid.uuid4())
+    job_input_dir = os.path.join(UPLOAD_DIR, job_id)
+    job_output_dir = os.path.join(OUTPUT_DIR, job_id)
+
+    os.makedirs(job_input_dir, exist_ok=True)
+    os.makedirs(job_output_dir, exist_ok=True)
+
+    # Save baby image locally
+    baby_path = os.path.join(job_input_dir, "child.jpg")
+    with open(baby_path, "wb") as f:
+        f.write(await baby_image.read())
+
+    return job_id, job_input_dir, job_output_dir, baby_path
+
+
+def _output_url(job_id, page):
+    # app/static is mounted at /static (see main.py)
+    return f"/static/generated/{job_id}/swapped-{page}.png"
+
+
+async def _swap_pages(admission, source_task, urls_list, job_id, job_input_dir, job_output_dir):
+    """
+    Downloads the templates and yields each page's result as soon as its swap
+    is written. Each page is swapped as soon as its template arrives, on
+    `admission`'s reserved capacity.
+    """
+    done = asyncio.Queue()
+    swap_tasks = []
+    started = time.perf_counter()
+
+    async def swap_page(index, cached_path):
+        page = index + 1
+        template_path = os.path.join(job_input_dir, f"template-{page}.png")
+        output_path = os.path.join(job_output_dir, f"swapped-{page}.png")
+        page_started = time.perf_counter()
+        try:
+            await asyncio.to_thread(shutil.copyfile, cached_path, template_path)
+            source_face, source_error = await source_task
+            if source_face is None:
+                result = {"page": page, "success": False, "error": source_error}
+            else:
+                result = await admission.run(swap_target, source_face, template_path, output_path, page)
+        except Exception as e:
+            result = {"page": page, "success": False, "error": str(e)}
+        if result.get("success"):
+            result["image_url"] = _output_url(job_id, page)
+        now = time.perf_counter()
+        result["seconds"] = round(now - page_started, 3)  # this page, from template arrival
+        result["elapsed"] = round(now - started, 3)  # since the request started swapping
+        await done.put(result)
+
+    async def download_all():
+        try:
+            async for index, cached_path, error in fetch_templates(urls_list):
+                if cached_path is None:
+                    print(f"Template download failed: {error}")
+                    continue
+                swap_tasks.append(asyncio.create_task(swap_page(index, cached_path)))
+        finally:
+            await done.put(None)  # no more swaps will be started
+
+    downloader = asyncio.create_task(download_all())
+    downloads_finished = False
+    emitted = 0
+    try:
+        while not downloads_finished or emitted < len(swap_tasks):
+            result = await done.get()
+            if result is None:
+                downloads_finished = True
+                continue
+            emitted += 1
+            yield result
+    finally:
+        downloader.cancel()
+        for task in swap_tasks:
+            task.cancel()
+
+    if not swap_tasks:
+        raise HTTPException(
+            status_code=400,
+            detail="No valid template images downloaded"
+        )
+
+
 @router.post("")
 async def face_swap(
     baby_image: UploadFile = File(...),
     template_urls: str = Form(...)
 ):
     try:
-        # Parse template URLs
-        try:
-            urls_list = json.loads(template_urls)
-            if not isinstance(urls_list, list):
-                raise ValueError
-        except (json.JSONDecodeError, ValueError):
-            raise HTTPException(
-                status_code=400,
-                detail="template_urls must be a valid JSON array of strings"
-            )
-
-        if not urls_list:
-            raise HTTPException(
-                status_code=400,
-                detail="template_urls cannot be empty"
-            )
-
-        # Create unique job folder
-        job_id = str(uuid.uuid4())
-        job_input_dir = os.path.join(UPLOAD_DIR, job_id)
-        job_output_dir = os.path.join(OUTPUT_DIR, job_id)
-
-        os.makedirs(job_input_dir, exist_ok=True)
-        os.makedirs(job_output_dir, exist_ok=True)
-
-        # Save baby image locally
-        baby_path = os.path.join(job_input_dir, "child.jpg")
-        with open(baby_path, "wb") as f:
-            f.write(await baby_image.read())
-
-        # Download template images locally
-        local_template_paths = []
-
-        for i, url in enumerate(urls_list):
-            try:
-                response = requests.get(url)
-                if response.status_code != 200:
-                    continue
+        urls_list = _parse_template_urls(template_urls)
 
-                template_path = os.path.join(job_input_dir, f"template-{i+1}.png")
-                with open(template_path, "wb") as f:
-                    f.write(response.content)
+        # Room for the child-face detection plus one swap per page, or 503
+        with inference_executor.admit(len(urls_list) + 1) as admission:
+            job_id, job_input_dir, job_output_dir, baby_path = await _create_job(baby_image)
 
-                local_template_paths.append(template_path)
-
-            except Exception as e:
-                print(f"Template download failed: {e}")
-
-        if not local_template_paths:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid template images downloaded"
-            )
+            # Child face detection runs while the templates download
+            source_task = asyncio.create_task(admission.run(detect_source_face, baby_path))
+            try:
+                pages = _swap_pages(admission, source_task, urls_list, job_id, job_input_dir, job_output_dir)
+                async with aclosing(pages):
+                    results = [result async for result in pages]
+                source_face, source_error = await source_task
+            finally:
+                source_task.cancel()
 
-        # Call local swap engine
-        result = swap_face_batch(
-            source_path=baby_path,
-            target_paths=local_template_paths,
-            output_dir=job_output_dir
-        )
+            if source_face is None:
+                return {
+                    "success": False,
+                    "error": source_error
+                }
 
         return {
             "success": True,
             "job_id": job_id,
-            "results": result.get("results", [])
+            "results": sorted(results, key=lambda r: r["page"])
         }
 
-    except HTTPException as e:
-        raise e
+    except (HTTPException, InferenceQueueFull):
+        raise
 
     except Exception as e:
         print(f"Face swap endpoint error: {e}")
         return {
             "success": False,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@router.get("/engine")
+def face_engine_status():
+    """Model load / warm-up timings and executor occupancy."""
+    return {"engine": face_engine.stats(), "executor": inference_executor.stats()}
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that owns an inference admission: however the response
+    ends (finished, client gone before the first event, error) the body
+    generator is closed, which cancels its tasks, and the admission released.
+    The capacity comes back once the pool work already started has finished.
+    """
+
+    def __init__(self, content, admission, **kwargs):
+        super().__init__(content, **kwargs)
+        self.admission = admission
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()
+            finally:
+                self.admission.release()
+
+
+@router.post("/stream")
+async def face_swap_stream(
+    baby_image: UploadFile = File(...),
+    template_urls: str = Form(...)
+):
+    """
+    Same swap as POST /face-swap, as Server-Sent Events: `job` once, one `page`
+    event per template as soon as its swapped image is written (in completion
+    order), then `done` (or `error`).
+    """
+    urls_list = _parse_template_urls(template_urls)
+
+    # Admission happens before the response starts so a full queue is still a 503;
+    # from here on the response releases it
+    admission = inference_executor.reserve(len(urls_list) + 1)
+    try:
+        job_id, job_input_dir, job_output_dir, baby_path = await _create_job(baby_image)
+    except BaseException:
+        admission.release()
+        raise
+
+    async def events():
+        started = time.perf_counter()
+        source_task = asyncio.create_task(admission.run(detect_source_face, baby_path))
+        swapped = failed = 0
+        try:
+            yield _sse("job", {"job_id": job_id, "pages": len(urls_list)})
+            pages = _swap_pages(admission, source_task, urls_list, job_id, job_input_dir, job_output_dir)
+            async with aclosing(pages):
+                async for result in pages:
+                    if result.get("success"):
+                        swapped += 1
+                    else:
+                        failed += 1
+                    yield _sse("page", result)
+
+            source_face, source_error = await source_task
+            yield _sse("done", {
+                "success": source_face is not None,
+                "job_id": job_id,
+                "swapped": swapped,
+                "failed": failed,
+                "seconds": round(time.perf_counter() - started, 3),
+                **({"error": source_error} if source_face is None else {}),
+            })
+        except HTTPException as e:
+            yield _sse("error", {"job_id": job_id, "error": e.detail})
+        except Exception as e:
+            print(f"Face swap stream error: {e}")
+            yield _sse("error", {"job_id": job_id, "error": str(e)})
+        finally:
+            source_task.cancel()
+
+    return AdmittedStreamingResponse(
+        events(),
+        admission,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    )
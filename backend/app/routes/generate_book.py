@@ -1,38 +1,32 @@
 from fastapi import APIRouter, HTTPException
-import traceback
-from app.services.order_service import (
-    generate_story_for_order,
-    generate_full_book,
-    generate_pdf_for_order
-)
+from bson import ObjectId
+from bson.errors import InvalidId
+from datetime import datetime
+from app.services.db import db
+from app.services.job_queue import enqueue_job
 
 router = APIRouter()
 
-@router.post("/generate-book/{order_id}")
+@router.post("/generate-book/{order_id}", status_code=202)
 def generate_book(order_id: str):
+    """Queues story, image and PDF generation; a worker (worker.py) runs the pipeline."""
     try:
-        # Step 1: Generate story
-        story = generate_story_for_order(order_id)
-        if not story or not story.get("pages"):
-            raise HTTPException(status_code=400, detail="Story generation failed or returned empty pages")
+        oid = ObjectId(order_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid order ID")
 
-        # Step 2: Generate images for each page
-        images = generate_full_book(order_id)
-        # images can be an empty list - that's ok, PDF will still generate
+    if not db.orders.find_one({"_id": oid}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Order not found")
 
-        # Step 3: Generate PDF
-        pdf_url = generate_pdf_for_order(order_id)
-        if not pdf_url:
-            raise HTTPException(status_code=400, detail="PDF generation failed")
+    job_id = enqueue_job("book", {"order_id": order_id}, dedupe_key=f"book:{order_id}")
 
-        return {
-            "message": "Book generated successfully",
-            "pdf_url": pdf_url,
-            "pages_generated": len(images) if images else 0
-        }
+    db.orders.update_one(
+        {"_id": oid},
+        {"$set": {"status": "queued", "job_id": job_id, "updated_at": datetime.utcnow()}}
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
\ No newline at end of file
+    return {
+        "message": "Book generation queued",
+        "order_id": order_id,
+        "job_id": job_id
+    }
@@ -0,0 +1,106 @@
+import re
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.services.db import db
+from app.services.audio_service import (
+    DEFAULT_PITCH,
+    DEFAULT_RATE,
+    VOICES,
+    get_narration_marks,
+    narration_cache,
+    narration_key,
+    stream_shared,
+    synthesize_shared,
+)
+from app.services.template_service import TemplateVersionMissing, resolve_order_story
+
+router = APIRouter()
+
+# edge-tts prosody offsets; anything else is a 422 before synthesis or streaming starts
+RATE_PATTERN = r"^[+-]\d{1,3}%$"
+PITCH_PATTERN = r"^[+-]\d{1,3}Hz$"
+
+
+def _page_text(pages: list, page_number: int) -> str | None:
+    page = next((pg for pg in pages if pg.get("page_number") == page_number), None)
+    return page.get("text") if page else None
+
+
+def _page_narration(order_id: str, page_number: int, rate: str, pitch: str):
+    """(text, voice, key) of a generated page's narration."""
+    try:
+        oid = ObjectId(order_id)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid order ID")
+
+    order = db.orders.find_one({"_id": oid})
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    # Personalized pages store their text; free-form pages only store media,
+    # so their text comes from the order's story
+    text = _page_text(order.get("generated_pages", []), page_number)
+    if not text:
+        try:
+            text = _page_text(resolve_order_story(order).get("pages", []), page_number)
+        except TemplateVersionMissing as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if text:
+            text = re.sub(r"\[HERO\]", order.get("hero_name", "Hero"), text, flags=re.IGNORECASE)
+    if not text:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    voice = VOICES.get(order.get("language", "English"), VOICES["English"])
+    return text, voice, narration_key(text, voice, rate, pitch)
+
+
+@router.get("/narration/{order_id}/{page_number}/stream")
+async def stream_page_narration(
+    order_id: str,
+    page_number: int,
+    rate: str = Query(DEFAULT_RATE, pattern=RATE_PATTERN),
+    pitch: str = Query(DEFAULT_PITCH, pattern=PITCH_PATTERN),
+):
+    """
+    Page narration as audio/mpeg. Stored narrations are served from disk;
+    otherwise edge-tts chunks are streamed as they arrive and stored on the way
+    (or, if the narration is already being synthesized, sent once it is stored).
+    """
+    text, voice, key = _page_narration(order_id, page_number, rate, pitch)
+    headers = {"X-Narration-Key": key}
+
+    cached_path = narration_cache.lookup(key, ".mp3")
+    if cached_path:
+        return FileResponse(cached_path, media_type="audio/mpeg", headers=headers)
+
+    return StreamingResponse(
+        stream_shared(text, voice, rate, pitch, key),
+        media_type="audio/mpeg",
+        headers={**headers, "Cache-Control": "no-store"}
+    )
+
+
+@router.get("/narration/{order_id}/{page_number}/marks")
+async def get_page_narration_marks(
+    order_id: str,
+    page_number: int,
+    rate: str = Query(DEFAULT_RATE, pattern=RATE_PATTERN),
+    pitch: str = Query(DEFAULT_PITCH, pattern=PITCH_PATTERN),
+):
+    """Word-boundary timings ({text, start_ms, duration_ms}) for read-along highlighting."""
+    text, voice, key = _page_narration(order_id, page_number, rate, pitch)
+
+    marks = get_narration_marks(key)
+    if marks is None:
+        # Not synthesized yet (or stored before marks were recorded)
+        await synthesize_shared(text, voice, rate, pitch, key)
+        marks = get_narration_marks(key) or []
+
+    return {
+        "order_id": order_id,
+        "page_number": page_number,
+        "audio_url": narration_cache.url_for(key, ".mp3"),
+        "marks": marks
+    }
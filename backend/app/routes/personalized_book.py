@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
-from app.services.template_service import get_all_templates, get_template_by_id
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from app.services.template_service import get_all_templates, get_template_by_id, get_template_version
 from app.services.db import db
-from app.services.personalized_service import generate_full_personalized_book
+from app.services.job_queue import enqueue_job
+from app.services.image_service import get_source_face
+from app.services.face_cache import serialize_face
+from app.services.inference_executor import inference_executor
 from datetime import datetime
 from bson import ObjectId
 import os
@@ -23,23 +26,36 @@ async def create_personalized_order(
     if not template:
         raise HTTPException(status_code=404, detail="Template not found")
 
-    # Save child's photo
-    os.makedirs("uploads/faces", exist_ok=True)
-    ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    file_path = os.path.join("uploads/faces", filename)
-    
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    # Rejected with 503 before anything is saved when the face engine is saturated
+    with inference_executor.admit(1) as admission:
+        # Save child's photo
+        os.makedirs("uploads/faces", exist_ok=True)
+        ext = os.path.splitext(file.filename)[1]
+        filename = f"{uuid.uuid4()}{ext}"
+        file_path = os.path.join("uploads/faces", filename)
+
+        with open(file_path, "wb") as f:
+            content = await file.read()
+            f.write(content)
+
+        # Detect the child's face once; every page swap reuses it
+        source_face = None
+        try:
+            face, photo_hash = await admission.run(get_source_face, f"/uploads/faces/{filename}")
+            if face is not None:
+                source_face = serialize_face(face, photo_hash)
+        except Exception as e:
+            print(f"[PersonalizedBook] Source face detection failed: {e}")
 
     order = {
         "type": "personalized",
         "template_id": template_id,
         "hero_name": hero_name,
         "face_image_path": f"/uploads/faces/{filename}",
+        "source_face": source_face,
         "status": "face_uploaded",
-        "story": template, # Store a copy of the template in the order
+        # The story is resolved from the template registry (see resolve_order_story)
+        "template_version": get_template_version(template_id),
         "generated_pages": [],
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
@@ -49,9 +65,18 @@ async def create_personalized_order(
     return {"order_id": str(result.inserted_id)}
 
 @router.post("/generate/{order_id}")
-async def start_personalized_generation(order_id: str, background_tasks: BackgroundTasks):
-    background_tasks.add_task(generate_full_personalized_book, order_id)
-    return {"message": "Generation started in background", "order_id": order_id}
+async def start_personalized_generation(order_id: str):
+    # Only enqueue here; a worker process (worker.py) renders the book
+    job_id = enqueue_job(
+        "personalized_book",
+        {"order_id": order_id},
+        dedupe_key=f"personalized_book:{order_id}"
+    )
+    db.orders.update_one(
+        {"_id": ObjectId(order_id)},
+        {"$set": {"status": "queued", "job_id": job_id, "updated_at": datetime.utcnow()}}
+    )
+    return {"message": "Generation queued", "order_id": order_id, "job_id": job_id}
 
 @router.get("/status/{order_id}")
 async def get_order_status(order_id: str):
@@ -1,7 +1,15 @@
 import edge_tts
 import asyncio
+import json
 import os
+import threading
 import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+from app.config import NARRATION_CACHE_MAX_MB
+from app.services.content_store import ContentStore, content_key
+from app.services.order_media import order_media_urls
 
 # ── VOICE MAPPING ─────────────────────────────────────────────────────────────
 VOICES = {
@@ -10,23 +18,202 @@ VOICES = {
     "Hinglish": "hi-IN-SwararaNeural"
 }
 
-async def generate_audio(text: str, language: str = "English", output_dir: str = "generated_audio") -> str:
+DEFAULT_RATE = "+0%"
+DEFAULT_PITCH = "+0Hz"
+
+# ── NARRATION STORE ───────────────────────────────────────────────────────────
+# mp3s addressed by hash(text, voice, rate, pitch): identical narrations share one file
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+narration_cache = ContentStore(
+    "narration",
+    BACKEND_ROOT / "generated_audio" / "narration",
+    "/generated_audio/narration",
+    max_bytes=NARRATION_CACHE_MAX_MB * 1024 * 1024,
+    referenced_urls=order_media_urls
+)
+
+# In-flight syntheses by cache key, shared across threads/event loops
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def narration_key(text: str, voice: str, rate: str = DEFAULT_RATE, pitch: str = DEFAULT_PITCH) -> str:
+    return content_key(text, voice, rate, pitch)
+
+
+def _word_mark(chunk: dict) -> dict:
+    # edge-tts reports offsets/durations in 100 ns ticks
+    return {
+        "text": chunk["text"],
+        "start_ms": round(chunk["offset"] / 10_000),
+        "duration_ms": round(chunk["duration"] / 10_000),
+    }
+
+
+async def stream_narration(text: str, voice: str, rate: str, pitch: str, key: str, keep: bool = False):
+    """
+    Yields mp3 chunks as edge-tts produces them while teeing them into the
+    narration store. Word-boundary marks are stored next to the mp3 as <key>.json.
+    Nothing is committed if the stream is abandoned before synthesis finishes.
+    `keep` also writes the eviction-proof copy (ContentStore.keep).
+    """
+    tmp_path = narration_cache.temp_path(".mp3")
+    marks = []
+    try:
+        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch, boundary="WordBoundary")
+        with open(tmp_path, "wb") as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+                    yield chunk["data"]
+                elif chunk["type"] == "WordBoundary":
+                    marks.append(_word_mark(chunk))
+
+        narration_cache.put_bytes(key, ".json", json.dumps({"voice": voice, "marks": marks}).encode("utf-8"))
+        narration_cache.commit(key, ".mp3", tmp_path, keep=keep)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+async def synthesize_narration(text: str, voice: str, rate: str, pitch: str, key: str, keep: bool = False) -> str:
+    async for _ in stream_narration(text, voice, rate, pitch, key, keep):
+        pass
+    # The kept copy already exists when `keep`, so this only builds its URL
+    return narration_cache.keep(key, ".mp3") if keep else narration_cache.url_for(key, ".mp3")
+
+
+class NarrationAbandoned(Exception):
+    """The request synthesizing a narration went away before it finished."""
+
+
+def _claim(key: str):
+    """(future, owner): the in-flight synthesis of `key`, registering a new one if there is none."""
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        if pending is not None:
+            return pending, False
+        pending = _inflight[key] = Future()
+        return pending, True
+
+
+def _release(key: str, pending: Future):
+    with _inflight_lock:
+        if _inflight.get(key) is pending:
+            del _inflight[key]
+
+
+def _settle(pending: Future, error: BaseException):
+    # Waiters of a cancelled or disconnected owner retry instead of failing
+    if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        error = NarrationAbandoned()
+    pending.set_exception(error)
+
+
+async def synthesize_shared(text: str, voice: str, rate: str, pitch: str, key: str, keep: bool = False) -> str:
+    """
+    synthesize_narration, coalesced through _inflight: if the same narration
+    is already being synthesized (generate_audio, a stream, the marks route),
+    waits for it instead of starting a second edge-tts call.
+    """
+    while True:
+        pending, owner = _claim(key)
+        if owner:
+            break
+        try:
+            url = await asyncio.wrap_future(pending)
+        except NarrationAbandoned:
+            continue
+        return narration_cache.keep(key, ".mp3") if keep else url
+
+    try:
+        url = await synthesize_narration(text, voice, rate, pitch, key, keep)
+    except BaseException as e:
+        _settle(pending, e)
+        raise
+    else:
+        pending.set_result(url)
+        return url
+    finally:
+        _release(key, pending)
+
+
+async def stream_shared(text: str, voice: str, rate: str, pitch: str, key: str):
+    """
+    stream_narration, coalesced through _inflight like synthesize_shared: while
+    another request is synthesizing the narration, waits for it and sends the
+    stored file.
+    """
+    while True:
+        pending, owner = _claim(key)
+        if owner:
+            break
+        try:
+            await asyncio.wrap_future(pending)
+        except NarrationAbandoned:
+            continue
+        path = narration_cache.lookup(key, ".mp3")
+        if path:
+            yield await asyncio.to_thread(path.read_bytes)
+            return
+
+    try:
+        async for chunk in stream_narration(text, voice, rate, pitch, key):
+            yield chunk
+    except BaseException as e:
+        _settle(pending, e)
+        raise
+    else:
+        pending.set_result(narration_cache.url_for(key, ".mp3"))
+    finally:
+        _release(key, pending)
+
+
+def get_narration_marks(key: str) -> list | None:
+    """Word-boundary marks of a stored narration, else None."""
+    path = narration_cache.lookup(key, ".json")
+    if not path:
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["marks"]
+
+
+async def generate_audio(
+    text: str,
+    language: str = "English",
+    output_dir: str = "generated_audio",
+    rate: str = DEFAULT_RATE,
+    pitch: str = DEFAULT_PITCH,
+    use_cache: bool = True,
+    keep: bool = True,
+) -> str:
     """
     Generates narration for a given text and language using edge-tts.
     Returns the relative path to the generated .mp3 file.
+    Cached narrations are reused; concurrent requests for the same narration
+    wait for a single synthesis. `use_cache=False` writes a fresh file to output_dir.
+    With `keep` (the default, for URLs saved on orders) the path is the
+    eviction-proof copy; cache warming passes keep=False.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    
-    unique_id = str(uuid.uuid4())
-    filename = f"{unique_id}.mp3"
-    filepath = os.path.join(output_dir, filename)
-    
     voice = VOICES.get(language, VOICES["English"])
-    
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(filepath)
-    
-    return f"/{output_dir}/{filename}"
+
+    if not use_cache:
+        os.makedirs(output_dir, exist_ok=True)
+
+        unique_id = str(uuid.uuid4())
+        filename = f"{unique_id}.mp3"
+        filepath = os.path.join(output_dir, filename)
+
+        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch)
+        await communicate.save(filepath)
+
+        return f"/{output_dir}/{filename}"
+
+    key = narration_key(text, voice, rate, pitch)
+    cached_url = narration_cache.get_kept(key, ".mp3") if keep else narration_cache.get(key, ".mp3")
+    if cached_url:
+        return cached_url
+
+    return await synthesize_shared(text, voice, rate, pitch, key, keep)
+
 
 def generate_narration_sync(text: str, language: str = "English"):
     """Wrapper to run async tts in a sync context."""
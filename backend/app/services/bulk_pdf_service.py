@@ -0,0 +1,102 @@
+"""
+Bulk PDF rendering across processes (reprints after a layout change).
+
+Pages of all books are rendered as fragments in a process pool, each worker
+with its own reportlab canvas; the books are then merged in the same pool.
+Fragments are content-addressed (see pdf_service.render_page_fragment), so an
+interrupted run resumes where it stopped.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from app.config import PDF_IMAGE_DPI
+from app.services.db import db
+from app.services.pdf_service import assemble_book, book_layout, render_page_fragment
+from app.services.template_service import TemplateVersionMissing
+
+# Fields generate_pdf reads (template orders resolve their story from the
+# registry, at their template_version: see resolve_order_story)
+PDF_PROJECTION = {
+    "generated_pages": 1,
+    "story.title": 1,
+    "story.pages.text": 1,
+    "template_id": 1,
+    "template_version": 1,
+    "story_overrides": 1,
+}
+
+
+def _render_fragment(job):
+    spec, total_pages, template_title, image_dpi = job
+    return str(render_page_fragment(spec, total_pages, template_title, image_dpi))
+
+
+def find_orders_for_reprint(since: datetime | None = None, limit: int = 0):
+    query = {"generated_pages.0": {"$exists": True}}
+    if since:
+        query["updated_at"] = {"$gte": since}
+    return db.orders.find(query, PDF_PROJECTION).sort("updated_at", 1).limit(limit)
+
+
+def render_books(orders, workers: int | None = None, image_dpi: int = PDF_IMAGE_DPI, update_orders: bool = True) -> dict:
+    """
+    Renders every order's PDF in a process pool and (optionally) points
+    order.pdf_url at the new file. Returns throughput stats.
+    """
+    workers = workers or os.cpu_count() or 1
+    books = []
+    failed = []
+    for order in orders:
+        try:
+            specs, total_pages, template_title = book_layout(order)
+        except TemplateVersionMissing as e:
+            print(f"[BulkPDF] Skipped {order['_id']}: {e}")
+            failed.append(str(order["_id"]))
+            continue
+        if specs:
+            books.append((order["_id"], [(spec, total_pages, template_title, image_dpi) for spec in specs]))
+
+    page_count = sum(len(jobs) for _, jobs in books)
+    rendered = 0
+    start = time.perf_counter()
+
+    # spawn: workers must not inherit the parent's MongoClient sockets
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        page_futures = {
+            order_id: pool.map(_render_fragment, jobs, chunksize=4)
+            for order_id, jobs in books
+        }
+
+        merge_futures = {}
+        for order_id, fragments in page_futures.items():
+            try:
+                merge_futures[pool.submit(assemble_book, list(fragments))] = order_id
+            except Exception as e:
+                print(f"[BulkPDF] Page render failed for {order_id}: {e}")
+                failed.append(str(order_id))
+
+        for future in as_completed(merge_futures):
+            order_id = merge_futures[future]
+            try:
+                pdf_url = future.result()
+            except Exception as e:
+                print(f"[BulkPDF] Merge failed for {order_id}: {e}")
+                failed.append(str(order_id))
+                continue
+            rendered += 1
+            if update_orders:
+                db.orders.update_one({"_id": order_id}, {"$set": {"pdf_url": pdf_url}})
+
+    elapsed = time.perf_counter() - start
+    return {
+        "books": rendered,
+        "pages": page_count,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(page_count / elapsed, 1) if elapsed else 0.0,
+        "workers": workers,
+    }
@@ -0,0 +1,81 @@
+"""
+Per-page checkpoints for book generation.
+
+Every generated page is saved on the order with an `input_hash` of everything
+that determines its output. A rerun keeps pages whose hash still matches (and
+whose files still exist) and only regenerates missing or stale pages.
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+from app.services.db import db
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+LOCAL_MEDIA_PREFIXES = ("/generated_images/", "/generated_audio/")
+
+
+def page_input_hash(*parts) -> str:
+    """Stable hash of the inputs that produce a page."""
+    encoded = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def _media_exists(url: str | None) -> bool:
+    if not url:
+        return True
+    if url.startswith(LOCAL_MEDIA_PREFIXES):
+        return (BACKEND_ROOT / url.lstrip("/")).exists()
+    return True
+
+
+class PageCheckpoints:
+    """
+    In-memory view of an order's `generated_pages`, written back as one sorted
+    list after every page. Only the generating job writes it, so the list stays
+    consistent even when pages finish out of order. Safe to call from threads.
+    """
+
+    def __init__(self, order: dict, input_hashes: dict):
+        self.order_id = order["_id"]
+        self.input_hashes = input_hashes
+        self.pages = {}
+        self._lock = threading.Lock()
+
+        for page in order.get("generated_pages") or []:
+            page_number = page.get("page_number")
+            expected = input_hashes.get(page_number)
+            if (
+                expected
+                and page.get("input_hash") == expected
+                and _media_exists(page.get("image_url"))
+                and _media_exists(page.get("narration_url"))
+            ):
+                self.pages[page_number] = page
+
+    def is_done(self, page_number) -> bool:
+        return page_number in self.pages
+
+    def sorted_pages(self) -> list[dict]:
+        return [self.pages[n] for n in sorted(self.pages)]
+
+    def save(self, page: dict, extra_set: dict | None = None, complete: bool = True):
+        """Stores a page; `complete=False` keeps it visible but regenerates it on the next run."""
+        page["input_hash"] = self.input_hashes.get(page.get("page_number")) if complete else None
+        with self._lock:
+            self.pages[page["page_number"]] = page
+            self._write(extra_set)
+
+    def flush(self, extra_set: dict | None = None):
+        with self._lock:
+            self._write(extra_set)
+
+    def _write(self, extra_set: dict | None):
+        update = {"generated_pages": self.sorted_pages(), "updated_at": datetime.utcnow()}
+        update.update(extra_set or {})
+        db.orders.update_one({"_id": ObjectId(self.order_id)}, {"$set": update})
@@ -0,0 +1,299 @@
+"""
+Content-addressed file store with size-bounded LRU eviction.
+
+Files are stored as <root>/<key><ext> and served under <url_prefix>/<key><ext>.
+A hit refreshes the file's mtime, so eviction (oldest mtime first) is LRU.
+
+URLs saved on orders must outlive eviction: keep() / get_kept() /
+commit(keep=True) return a durable copy under <root>/../kept/<name>/
+(a hardlink, so no extra disk while the cache entry lives) that LRU eviction
+never touches. Kept copies still count against max_bytes (a linked pair once):
+when dropping cache entries is not enough, kept copies no order references any
+more (per the store's `referenced_urls` callback) are collected.
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+# Unreferenced kept copies younger than this survive collection: the URL may
+# have been handed out but not saved on its order yet
+KEPT_GRACE_SECONDS = 3600
+# referenced_urls() scans orders, so collection runs at most this often
+KEPT_GC_INTERVAL_SECONDS = 600
+
+
+def content_key(*parts) -> str:
+    """sha256 over the given parts (bytes are hashed as-is, everything else via str())."""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentStore:
+    def __init__(
+        self,
+        name: str,
+        root: Path,
+        url_prefix: str,
+        max_bytes: int,
+        ttl_seconds: float | None = None,
+        referenced_urls: Callable[[str], set] | None = None,
+    ):
+        self.name = name
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = None  # lazily measured on first write
+        self._lock = threading.Lock()
+
+        # Durable copies for URLs stored on orders, e.g. generated_images/kept/swaps
+        self.keep_root = self.root.parent / "kept" / self.root.name
+        self.keep_url_prefix = f"{self.url_prefix.rsplit('/', 1)[0]}/kept/{self.root.name}"
+        # referenced_urls(keep_url_prefix) -> kept URLs still stored on orders
+        self.referenced_urls = referenced_urls
+        self.collected = 0
+        self._last_collect = 0.0
+
+    def path_for(self, key: str, ext: str) -> Path:
+        return self.root / f"{key}{ext}"
+
+    def url_for(self, key: str, ext: str) -> str:
+        return f"{self.url_prefix}/{key}{ext}"
+
+    def _expired(self, mtime: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - mtime > self.ttl_seconds
+
+    def lookup(self, key: str, ext: str) -> Path | None:
+        """Path of a live entry (and marks it recently used), else None."""
+        path = self.path_for(key, ext)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self._expired(mtime, time.time()):
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def get(self, key: str, ext: str) -> str | None:
+        """URL of a live entry, else None."""
+        return self.url_for(key, ext) if self.lookup(key, ext) else None
+
+    def keep(self, key: str, ext: str) -> str:
+        """
+        URL of a durable copy of a live entry, outside the evictable root.
+        Raises FileNotFoundError if the entry is gone.
+        """
+        src = self.path_for(key, ext)
+        dest = self.keep_root / f"{key}{ext}"
+        try:
+            os.utime(dest)  # restarts its collection grace period
+        except FileNotFoundError:
+            self.keep_root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.keep_root / f".{uuid.uuid4().hex}.tmp"
+            try:
+                os.link(src, tmp_path)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                shutil.copyfile(src, tmp_path)  # no hardlinks here (e.g. another filesystem)
+            os.replace(tmp_path, dest)
+        return f"{self.keep_url_prefix}/{key}{ext}"
+
+    def get_kept(self, key: str, ext: str) -> str | None:
+        """Like get(), but returns the durable URL (see keep())."""
+        if not self.lookup(key, ext):
+            return None
+        try:
+            return self.keep(key, ext)
+        except FileNotFoundError:  # evicted in between
+            return None
+
+    def put_bytes(self, key: str, ext: str, data: bytes, keep: bool = False) -> str:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f".{uuid.uuid4().hex}.tmp"
+        tmp_path.write_bytes(data)
+        return self.commit(key, ext, tmp_path, keep=keep)
+
+    def temp_path(self, ext: str) -> Path:
+        """A temp file path inside the store, to be passed to commit() once written."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self.root / f".{uuid.uuid4().hex}.tmp{ext}"
+
+    def commit(self, key: str, ext: str, tmp_path: Path, keep: bool = False) -> str:
+        """
+        Atomically moves a finished temp file into place and returns its URL
+        (the durable one with `keep`, linked before any eviction can run).
+        """
+        path = self.path_for(key, ext)
+        size = Path(tmp_path).stat().st_size
+        os.replace(tmp_path, path)
+        url = self.keep(key, ext) if keep else self.url_for(key, ext)
+
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += size
+            over_budget = self._bytes is None or self._bytes > self.max_bytes
+
+        if over_budget:
+            self.evict()
+        return url
+
+    def _remove(self, path: Path):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._bytes is not None:
+                self._bytes -= size
+
+    @staticmethod
+    def _files(directory: Path):
+        """(path, stat) of the finished files in a directory."""
+        if not directory.exists():
+            return []
+        files = []
+        for path in directory.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                files.append((path, stat))
+        return files
+
+    def collect_kept(self, referenced: set, min_age_seconds: float | None = None) -> int:
+        """
+        Deletes kept copies whose URL is not in `referenced` (and that are
+        older than min_age_seconds, KEPT_GRACE_SECONDS by default). Returns
+        the number deleted.
+        """
+        if min_age_seconds is None:
+            min_age_seconds = KEPT_GRACE_SECONDS
+        now = time.time()
+        removed = 0
+        for path, stat in self._files(self.keep_root):
+            if f"{self.keep_url_prefix}/{path.name}" in referenced or now - stat.st_mtime < min_age_seconds:
+                continue
+            path.unlink(missing_ok=True)
+            removed += 1
+        with self._lock:
+            self.collected += removed
+        return removed
+
+    def _collect_unreferenced(self):
+        now = time.time()
+        if self.referenced_urls is None or now - self._last_collect < KEPT_GC_INTERVAL_SECONDS:
+            return
+        self._last_collect = now
+        try:
+            removed = self.collect_kept(self.referenced_urls(self.keep_url_prefix))
+        except Exception as e:  # e.g. database unavailable: keep everything
+            print(f"[ContentStore:{self.name}] Kept copy collection skipped: {e}")
+            return
+        if removed:
+            print(f"[ContentStore:{self.name}] Collected {removed} unreferenced kept copies")
+
+    def evict(self):
+        """
+        Drops expired entries, then least recently used ones until under 90% of
+        max_bytes, counting kept copies too. Cache entries that share their
+        file with a kept copy free nothing, so they stay (and keep their hits);
+        unreferenced kept copies are collected first when over budget.
+        """
+        if not self.root.exists():
+            return
+
+        if self._disk_usage() > self.max_bytes:
+            self._collect_unreferenced()
+
+        now = time.time()
+        kept = self._files(self.keep_root)
+        kept_inodes = {(stat.st_dev, stat.st_ino) for _, stat in kept}
+        total = sum(stat.st_size for _, stat in kept)
+
+        entries = []
+        for path, stat in self._files(self.root):
+            if self._expired(stat.st_mtime, now):
+                path.unlink(missing_ok=True)
+                self.evictions += 1
+                continue
+            if (stat.st_dev, stat.st_ino) in kept_inodes:
+                continue  # its bytes are already counted with the kept copy
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total > self.max_bytes:
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                self.evictions += 1
+                total -= size
+            print(f"[ContentStore:{self.name}] Evicted down to {total / 1e6:.1f} MB")
+
+        with self._lock:
+            self._bytes = total
+
+    def _disk_usage(self) -> int:
+        """Bytes used by the cache and its kept copies, hardlinked pairs counted once."""
+        seen = set()
+        total = 0
+        for _, stat in self._files(self.root) + self._files(self.keep_root):
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                total += stat.st_size
+        return total
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "kept_collected": self.collected,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
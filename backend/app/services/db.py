@@ -1,5 +1,11 @@
-from pymongo import MongoClient
+from pymongo import DESCENDING, MongoClient
 from app.config import MONGO_URI
 
 client = MongoClient(MONGO_URI)
-db = client["ai_kids_books"]
\ No newline at end of file
+db = client["ai_kids_books"]
+
+
+def ensure_indexes(database=db):
+    """Indexes for the order queries; safe to call on every startup."""
+    # /books: newest first, keyset-paginated on (created_at, _id)
+    database.orders.create_index([("created_at", DESCENDING), ("_id", DESCENDING)])
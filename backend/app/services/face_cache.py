@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import SOURCE_FACE_CACHE_SIZE
+from app.services.content_store import file_sha256
+
+
+class FaceLRU:
+    """Small thread-safe LRU of detected faces keyed by photo content hash."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max(max_items, 1)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            face = self._items.get(key)
+            if face is not None:
+                self._items.move_to_end(key)
+            return face
+
+    def put(self, key: str, face):
+        with self._lock:
+            self._items[key] = face
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+source_face_cache = FaceLRU(SOURCE_FACE_CACHE_SIZE)
+
+
+def serialize_face(face, photo_hash: str | None = None) -> dict:
+    """Convert an InsightFace `Face` into a Mongo-friendly dict (swap fields only)."""
+    return {
+        "photo_hash": photo_hash,
+        "bbox": np.asarray(face.bbox, dtype=np.float32).tolist(),
+        "kps": np.asarray(face.kps, dtype=np.float32).tolist(),
+        "det_score": float(face.det_score),
+        "embedding": np.asarray(face.embedding, dtype=np.float32).tolist(),
+    }
+
+
+def deserialize_face(data: dict | None):
+    """Rebuild a `Face` usable by inswapper (`normed_embedding` is derived from `embedding`)."""
+    if not data or not data.get("embedding"):
+        return None
+
+    from insightface.app.common import Face
+
+    return Face(
+        bbox=np.asarray(data["bbox"], dtype=np.float32),
+        kps=np.asarray(data["kps"], dtype=np.float32),
+        det_score=np.float32(data.get("det_score", 0.0)),
+        embedding=np.asarray(data["embedding"], dtype=np.float32),
+    )
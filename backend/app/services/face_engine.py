@@ -0,0 +1,247 @@
+"""
+Process-wide InsightFace runtime: buffalo_l (detection + recognition) and
+inswapper_128, loaded once and shared by every caller in the process
+(image_service, face_swap_service, identity_service, the worker).
+
+Providers, detector input size, the inswapper path, onnxruntime session
+options (threads, graph optimization, memory arena) and the model variant
+(fp32 / int8 / fp16, see scripts/quantize_models.py) come from config.
+warm_up() loads both models and runs one dummy inference so the ONNX
+sessions are initialised before the first request; stats() reports how long
+each step took.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from app.config import (
+    FACE_DET_SIZE,
+    FACE_MODEL_VARIANT,
+    FACE_PROVIDERS,
+    INSWAPPER_PATH,
+    ORT_CPU_MEM_ARENA,
+    ORT_GRAPH_OPTIMIZATION,
+    ORT_INTER_OP_THREADS,
+    ORT_INTRA_OP_THREADS,
+    SWAP_BATCH_SIZE,
+)
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+INSIGHTFACE_ROOT = Path.home() / ".insightface"
+MODEL_VARIANTS = ("fp32", "int8", "fp16")
+GRAPH_OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+# Searched in order when INSWAPPER_PATH is not set
+INSWAPPER_CANDIDATES = [
+    BACKEND_ROOT / "models" / "inswapper_128.onnx",
+    INSIGHTFACE_ROOT / "models" / "inswapper_128.onnx",
+]
+
+_lock = threading.Lock()
+_face_app = None
+_swapper = None
+_metrics = {}
+
+
+def _ctx_id():
+    # -1 keeps insightface on CPU; any GPU provider gets device 0
+    return 0 if any(p != "CPUExecutionProvider" for p in FACE_PROVIDERS) else -1
+
+
+def _check_variant(variant):
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown face model variant {variant!r} (expected one of {', '.join(MODEL_VARIANTS)})")
+    return variant
+
+
+def inswapper_path(variant: str = FACE_MODEL_VARIANT) -> Path:
+    """inswapper_128 file for a variant; quantized ones sit next to the original (inswapper_128.int8.onnx)."""
+    if INSWAPPER_PATH:
+        base = Path(INSWAPPER_PATH).expanduser()
+    else:
+        base = next((c for c in INSWAPPER_CANDIDATES if c.exists()), INSWAPPER_CANDIDATES[0])
+    if _check_variant(variant) == "fp32":
+        return base
+    return base.with_name(f"{base.stem}.{variant}{base.suffix}")
+
+
+def batch_export_path(model_path: Path) -> Path:
+    """Dynamic-batch re-export of an inswapper file (inswapper_128.batch.onnx, see scripts/quantize_models.py)."""
+    return model_path.with_name(f"{model_path.stem}.batch{model_path.suffix}")
+
+
+def swapper_model_path(variant: str = FACE_MODEL_VARIANT) -> Path:
+    """
+    The inswapper file create_swapper loads: the dynamic-batch export when it
+    exists and micro-batching is on (the official export has a fixed batch of 1).
+    """
+    model_path = inswapper_path(variant)
+    batch_path = batch_export_path(model_path)
+    if SWAP_BATCH_SIZE > 1 and batch_path.exists():
+        return batch_path
+    return model_path
+
+
+def buffalo_name(variant: str = FACE_MODEL_VARIANT) -> str:
+    """insightface model pack name; quantized packs are sibling folders (models/buffalo_l_int8)."""
+    return "buffalo_l" if _check_variant(variant) == "fp32" else f"buffalo_l_{variant}"
+
+
+def session_options(
+    intra_op_threads: int = ORT_INTRA_OP_THREADS,
+    inter_op_threads: int = ORT_INTER_OP_THREADS,
+    graph_optimization: str = ORT_GRAPH_OPTIMIZATION,
+    cpu_mem_arena: bool = ORT_CPU_MEM_ARENA,
+):
+    """onnxruntime.SessionOptions shared by every face model session."""
+    import onnxruntime as ort
+
+    levels = {
+        "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if graph_optimization not in levels:
+        raise ValueError(f"Unknown graph optimization level {graph_optimization!r}")
+
+    options = ort.SessionOptions()
+    if intra_op_threads > 0:
+        options.intra_op_num_threads = intra_op_threads
+    if inter_op_threads > 0:
+        options.inter_op_num_threads = inter_op_threads
+    options.graph_optimization_level = levels[graph_optimization]
+    options.enable_cpu_mem_arena = cpu_mem_arena
+    return options
+
+
+def load_model(model_file, sess_options=None, providers=None):
+    """
+    One insightface model (routed to its class by input shape) on a session
+    built with `sess_options`. insightface's model_zoo.get_model and
+    FaceAnalysis only forward providers, so the router is called directly:
+    it passes every keyword on to onnxruntime.InferenceSession.
+    """
+    from insightface.model_zoo.model_zoo import ModelRouter
+
+    return ModelRouter(str(model_file)).get_model(
+        sess_options=sess_options if sess_options is not None else session_options(),
+        providers=providers or FACE_PROVIDERS,
+    )
+
+
+def load_model_pack(model_dir, sess_options=None, providers=None) -> dict:
+    """{taskname: model} for a model pack folder, first file per task (as FaceAnalysis picks them)."""
+    models = {}
+    for model_file in sorted(Path(model_dir).glob("*.onnx")):
+        model = load_model(model_file, sess_options, providers)
+        if model is None:
+            print(f"[FaceEngine] Model not recognized: {model_file}", file=sys.stderr)
+        elif model.taskname not in models:
+            models[model.taskname] = model
+    return models
+
+
+def create_face_app(variant: str = FACE_MODEL_VARIANT, sess_options=None, providers=None, det_size: int = FACE_DET_SIZE):
+    """A new buffalo_l FaceAnalysis (not registered; the app uses get_face_app)."""
+    import onnxruntime as ort
+    from insightface.app import FaceAnalysis
+    from insightface.utils import ensure_available
+
+    name = buffalo_name(variant)
+    if variant != "fp32" and not (INSIGHTFACE_ROOT / "models" / name).is_dir():
+        raise FileNotFoundError(f"{name} not found under {INSIGHTFACE_ROOT / 'models'} (run scripts/quantize_models.py)")
+
+    # FaceAnalysis.__init__ minus its session creation, which would drop sess_options
+    ort.set_default_logger_severity(3)
+    face_app = FaceAnalysis.__new__(FaceAnalysis)
+    face_app.model_dir = ensure_available("models", name, root=str(INSIGHTFACE_ROOT))  # downloads buffalo_l once
+    face_app.models = load_model_pack(face_app.model_dir, sess_options, providers)
+    if "detection" not in face_app.models:
+        raise FileNotFoundError(f"No detection model in {face_app.model_dir}")
+    face_app.det_model = face_app.models["detection"]
+    face_app.prepare(ctx_id=_ctx_id(), det_size=(det_size, det_size))
+    return face_app
+
+
+def create_swapper(variant: str = FACE_MODEL_VARIANT, sess_options=None, providers=None):
+    """A new inswapper_128 model; raises FileNotFoundError when the file is missing."""
+    model_path = swapper_model_path(variant)
+    if not model_path.exists():
+        raise FileNotFoundError(f"inswapper_128 ({variant}) not found at {model_path}")
+    return load_model(model_path, sess_options, providers)
+
+
+def get_face_app():
+    """buffalo_l FaceAnalysis, prepared at FACE_DET_SIZE."""
+    global _face_app
+    with _lock:
+        if _face_app is None:
+            print(f"[FaceEngine] Loading {buffalo_name()} ({', '.join(FACE_PROVIDERS)}, det {FACE_DET_SIZE})...", file=sys.stderr)
+            start = time.perf_counter()
+            face_app = create_face_app()
+            _metrics["face_app_load_seconds"] = round(time.perf_counter() - start, 3)
+            _face_app = face_app
+            print(f"[FaceEngine] {buffalo_name()} ready in {_metrics['face_app_load_seconds']}s", file=sys.stderr)
+    return _face_app
+
+
+def get_swapper():
+    """inswapper_128; raises FileNotFoundError when the model file is missing."""
+    global _swapper
+    with _lock:
+        if _swapper is None:
+            model_path = swapper_model_path()
+            print(f"[FaceEngine] Loading {model_path.name}...", file=sys.stderr)
+            start = time.perf_counter()
+            swapper = create_swapper()
+            _metrics["swapper_load_seconds"] = round(time.perf_counter() - start, 3)
+            _swapper = swapper
+            print(f"[FaceEngine] {model_path.name} ready in {_metrics['swapper_load_seconds']}s", file=sys.stderr)
+    return _swapper
+
+
+def load_models():
+    """(face_app, swapper), loading whichever is not loaded yet."""
+    return get_face_app(), get_swapper()
+
+
+def warm_up(swapper: bool = True) -> dict:
+    """
+    Loads the models and runs one detection on a blank frame, so the first
+    request does not pay for model loading or ONNX session initialisation.
+    """
+    import numpy as np
+
+    start = time.perf_counter()
+    face_app = get_face_app()
+    if swapper:
+        get_swapper()
+
+    first_run = time.perf_counter()
+    face_app.get(np.zeros((FACE_DET_SIZE, FACE_DET_SIZE, 3), dtype=np.uint8))
+    _metrics["first_inference_seconds"] = round(time.perf_counter() - first_run, 3)
+    _metrics["warm_up_seconds"] = round(time.perf_counter() - start, 3)
+    return stats()
+
+
+def stats() -> dict:
+    return {
+        "providers": list(FACE_PROVIDERS),
+        "det_size": FACE_DET_SIZE,
+        "variant": FACE_MODEL_VARIANT,
+        "inswapper_path": str(swapper_model_path()),
+        "session": {
+            "intra_op_threads": ORT_INTRA_OP_THREADS,
+            "inter_op_threads": ORT_INTER_OP_THREADS,
+            "graph_optimization": ORT_GRAPH_OPTIMIZATION,
+            "cpu_mem_arena": ORT_CPU_MEM_ARENA,
+        },
+        "face_app_loaded": _face_app is not None,
+        "swapper_loaded": _swapper is not None,
+        "pid": os.getpid(),
+        **_metrics,
+    }
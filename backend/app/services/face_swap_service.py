@@ -3,54 +3,32 @@ import cv2
 import json
 import sys
 import numpy as np
-import insightface
-from insightface.app import FaceAnalysis
 
-# ============================================
-# GLOBAL MODEL LOAD (Load once)
-# ============================================
-
-face_app = None
-face_swapper = None
+from app.services import face_engine
+from app.services import target_face_index
+from app.services.face_cache import file_sha256
+from app.services.swap_batcher import batched_swap
 
 
 def load_models():
-    global face_app, face_swapper
-
-    if face_app is None:
-        print("🔄 Loading face detection model...", file=sys.stderr)
-        face_app = FaceAnalysis(
-            name="buffalo_l",
-            providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
-        )
-        face_app.prepare(ctx_id=0, det_size=(1024, 1024))
-        print("✅ Face detection ready", file=sys.stderr)
-
-    if face_swapper is None:
-        model_path = os.path.join(
-            os.path.expanduser("~"),
-            ".insightface",
-            "models",
-            "inswapper_128.onnx"
-        )
-
-        if not os.path.exists(model_path):
-            raise Exception(f"inswapper_128.onnx not found at {model_path}")
-
-        print("🔄 Loading face swap model...", file=sys.stderr)
-        face_swapper = insightface.model_zoo.get_model(
-            model_path,
-            providers=["CUDAExecutionProvider", "CPUExecutionProvider"]
-        )
-        print("✅ Face swap model ready", file=sys.stderr)
-
-    return face_app, face_swapper
+    # Shared with image_service / identity_service (one copy of each model per process)
+    return face_engine.load_models()
 
 
 # ============================================
 # UTILITY: Get Largest Face (AREA based)
 # ============================================
 
+def get_largest_face(faces):
+    if not faces:
+        return None
+
+    return max(
+        faces,
+        key=lambda f: (f.bbox[2] - f.bbox[0]) * (f.bbox[3] - f.bbox[1])
+    )
+
+
 def get_best_face(faces):
     if not faces:
         return None
@@ -116,12 +94,7 @@ def swap_face(source_path, target_path, output_path):
     target_face = get_best_face(target_faces)
     target_face = expand_bbox(target_face, target_img.shape)
 
-    result_img = swapper.get(
-        target_img,
-        target_face,
-        source_face,
-        paste_back=True
-    )
+    result_img = batched_swap(swapper, target_img, target_face, source_face)
     cv2.imwrite(output_path, result_img)
 
     return {
@@ -134,63 +107,71 @@ def swap_face(source_path, target_path, output_path):
 # BATCH SWAP (Multiple Pages)
 # ============================================
 
-def swap_face_batch(source_path, target_paths, output_dir):
-
-    app, swapper = load_models()
-
-    os.makedirs(output_dir, exist_ok=True)
+def detect_source_face(source_path):
+    """Returns (source_face, None), or (None, error message) if the child photo is unusable."""
+    app, _ = load_models()
 
     source_img = cv2.imread(source_path)
     if source_img is None:
-        return {"success": False, "error": "Source image not found"}
+        return None, "Source image not found"
 
     source_faces = app.get(source_img)
     if len(source_faces) == 0:
-        return {"success": False, "error": "No face detected in child photo"}
+        return None, "No face detected in child photo"
 
-    source_face = get_largest_face(source_faces)
+    return get_largest_face(source_faces), None
 
-    results = []
 
-    for i, target_path in enumerate(target_paths):
-        output_path = os.path.join(output_dir, f"swapped-{i+1}.png")
+def swap_target(source_face, target_path, output_path, page):
+    """Swaps the child's face into one template page; returns that page's result."""
+    app, swapper = load_models()
 
-        try:
-            target_img = cv2.imread(target_path)
-            if target_img is None:
-                results.append({"page": i+1, "success": False})
-                continue
+    try:
+        target_img = cv2.imread(target_path)
+        if target_img is None:
+            return {"page": page, "success": False}
 
+        # Known template pages skip detection via the precomputed index
+        target_faces = target_face_index.lookup_by_hash(file_sha256(target_path))
+        if target_faces is None:
             target_faces = app.get(target_img)
-            if len(target_faces) == 0:
-                cv2.imwrite(output_path, target_img)
-                results.append({"page": i+1, "success": False})
-                continue
-
-            target_face = get_best_face(target_faces)
-            target_face = expand_bbox(target_face, target_img.shape)
-
-            result_img = swapper.get(
-                target_img,
-                target_face,
-                source_face,
-                paste_back=True
-            )
-
-            cv2.imwrite(output_path, result_img)
-
-            results.append({
-                "page": i+1,
-                "success": True,
-                "output": output_path
-            })
-
-        except Exception as e:
-            results.append({
-                "page": i+1,
-                "success": False,
-                "error": str(e)
-            })
+        if len(target_faces) == 0:
+            cv2.imwrite(output_path, target_img)
+            return {"page": page, "success": False}
+
+        target_face = get_best_face(target_faces)
+        target_face = expand_bbox(target_face, target_img.shape)
+
+        result_img = batched_swap(swapper, target_img, target_face, source_face)
+
+        cv2.imwrite(output_path, result_img)
+
+        return {
+            "page": page,
+            "success": True,
+            "output": output_path
+        }
+
+    except Exception as e:
+        return {
+            "page": page,
+            "success": False,
+            "error": str(e)
+        }
+
+
+def swap_face_batch(source_path, target_paths, output_dir):
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    source_face, error = detect_source_face(source_path)
+    if source_face is None:
+        return {"success": False, "error": error}
+
+    results = [
+        swap_target(source_face, target_path, os.path.join(output_dir, f"swapped-{i+1}.png"), i + 1)
+        for i, target_path in enumerate(target_paths)
+    ]
 
     return {
         "success": True,
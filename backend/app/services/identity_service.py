@@ -1,14 +1,6 @@
 import cv2
-from insightface.app import FaceAnalysis
 
-face_app = None
-
-def get_face_app():
-    global face_app
-    if face_app is None:
-        face_app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-        face_app.prepare(ctx_id=-1)
-    return face_app
+from app.services.face_engine import get_face_app
 
 
 def extract_identity(face_image_path: str):
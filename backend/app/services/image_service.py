@@ -1,25 +1,63 @@
 import base64
 import hashlib
+import json
 import os
-import shutil
 import uuid
 from pathlib import Path
 
 import cv2
+import numpy as np
 import requests
 
-from app.config import FAL_KEY, NVIDIA_API_KEY
+from app.config import (
+    FACE_DET_SIZE,
+    FACE_MODEL_VARIANT,
+    FAL_KEY,
+    NVIDIA_API_KEY,
+    SDXL_CACHE_DISABLED,
+    SDXL_CACHE_MAX_MB,
+    SDXL_CACHE_TTL_HOURS,
+    SDXL_INVOKE_URL,
+    SDXL_TIMEOUT_SECONDS,
+    SWAP_CACHE_MAX_MB,
+)
+from app.services import face_engine
+from app.services.content_store import ContentStore, content_key
+from app.services.face_cache import file_sha256, source_face_cache
+from app.services.order_media import order_media_urls
+from app.services import target_face_index
+from app.services.swap_batcher import batched_swap
 
 if FAL_KEY:
     os.environ["FAL_KEY"] = FAL_KEY
 
-# Global model variables
-face_app = None
-face_swapper = None
-
 BACKEND_ROOT = Path(__file__).resolve().parents[2]
 FRONTEND_PUBLIC_DIR = BACKEND_ROOT.parent / "frontend" / "public"
 GENERATED_IMAGES_DIR = BACKEND_ROOT / "generated_images"
+PLACEHOLDER_FILENAME = "default_placeholder.png"
+PLACEHOLDER_IMAGE_URL = f"/generated_images/{PLACEHOLDER_FILENAME}"
+
+# Swapped pages, addressed by hash(source embedding, page image hash, SWAP_PARAMS)
+SWAP_PARAMS = f"inswapper_128|buffalo_l|det{FACE_DET_SIZE}|largest-face|v1" + (
+    f"|{FACE_MODEL_VARIANT}" if FACE_MODEL_VARIANT != "fp32" else ""
+)
+swap_result_cache = ContentStore(
+    "swaps",
+    GENERATED_IMAGES_DIR / "swaps",
+    "/generated_images/swaps",
+    max_bytes=SWAP_CACHE_MAX_MB * 1024 * 1024,
+    referenced_urls=order_media_urls
+)
+
+# SDXL outputs, addressed by hash(endpoint URL, full request payload)
+sdxl_image_cache = ContentStore(
+    "sdxl",
+    GENERATED_IMAGES_DIR / "sdxl_cache",
+    "/generated_images/sdxl_cache",
+    max_bytes=SDXL_CACHE_MAX_MB * 1024 * 1024,
+    ttl_seconds=SDXL_CACHE_TTL_HOURS * 3600,
+    referenced_urls=order_media_urls
+)
 
 
 def _seed_from_prompt(prompt: str) -> int:
@@ -50,13 +88,10 @@ def _resolve_template_image_path(base_image_path: str | None) -> Path | None:
     return candidate
 
 
-def _copy_image_to_generated(source_path: Path) -> str:
-    GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-    extension = source_path.suffix if source_path.suffix else ".png"
-    unique_name = f"template_{uuid.uuid4()}{extension}"
-    destination = GENERATED_IMAGES_DIR / unique_name
-    shutil.copyfile(source_path, destination)
-    return f"/generated_images/{unique_name}"
+def _template_image_url(template_path: Path) -> str:
+    """Canonical /defaults/<template_id>/page-N.png URL for a template page (no copy)."""
+    relative = template_path.resolve().relative_to(FRONTEND_PUBLIC_DIR.resolve())
+    return f"/{relative.as_posix()}"
 
 
 def _pick_largest_face(faces):
@@ -67,45 +102,67 @@ def _pick_largest_face(faces):
 
 
 def get_insightface_models():
-    """Lazy load InsightFace models globally, forcing CPU mode since CUDA is not configured properly."""
-    global face_app, face_swapper
-    if face_app is None or face_swapper is None:
-        print("[InsightFace] Loading models (CPU Mode)... This may take a moment.")
-        import insightface
-        from insightface.app import FaceAnalysis
-        from insightface.model_zoo import get_model
+    """The shared face_engine models, or (None, None) when they cannot be loaded."""
+    try:
+        return face_engine.load_models()
+    except Exception as e:
+        print(f"[InsightFace] Error: {e}")
+        return None, None
+
+
+def get_source_face(face_image_path: str):
+    """
+    Detects the child's face once per photo. Results are cached in-process by the
+    photo content hash, so retried or duplicate orders skip detection.
+    Returns (face, photo_hash); face is None when no face is found.
+    """
+    source_path = _resolve_backend_relative_path(face_image_path)  # e.g. /uploads/faces/uuid.jpg
+    if not source_path.exists():
+        raise FileNotFoundError(f"Source face not found: {source_path}")
 
-        # Load buffalo_l detector (uses CPU)
-        face_app = FaceAnalysis(name="buffalo_l", providers=["CPUExecutionProvider"])
-        face_app.prepare(ctx_id=-1, det_size=(640, 640))  # -1 forces CPU
+    photo_hash = file_sha256(source_path)
+    cached = source_face_cache.get(photo_hash)
+    if cached is not None:
+        return cached, photo_hash
 
-        model_path = BACKEND_ROOT / "models" / "inswapper_128.onnx"
-        if not model_path.exists():
-            print(f"[InsightFace] Error: inswapper_128.onnx not found at {model_path}!")
-            return None, None
+    source_img = cv2.imread(str(source_path))
+    if source_img is None:
+        raise ValueError(f"Could not read source image: {source_path}")
 
-        face_swapper = get_model(str(model_path), providers=["CPUExecutionProvider"])
-        print("[InsightFace] Models loaded successfully on CPU!")
+    app, _ = get_insightface_models()
+    if not app:
+        return None, photo_hash
 
-    return face_app, face_swapper
+    source_faces = app.get(source_img)
+    if not source_faces:
+        return None, photo_hash
 
+    source_face = _pick_largest_face(source_faces)
+    source_face_cache.put(photo_hash, source_face)
+    return source_face, photo_hash
 
-def generate_personalized_image(prompt: str, face_image_path: str, base_image_path: str | None = None):
+
+def template_image_hash(base_image_path: str | None) -> str | None:
+    """Content hash of a /defaults/... template page, or None if it is not a local template."""
+    template_path = _resolve_template_image_path(base_image_path)
+    return file_sha256(template_path) if template_path else None
+
+
+def generate_personalized_image(
+    prompt: str,
+    face_image_path: str,
+    base_image_path: str | None = None,
+    source_face=None,
+) -> tuple[str | None, bool]:
     """
     Uses the theme template image (when provided) and swaps the child's face onto it
     using local InsightFace (CPU mode).
+    `source_face` is the pre-detected child face; when omitted it is detected (and cached) here.
+    Returns (image_url, swapped); `swapped` is False when the template or a generated
+    base image comes back unchanged (no face found, models missing, swap error).
     """
     try:
-        # 1. Load the baby face (source)
-        source_path = _resolve_backend_relative_path(face_image_path)  # e.g. /uploads/faces/uuid.jpg
-        if not source_path.exists():
-            raise FileNotFoundError(f"Source face not found: {source_path}")
-
-        source_img = cv2.imread(str(source_path))
-        if source_img is None:
-            raise ValueError(f"Could not read source image: {source_path}")
-
-        # 2. Pick target image: prefer template page image for full story continuity.
+        # 1. Pick target image: prefer template page image for full story continuity.
         target_img_path = None
         fallback_image_url = None
 
@@ -118,63 +175,79 @@ def generate_personalized_image(prompt: str, face_image_path: str, base_image_pa
             fallback_image_url = generate_image(prompt)
             target_img_path = _resolve_backend_relative_path(fallback_image_url)
 
-        # 3. Load InsightFace Models
+        # 2. Load InsightFace Models
         app, swapper = get_insightface_models()
         if not app or not swapper:
             if template_path:
-                return _copy_image_to_generated(template_path)
-            return fallback_image_url
+                return _template_image_url(template_path), False
+            return fallback_image_url, False
+
+        # Child face (source): detected once per photo, reused for every page
+        if source_face is None:
+            source_face, _ = get_source_face(face_image_path)
+        if source_face is None:
+            print("[InsightFace] No face detected in child photo. Skipping swap.")
+            if template_path:
+                return _template_image_url(template_path), False
+            return fallback_image_url, False
+
+        # 3. Same child + same page image + same swap settings → reuse the stored result
+        cache_key = content_key(
+            np.asarray(source_face.embedding, dtype=np.float32).tobytes(),
+            file_sha256(target_img_path),
+            SWAP_PARAMS
+        )
+        # Orders store this URL, so hand out the eviction-proof copy
+        cached_url = swap_result_cache.get_kept(cache_key, ".png")
+        if cached_url:
+            print("[InsightFace] Swap result cache hit.")
+            return cached_url, True
 
         # 4. Perform Face Swap
         target_img = cv2.imread(str(target_img_path))
         if target_img is None:
             raise ValueError(f"Could not read target image: {target_img_path}")
 
-        source_faces = app.get(source_img)
-        if not source_faces:
-            print("[InsightFace] No face detected in child photo. Skipping swap.")
-            if template_path:
-                return _copy_image_to_generated(template_path)
-            return fallback_image_url
-
-        target_faces = app.get(target_img)
+        # Template pages are detected once and served from the on-disk index
+        target_faces = None
+        if template_path:
+            target_faces = target_face_index.get_target_faces(template_path, app.get, image=target_img)
+        if target_faces is None:
+            target_faces = app.get(target_img)
         if not target_faces:
             print("[InsightFace] No face detected in target page. Skipping swap.")
             if template_path:
-                return _copy_image_to_generated(template_path)
-            return fallback_image_url
+                return _template_image_url(template_path), False
+            return fallback_image_url, False
 
         # Choose the largest detected face to reduce wrong swaps in busy scenes.
-        source_face = _pick_largest_face(source_faces)
         target_face = _pick_largest_face(target_faces)
-        result_img = swapper.get(target_img, target_face, source_face, paste_back=True)
-
-        unique_name = f"swapped_{uuid.uuid4()}.png"
-        GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-        saved_item_path = GENERATED_IMAGES_DIR / unique_name
+        result_img = batched_swap(swapper, target_img, target_face, source_face)
 
-        cv2.imwrite(str(saved_item_path), result_img)
+        # Stored under its content hash, so identical requests share one file
+        tmp_path = swap_result_cache.temp_path(".png")
+        cv2.imwrite(str(tmp_path), result_img)
         print("[InsightFace] Local CPU face swap complete.")
-        return f"/generated_images/{unique_name}"
+        return swap_result_cache.commit(cache_key, ".png", tmp_path, keep=True), True
 
     except Exception as e:
         print(f"[InsightFace] Face swap error: {e}")
         print("[InsightFace] Falling back to safe image return.")
         template_path = _resolve_template_image_path(base_image_path)
         if template_path:
-            return _copy_image_to_generated(template_path)
-        return generate_image(prompt)
+            return _template_image_url(template_path), False
+        return generate_image(prompt), False
 
 
-def generate_image(prompt: str):
-    invoke_url = "https://ai.api.nvidia.com/v1/genai/stabilityai/stable-diffusion-xl"
-
-    headers = {
+def sdxl_headers() -> dict:
+    return {
         "Authorization": f"Bearer {NVIDIA_API_KEY}",
         "Accept": "application/json",
         "Content-Type": "application/json",
     }
 
+
+def build_sdxl_payload(prompt: str) -> dict:
     safe_prompt = (
         "You are generating a high-quality children's storybook illustration. "
         "Pixar-style 3D cartoon illustration, soft cinematic lighting, expressive large eyes, "
@@ -187,7 +260,7 @@ def generate_image(prompt: str):
         f"Story context: {prompt}"
     )
 
-    payload = {
+    return {
         "text_prompts": [
             {"text": safe_prompt},
             {
@@ -201,37 +274,44 @@ def generate_image(prompt: str):
         "steps": 25,
     }
 
-    try:
-        response = requests.post(invoke_url, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
 
-        data = response.json()
+def sdxl_cache_key(invoke_url: str, payload: dict) -> str | None:
+    """Cache key for a request, or None when the cache is disabled."""
+    if SDXL_CACHE_DISABLED:
+        return None
+    return content_key(invoke_url, json.dumps(payload, sort_keys=True))
 
-        if "artifacts" in data and len(data["artifacts"]) > 0:
-            base64_str = data["artifacts"][0]["base64"]
 
-            image_bytes = base64.b64decode(base64_str)
-            unique_name = f"{uuid.uuid4()}.png"
+def save_sdxl_artifact(data: dict, cache_key: str | None = None) -> str | None:
+    """
+    Writes the first returned artifact; into the prompt cache when `cache_key`
+    is given, else as a new generated_images file. None if there is no artifact.
+    """
+    if "artifacts" in data and len(data["artifacts"]) > 0:
+        base64_str = data["artifacts"][0]["base64"]
 
-            GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-            local_path = GENERATED_IMAGES_DIR / unique_name
+        image_bytes = base64.b64decode(base64_str)
+        if cache_key:
+            # The returned URL ends up on orders: the kept copy survives cache eviction
+            return sdxl_image_cache.put_bytes(cache_key, ".png", image_bytes, keep=True)
 
-            with open(local_path, "wb") as f:
-                f.write(image_bytes)
+        unique_name = f"{uuid.uuid4()}.png"
 
-            print("[ImageService] NVIDIA image generated.")
-            return f"/generated_images/{unique_name}"
+        GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+        local_path = GENERATED_IMAGES_DIR / unique_name
 
-        print("[ImageService] NVIDIA returned no artifacts.")
+        with open(local_path, "wb") as f:
+            f.write(image_bytes)
 
-    except Exception as e:
-        print(f"[ImageService] NVIDIA API error: {e}")
+        return f"/generated_images/{unique_name}"
 
-    # Fallback image
+    return None
+
+
+def placeholder_image() -> str:
     print("[ImageService] Using fallback placeholder image.")
     GENERATED_IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-    default_filename = "default_placeholder.png"
-    default_path = GENERATED_IMAGES_DIR / default_filename
+    default_path = GENERATED_IMAGES_DIR / PLACEHOLDER_FILENAME
 
     if not default_path.exists():
         placeholder_bytes = base64.b64decode(
@@ -240,4 +320,36 @@ def generate_image(prompt: str):
         with open(default_path, "wb") as f:
             f.write(placeholder_bytes)
 
-    return f"/generated_images/{default_filename}"
+    return PLACEHOLDER_IMAGE_URL
+
+
+def generate_image(prompt: str, use_cache: bool = True):
+    """
+    Blocking single-image call. For many pages at once use sdxl_client.generate_images_async.
+    Identical requests are served from the prompt cache; `use_cache=False` forces a fresh call.
+    """
+    payload = build_sdxl_payload(prompt)
+
+    cache_key = sdxl_cache_key(SDXL_INVOKE_URL, payload) if use_cache else None
+    if cache_key:
+        cached_url = sdxl_image_cache.get_kept(cache_key, ".png")
+        if cached_url:
+            print("[ImageService] SDXL cache hit.")
+            return cached_url
+
+    try:
+        response = requests.post(SDXL_INVOKE_URL, headers=sdxl_headers(), json=payload, timeout=SDXL_TIMEOUT_SECONDS)
+        response.raise_for_status()
+
+        image_url = save_sdxl_artifact(response.json(), cache_key)
+        if image_url:
+            print("[ImageService] NVIDIA image generated.")
+            return image_url
+
+        print("[ImageService] NVIDIA returned no artifacts.")
+
+    except Exception as e:
+        print(f"[ImageService] NVIDIA API error: {e}")
+
+    # Fallback image
+    return placeholder_image()
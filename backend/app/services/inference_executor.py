@@ -0,0 +1,140 @@
+"""
+Dedicated executor for CPU-bound face work called from async routes.
+
+Detection and swaps run on a small thread pool instead of the event loop, so
+the API keeps serving (e.g. /personalized/status polling) during a batch.
+Requests reserve capacity up front for all the tasks they will submit; when
+the queue is full they are rejected at once (InferenceQueueFull) with an
+estimated retry delay instead of piling up.
+
+A reservation is returned only once the request is over *and* the work it
+submitted has finished: cancelling a coroutine awaiting run() does not stop a
+task the pool already started, so that task keeps its slot until it ends.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.config import INFERENCE_MAX_PENDING, INFERENCE_WORKERS
+
+
+class InferenceQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Inference queue full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Admission:
+    """Capacity reserved for one request (see InferenceExecutor.reserve)."""
+
+    def __init__(self, executor: "InferenceExecutor", tasks: int):
+        self.tasks = tasks
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._closing = False
+        self._released = False
+
+    async def run(self, fn, *args):
+        """Like InferenceExecutor.run, with the pool task counted against this admission."""
+        future = self._executor._submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        self._release_if_idle()
+
+    def release(self):
+        """Gives the capacity back as soon as no submitted task is queued or running; idempotent."""
+        with self._lock:
+            self._closing = True
+        self._release_if_idle()
+
+    def _release_if_idle(self):
+        with self._lock:
+            if not self._closing or self._pending or self._released:
+                return
+            self._released = True
+        self._executor._unreserve(self.tasks)
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int = INFERENCE_WORKERS, max_pending: int = INFERENCE_MAX_PENDING):
+        self.workers = max(workers, 1)
+        self.max_pending = max(max_pending, 1)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._reserved = 0
+        self._avg_task_seconds = 1.0
+
+    def retry_after(self) -> int:
+        """Rough seconds until the current backlog drains."""
+        with self._lock:
+            backlog = self._reserved
+        return max(1, math.ceil(backlog * self._avg_task_seconds / self.workers))
+
+    def reserve(self, tasks: int = 1) -> Admission:
+        """
+        Reserves room for `tasks` tasks, or raises InferenceQueueFull. The
+        caller must release() the admission (admit() does it on exit).
+        """
+        tasks = min(max(tasks, 1), self.max_pending)
+        with self._lock:
+            admitted = self._reserved + tasks <= self.max_pending
+            if admitted:
+                self._reserved += tasks
+        if not admitted:
+            raise InferenceQueueFull(self.retry_after())
+        return Admission(self, tasks)
+
+    @contextmanager
+    def admit(self, tasks: int = 1):
+        """Reserves room for `tasks` tasks for the duration of a request, or raises InferenceQueueFull."""
+        admission = self.reserve(tasks)
+        try:
+            yield admission
+        finally:
+            admission.release()
+
+    def _unreserve(self, tasks: int):
+        with self._lock:
+            self._reserved -= tasks
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._avg_task_seconds = 0.8 * self._avg_task_seconds + 0.2 * elapsed
+
+    def _submit(self, fn, *args):
+        return self._pool.submit(self._timed, fn, *args)
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on the inference pool without blocking the event loop."""
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "reserved": self._reserved,
+                "max_pending": self.max_pending,
+                "avg_task_seconds": round(self._avg_task_seconds, 3),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor()
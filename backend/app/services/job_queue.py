@@ -0,0 +1,186 @@
+"""
+Durable job queue on MongoDB (`db.jobs`).
+
+A job is claimed atomically with find_one_and_update and holds a lease
+(visibility timeout). Workers renew the lease with heartbeats; a job whose
+lease expires (worker died) becomes claimable again until max_attempts.
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.config import JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS
+from app.services.db import db
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+def ensure_job_indexes():
+    db.jobs.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+    db.jobs.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+    db.jobs.create_index([("dedupe_key", ASCENDING), ("status", ASCENDING)])
+    # At most one active job per dedupe_key, enforced by the server (partial $in needs MongoDB 6.0+)
+    db.jobs.create_index(
+        [("dedupe_key", ASCENDING)],
+        name="dedupe_key_active_unique",
+        unique=True,
+        partialFilterExpression={"dedupe_key": {"$type": "string"}, "status": {"$in": ACTIVE_STATUSES}}
+    )
+
+
+def _active_job_id(dedupe_key: str) -> str | None:
+    existing = db.jobs.find_one(
+        {"dedupe_key": dedupe_key, "status": {"$in": ACTIVE_STATUSES}},
+        {"_id": 1}
+    )
+    return str(existing["_id"]) if existing else None
+
+
+def enqueue_job(kind: str, payload: dict, dedupe_key: str | None = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+    """Queues a job. If an active job with the same dedupe_key exists, returns its id instead."""
+    if dedupe_key:
+        existing_id = _active_job_id(dedupe_key)
+        if existing_id:
+            return existing_id
+
+    now = datetime.utcnow()
+    job = {
+        "kind": kind,
+        "payload": payload,
+        "dedupe_key": dedupe_key,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "available_at": now,
+        "lease_expires_at": None,
+        "worker_id": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+    try:
+        result = db.jobs.insert_one(job)
+    except DuplicateKeyError:
+        # A concurrent request queued the same job between our check and insert
+        existing_id = _active_job_id(dedupe_key) if dedupe_key else None
+        if existing_id is None:
+            raise
+        return existing_id
+    return str(result.inserted_id)
+
+
+def claim_job(worker_id: str, kinds: list[str] | None = None, lease_seconds: int = JOB_LEASE_SECONDS):
+    """
+    Atomically claims the oldest runnable job: a queued job that is due, or a
+    running job whose lease expired (its worker stopped heartbeating).
+    """
+    now = datetime.utcnow()
+    query = {
+        "$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lt": now}}
+        ],
+        "$expr": {"$lt": ["$attempts", "$max_attempts"]}
+    }
+    if kinds:
+        query["kind"] = {"$in": kinds}
+
+    return db.jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "heartbeat_at": now,
+                "started_at": now,
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("available_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def heartbeat(job_id, worker_id: str, lease_seconds: int = JOB_LEASE_SECONDS) -> bool:
+    """Extends the lease. Returns False if this worker no longer owns the job."""
+    now = datetime.utcnow()
+    result = db.jobs.update_one(
+        {"_id": ObjectId(job_id), "worker_id": worker_id, "status": "running"},
+        {"$set": {
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "heartbeat_at": now,
+            "updated_at": now
+        }}
+    )
+    return result.matched_count == 1
+
+
+def complete_job(job_id, worker_id: str, result=None) -> bool:
+    now = datetime.utcnow()
+    res = db.jobs.update_one(
+        {"_id": ObjectId(job_id), "worker_id": worker_id, "status": "running"},
+        {"$set": {
+            "status": "completed",
+            "result": result,
+            "lease_expires_at": None,
+            "finished_at": now,
+            "updated_at": now
+        }}
+    )
+    return res.matched_count == 1
+
+
+def fail_job(job_id, worker_id: str, error: str, retry_delay_seconds: int = 10, retry: bool = True) -> str | None:
+    """
+    Records a failure. The job is re-queued with a backoff while attempts remain
+    (and retry is set), otherwise it is marked failed. Returns the new status
+    (None if not owned).
+    """
+    job = db.jobs.find_one({"_id": ObjectId(job_id), "worker_id": worker_id, "status": "running"})
+    if not job:
+        return None
+
+    now = datetime.utcnow()
+    if retry and job["attempts"] < job["max_attempts"]:
+        update = {
+            "status": "queued",
+            "available_at": now + timedelta(seconds=retry_delay_seconds * job["attempts"]),
+        }
+    else:
+        update = {"status": "failed", "finished_at": now}
+
+    update.update({"error": error, "lease_expires_at": None, "worker_id": None, "updated_at": now})
+    db.jobs.update_one({"_id": job["_id"], "worker_id": worker_id}, {"$set": update})
+    return update["status"]
+
+
+def reap_expired_jobs() -> list[dict]:
+    """Marks jobs whose lease expired on their last attempt as failed. Returns those jobs."""
+    now = datetime.utcnow()
+    query = {
+        "status": "running",
+        "lease_expires_at": {"$lt": now},
+        "$expr": {"$gte": ["$attempts", "$max_attempts"]}
+    }
+    expired = list(db.jobs.find(query, {"kind": 1, "payload": 1}))
+    if expired:
+        db.jobs.update_many(
+            {"_id": {"$in": [job["_id"] for job in expired]}, **query},
+            {"$set": {
+                "status": "failed",
+                "error": "Lease expired (worker stopped responding)",
+                "lease_expires_at": None,
+                "finished_at": now,
+                "updated_at": now
+            }}
+        )
+    return expired
+
+
+def get_job(job_id: str):
+    return db.jobs.find_one({"_id": ObjectId(job_id)})
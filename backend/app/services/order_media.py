@@ -0,0 +1,25 @@
+"""
+Media URLs stored on orders. The content stores that hand out kept copies
+(swap results, SDXL images, narration) use order_media_urls to collect the
+copies no order references any more.
+"""
+
+import re
+
+from app.services.db import db
+
+PAGE_MEDIA_FIELDS = ("image_url", "narration_url")
+ORDER_MEDIA_FIELDS = ("map_image_url",)
+
+
+def order_media_urls(prefix: str) -> set:
+    """Every media URL under `prefix` that some order still stores."""
+    pattern = {"$regex": f"^{re.escape(prefix)}/"}
+    fields = [f"generated_pages.{field}" for field in PAGE_MEDIA_FIELDS] + list(ORDER_MEDIA_FIELDS)
+
+    urls = set()
+    for order in db.orders.find({"$or": [{field: pattern} for field in fields]}, {field: 1 for field in fields}):
+        for page in order.get("generated_pages") or []:
+            urls.update(page.get(field) for field in PAGE_MEDIA_FIELDS)
+        urls.update(order.get(field) for field in ORDER_MEDIA_FIELDS)
+    return {url for url in urls if isinstance(url, str) and url.startswith(f"{prefix}/")}
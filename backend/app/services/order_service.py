@@ -1,11 +1,16 @@
+import asyncio
 from app.services.db import db
 from datetime import datetime
 from bson import ObjectId
 from bson.errors import InvalidId
 from app.services.story_service import generate_story
-from app.services.image_service import generate_image
+from app.services.image_service import PLACEHOLDER_IMAGE_URL
+from app.services.sdxl_client import SDXLClient
+from app.services.audio_service import generate_audio
+from app.config import NARRATION_CONCURRENCY
 from app.services.pdf_service import generate_pdf
 from app.services.story_service import extract_locations
+from app.services.checkpoint_service import PageCheckpoints, page_input_hash
 
 # --------------------------------------------------
 # CREATE ORDER
@@ -75,70 +80,121 @@ def generate_story_for_order(order_id):
 # GENERATE ALL PAGE IMAGES & NARRATION
 # --------------------------------------------------
 def generate_full_book(order_id):
+    """Sync entry point (worker / scripts): runs the async pipeline on one event loop."""
+    return asyncio.run(generate_full_book_async(order_id))
+
+
+async def _narrate(text, language, semaphore, page_number):
+    async with semaphore:
+        try:
+            return await generate_audio(text, language)
+        except Exception as e:
+            print(f"[OrderService] Narration failed for page {page_number}: {e}")
+            return None
+
+
+async def generate_full_book_async(order_id):
+    """
+    Generates every page's image and narration concurrently on a single event loop.
+    Each page is written as soon as both of its parts are ready, so wall time is
+    roughly the slowest page instead of the sum of all pages.
+    """
     try:
-        order = db.orders.find_one({"_id": ObjectId(order_id)})
+        oid = ObjectId(order_id)
     except InvalidId:
         return None
 
+    order = await asyncio.to_thread(db.orders.find_one, {"_id": oid})
     if not order or not order.get("story"):
         return None
 
     pages = order["story"].get("pages", [])
-    generated_pages = []
     language = order.get("language", "English")
 
-    for page in pages:
-        page_number = page.get("page_number")
-        text = page.get("text")
-        
-        # Use image_prompt if available (more detailed), otherwise fallback to page text
-        prompt = page.get("image_prompt") or text
-
-        if not prompt:
-            continue
-
-        # Generate Image
-        image_url = generate_image(prompt)
-        
-        # Generate Narration
-        narration_url = None
-        if text:
-            try:
-                narration_url = generate_narration_sync(text, language)
-            except Exception as e:
-                print(f"[OrderService] Narration failed for page {page_number}: {e}")
-
-        if image_url:
-            generated_pages.append({
-                "page_number": page_number,
-                "image_url": image_url,
-                "narration_url": narration_url
-            })
-
-    # 🗺️ Step 2.5: Generate Quest Map Image
-    map_image_url = None
+    # Each page is checkpointed as soon as it is done; a rerun only
+    # regenerates pages that are missing or whose text/prompt changed.
+    input_hashes = {
+        page.get("page_number"): page_input_hash(
+            page.get("text"),
+            page.get("image_prompt") or page.get("text"),
+            language
+        )
+        for page in pages
+    }
+    checkpoints = PageCheckpoints(order, input_hashes)
+    await asyncio.to_thread(checkpoints.flush)
+
+    # Use image_prompt if available (more detailed), otherwise fallback to page text
+    pending = [
+        page for page in pages
+        if not checkpoints.is_done(page.get("page_number"))
+        and (page.get("image_prompt") or page.get("text"))
+    ]
+
+    # 🗺️ Quest Map Image (generated alongside the pages)
+    map_image_url = order.get("map_image_url") if order.get("locations") else None
     locations = order.get("locations", [])
-    if locations:
-        loc_str = " -> ".join(locations)
-        map_prompt = f"A whimsical hand-drawn children's treasure map showing a magical journey through: {loc_str}. Ancient paper texture, dotted paths, cute icons for each place, watercolor style, very detailed and magical."
-        try:
-            map_image_url = generate_image(map_prompt)
-        except Exception as e:
-            print(f"[OrderService] Map generation failed: {e}")
-
-    db.orders.update_one(
-        {"_id": ObjectId(order_id)},
+    map_input_hash = page_input_hash(locations)
+    needs_map = bool(locations) and not (map_image_url and order.get("map_input_hash") == map_input_hash)
+
+    narration_semaphore = asyncio.Semaphore(NARRATION_CONCURRENCY)
+
+    async with SDXLClient() as image_client:
+
+        async def build_page(page):
+            page_number = page.get("page_number")
+            text = page.get("text")
+            prompt = page.get("image_prompt") or text
+
+            # Image and narration for the page run at the same time
+            narration = _narrate(text, language, narration_semaphore, page_number) if text else asyncio.sleep(0)
+            image_url, narration_url = await asyncio.gather(image_client.generate(prompt), narration)
+
+            if image_url:
+                # Placeholder images / missing narration are kept but retried next run
+                await asyncio.to_thread(
+                    checkpoints.save,
+                    {
+                        "page_number": page_number,
+                        "image_url": image_url,
+                        "narration_url": narration_url
+                    },
+                    None,
+                    image_url != PLACEHOLDER_IMAGE_URL and bool(narration_url or not text)
+                )
+
+        async def build_map():
+            loc_str = " -> ".join(locations)
+            map_prompt = f"A whimsical hand-drawn children's treasure map showing a magical journey through: {loc_str}. Ancient paper texture, dotted paths, cute icons for each place, watercolor style, very detailed and magical."
+            url = await image_client.generate(map_prompt)
+            if url == PLACEHOLDER_IMAGE_URL:
+                print("[OrderService] Map generation failed")
+                return None
+            return url
+
+        tasks = [build_page(page) for page in pending]
+        if needs_map:
+            tasks.append(build_map())
+
+        results = await asyncio.gather(*tasks)
+
+    if needs_map:
+        map_image_url = results[-1]
+
+    await asyncio.to_thread(
+        db.orders.update_one,
+        {"_id": oid},
         {
             "$set": {
-                "generated_pages": generated_pages,
                 "map_image_url": map_image_url, # 🗺️ Store map image
+                "map_input_hash": map_input_hash if map_image_url else None,
                 "status": "images_generated",
                 "updated_at": datetime.utcnow()
             }
         }
     )
 
-    return generated_pages
+    return checkpoints.sorted_pages()
 
 
 # --------------------------------------------------
@@ -169,4 +225,27 @@ def generate_pdf_for_order(order_id):
         }
     )
 
-    return pdf_url
\ No newline at end of file
+    return pdf_url
+
+
+# --------------------------------------------------
+# FULL PIPELINE (run by the worker, see worker.py)
+# --------------------------------------------------
+def generate_book_pipeline(order_id):
+    """Story → page images & narration → PDF. Raises so the job can be retried."""
+    order = db.orders.find_one({"_id": ObjectId(order_id)}, {"story": 1})
+    if not order:
+        raise ValueError(f"Order not found: {order_id}")
+
+    # A retried job keeps the story written by the previous attempt
+    story = order.get("story") or generate_story_for_order(order_id)
+    if not story or not story.get("pages"):
+        raise RuntimeError("Story generation failed or returned empty pages")
+
+    generate_full_book(order_id)
+
+    pdf_url = generate_pdf_for_order(order_id)
+    if not pdf_url:
+        raise RuntimeError("PDF generation failed")
+
+    return pdf_url
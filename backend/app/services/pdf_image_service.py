@@ -0,0 +1,80 @@
+"""
+Image preparation for PDF embedding.
+
+Page images (1024² SDXL renders, 768×1376 templates, swap outputs) are
+cover-cropped to the panel's aspect ratio, downscaled to the target DPI and
+re-encoded as JPEG, which reportlab embeds as-is (DCTDecode). Results are
+content-addressed by source hash + output settings, and because the same
+prepared file is always drawn by the same path, reportlab embeds a photo
+that appears on several pages only once per document.
+"""
+
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from app.config import PDF_IMAGE_CACHE_MAX_MB, PDF_IMAGE_DPI, PDF_JPEG_QUALITY
+from app.services.content_store import ContentStore, content_key, file_sha256
+
+# Bump when the crop/resize/encode steps change
+PREPARE_VERSION = "v1"
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+pdf_image_cache = ContentStore(
+    "pdf_images",
+    BACKEND_ROOT / "generated_images" / "pdf_cache",
+    "/generated_images/pdf_cache",
+    max_bytes=PDF_IMAGE_CACHE_MAX_MB * 1024 * 1024
+)
+
+
+def panel_pixels(width_pt: float, height_pt: float, dpi: int) -> tuple[int, int]:
+    return max(round(width_pt / 72 * dpi), 1), max(round(height_pt / 72 * dpi), 1)
+
+
+def _crop_and_resize(img: Image.Image, width: int, height: int) -> Image.Image:
+    """Centre-crops to width:height, then downscales (never upscales) to fit."""
+    target_ratio = width / height
+    src_w, src_h = img.size
+    if src_w / src_h > target_ratio:
+        crop_w = round(src_h * target_ratio)
+        left = (src_w - crop_w) // 2
+        img = img.crop((left, 0, left + crop_w, src_h))
+    else:
+        crop_h = round(src_w / target_ratio)
+        top = (src_h - crop_h) // 2
+        img = img.crop((0, top, src_w, top + crop_h))
+
+    if img.width > width:
+        img = img.resize((width, height), Image.LANCZOS)
+    return img
+
+
+def prepare_image(
+    image_path: str,
+    width_pt: float,
+    height_pt: float,
+    dpi: int = PDF_IMAGE_DPI,
+    quality: int = PDF_JPEG_QUALITY,
+) -> str | None:
+    """Local path of a JPEG prepared for a width_pt × height_pt panel, or None if the source is missing."""
+    if not image_path or not os.path.exists(image_path):
+        return None
+
+    width, height = panel_pixels(width_pt, height_pt, dpi)
+    key = content_key(file_sha256(image_path), width, height, quality, PREPARE_VERSION)
+    cached_path = pdf_image_cache.lookup(key, ".jpg")
+    if cached_path:
+        return str(cached_path)
+
+    with Image.open(image_path) as img:
+        prepared = _crop_and_resize(img.convert("RGB"), width, height)
+
+    tmp_path = pdf_image_cache.temp_path(".jpg")
+    try:
+        prepared.save(tmp_path, "JPEG", quality=quality, optimize=True)
+        pdf_image_cache.commit(key, ".jpg", tmp_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return str(pdf_image_cache.path_for(key, ".jpg"))
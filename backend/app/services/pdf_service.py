@@ -5,11 +5,20 @@ from reportlab.lib.colors import HexColor, white, Color
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from PIL import Image
+from pathlib import Path
 import os
 import uuid
+from functools import lru_cache
 import textwrap
 import io
 
+from pypdf import PdfWriter
+
+from app.config import PDF_IMAGE_DPI, PDF_JPEG_QUALITY, PDF_PAGE_CACHE_MAX_MB
+from app.services.content_store import ContentStore, content_key, file_sha256
+from app.services.pdf_image_service import PREPARE_VERSION, prepare_image
+from app.services.template_service import resolve_order_story
+
 
 # ── PAGE SETUP ──────────────────────────────────────────────────────────────
 PAGE_W, PAGE_H = landscape(A4)   # 841.9 x 595.3 pt
@@ -23,6 +32,10 @@ LEFT_BG = HexColor("#12102a")
 RIGHT_START = LEFT_W + SPINE_W
 RIGHT_W = PAGE_W - LEFT_W - SPINE_W
 RIGHT_BG = HexColor("#fffef9")
+BOTTOM_BAR_H = 32
+
+# Form XObject holding the static right-panel background (see define_page_forms)
+TEXT_PANEL_FORM = "TextPanelBackground"
 
 # Accent / decoration colours
 ACCENT_GOLD = HexColor("#f59e0b")
@@ -31,6 +44,37 @@ TEXT_COLOR = HexColor("#374151")
 PAGE_NUM_COLOR = HexColor("#9ca3af")
 QUOTE_COLOR = HexColor("#e5e7eb")
 
+# Local roots for image URLs stored on orders
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+FRONTEND_PUBLIC_DIR = BACKEND_ROOT.parent / "frontend" / "public"
+
+# Bump whenever page drawing changes so cached page fragments are re-rendered
+LAYOUT_VERSION = "v1"
+page_fragment_cache = ContentStore(
+    "pdf_pages",
+    BACKEND_ROOT / "generated_pdfs" / "pages",
+    "/generated_pdfs/pages",
+    max_bytes=PDF_PAGE_CACHE_MAX_MB * 1024 * 1024
+)
+
+
+def _resolve_image_path(image_url):
+    """
+    Map a stored image URL to a local file path.
+      /defaults/<template_id>/page-N.png → frontend/public/defaults/...
+      /generated_images/...              → backend/generated_images/...
+    """
+    if not image_url:
+        return ""
+
+    relative = image_url.replace("\\", "/").lstrip("/")
+    root = FRONTEND_PUBLIC_DIR if relative.startswith("defaults/") else BACKEND_ROOT
+
+    candidate = (root / relative).resolve()
+    if not str(candidate).startswith(str(root.resolve())):
+        return ""
+    return str(candidate)
+
 
 def _draw_rounded_rect(c, x, y, w, h, r, fill_color, stroke_color=None):
     """Draw a filled rounded rectangle (approximated with clipping path)."""
@@ -65,8 +109,11 @@ def _draw_corner_brackets(c, x, y, w, h, size=14, lw=1.2):
     c.restoreState()
 
 
-def _draw_image_panel(c, image_path, page_number, total_pages):
-    """Draw the left dark panel with the portrait image centred in 9:16 ratio."""
+def _draw_image_panel(c, image_path, page_number, total_pages, image_dpi=PDF_IMAGE_DPI):
+    """
+    Draw the left dark panel with the portrait image centred in 9:16 ratio.
+    The image is cropped/downscaled to image_dpi first (falsy → embed the original).
+    """
     # Background
     c.saveState()
     c.setFillColor(LEFT_BG)
@@ -86,7 +133,9 @@ def _draw_image_panel(c, image_path, page_number, total_pages):
 
     if image_path and os.path.exists(image_path):
         try:
-            img_reader = ImageReader(image_path)
+            prepared_path = prepare_image(image_path, img_w, img_h, dpi=image_dpi) if image_dpi else None
+            # Prepared JPEGs are drawn by path so repeats share one embedded image
+            img_reader = prepared_path or ImageReader(image_path)
             # Rounded clip mask (approximate with a path)
             c.saveState()
             p = c.beginPath()
@@ -138,26 +187,52 @@ def _draw_image_panel(c, image_path, page_number, total_pages):
         c.restoreState()
 
 
-def _wrap_text(text, font_name, font_size, max_width, c_obj):
-    """Wrap text to fit max_width, returns list of lines."""
-    words = text.split()
+# Cumulative widths within this distance of the limit are re-measured exactly,
+# so line breaks match measuring the whole trial string
+WRAP_EXACT_EPSILON = 1e-6
+
+
+@lru_cache(maxsize=8192)
+def _word_width(word, font_name, font_size):
+    return pdfmetrics.stringWidth(word, font_name, font_size)
+
+
+@lru_cache(maxsize=2048)
+def _wrap_lines(text, font_name, font_size, max_width):
+    space_w = _word_width(" ", font_name, font_size)
     lines = []
-    current = ""
-    for word in words:
-        trial = f"{current} {word}".strip()
-        if c_obj.stringWidth(trial, font_name, font_size) <= max_width:
-            current = trial
+    current = []
+    current_w = 0.0
+    for word in text.split():
+        word_w = _word_width(word, font_name, font_size)
+        trial_w = current_w + space_w + word_w if current else word_w
+        if abs(trial_w - max_width) <= WRAP_EXACT_EPSILON:
+            trial_w = pdfmetrics.stringWidth(" ".join(current + [word]), font_name, font_size)
+
+        if trial_w <= max_width:
+            current.append(word)
+            current_w = trial_w
         else:
             if current:
-                lines.append(current)
-            current = word
+                lines.append(" ".join(current))
+            current = [word]
+            current_w = word_w
     if current:
-        lines.append(current)
-    return lines
+        lines.append(" ".join(current))
+    return tuple(lines)
 
 
-def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
-    """Draw the right warm paper panel with styled story text."""
+def _wrap_text(text, font_name, font_size, max_width):
+    """
+    Wrap text to fit max_width, returns list of lines.
+    Greedy breaking on per-word widths (measured once per font) instead of
+    re-measuring the growing line; results are memoized per (text, font, size, width).
+    """
+    return list(_wrap_lines(text, font_name, font_size, max_width))
+
+
+def _draw_text_panel_background(c):
+    """Static parts of the right panel: paper, dot texture, spine, quote mark, bottom bar."""
     rx = RIGHT_START
     rw = RIGHT_W
 
@@ -189,6 +264,38 @@ def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
     c.drawString(rx + 28, PAGE_H - 60, "\u201c")  # left double quote
     c.restoreState()
 
+    # ── Bottom bar ── (story text stops above it, so it can sit underneath)
+    c.saveState()
+    c.setFillColor(HexColor("#f5f0e8"))
+    c.rect(rx, 0, rw, BOTTOM_BAR_H, fill=1, stroke=0)
+
+    # Divider line
+    c.setStrokeColor(HexColor("#e5e7eb"))
+    c.setLineWidth(0.5)
+    c.line(rx + 20, BOTTOM_BAR_H, rx + rw - 20, BOTTOM_BAR_H)
+    c.restoreState()
+
+
+def define_page_forms(c):
+    """Records the static text-panel background once per document as a Form XObject."""
+    if c.hasForm(TEXT_PANEL_FORM):
+        return
+    c.beginForm(TEXT_PANEL_FORM)
+    _draw_text_panel_background(c)
+    c.endForm()
+
+
+def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
+    """Draw the right warm paper panel with styled story text."""
+    rx = RIGHT_START
+    rw = RIGHT_W
+
+    # Background: one shared XObject reference when defined, else drawn inline
+    if c.hasForm(TEXT_PANEL_FORM):
+        c.doForm(TEXT_PANEL_FORM)
+    else:
+        _draw_text_panel_background(c)
+
     # ── Story text ──
     text_x = rx + 36
     text_w = rw - 72
@@ -196,7 +303,7 @@ def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
     font_size = 13
     line_height = font_size * 1.85
 
-    lines = _wrap_text(text or "End of story. ✨", font_name, font_size, text_w, c)
+    lines = _wrap_text(text or "End of story. ✨", font_name, font_size, text_w)
 
     # Vertically centre the text block
     block_h = len(lines) * line_height
@@ -217,16 +324,8 @@ def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
         c.drawString(rx + (rw - line_w) / 2, y, line)
     c.restoreState()
 
-    # ── Bottom bar ──
-    bar_h = 32
+    # ── Bottom bar text ──
     c.saveState()
-    c.setFillColor(HexColor("#f5f0e8"))
-    c.rect(rx, 0, rw, bar_h, fill=1, stroke=0)
-
-    # Divider line
-    c.setStrokeColor(HexColor("#e5e7eb"))
-    c.setLineWidth(0.5)
-    c.line(rx + 20, bar_h, rx + rw - 20, bar_h)
 
     # Page number (right-aligned)
     c.setFillColor(PAGE_NUM_COLOR)
@@ -244,43 +343,124 @@ def _draw_text_panel(c, text, page_number, total_pages, template_title=""):
 
 # ────────────────────────────────────────────────────────────────────────────
 
-def generate_pdf(order):
+def book_layout(order):
     """
-    Generates a premium children's book PDF.
-    Layout: Landscape A4 two-page spread
-      • Left  half: dark panel with 9:16 portrait illustration
-      • Right half: warm paper panel with centred serif story text
+    (specs, total_pages, template_title) for an order, where each spec is
+    (page_number, text, local image path) with template text as fallback.
     """
-    os.makedirs("generated_pdfs", exist_ok=True)
-
-    unique_name = f"{uuid.uuid4()}.pdf"
-    local_path = os.path.join("generated_pdfs", unique_name)
-
-    c = canvas.Canvas(local_path, pagesize=landscape(A4))
-
     pages_data = order.get("generated_pages", [])
-    story_pages = order.get("story", {}).get("pages", [])
-    template_title = order.get("story", {}).get("title", "")
-    total_pages = len(pages_data)
+    story = resolve_order_story(order)
+    story_pages = story.get("pages", [])
 
+    specs = []
     for idx, page in enumerate(pages_data):
         page_number = page.get("page_number", idx + 1)
-        image_url = page.get("image_url", "")
-        local_image_path = image_url.lstrip("/") if image_url else ""
+        local_image_path = _resolve_image_path(page.get("image_url", ""))
 
         # Fallback text from story pages
         story_text = page.get("text", "")
         if not story_text and page_number - 1 < len(story_pages):
             story_text = story_pages[page_number - 1].get("text", "")
 
-        # Draw left image panel
-        _draw_image_panel(c, local_image_path, page_number, total_pages)
+        specs.append((page_number, story_text, local_image_path))
+    return specs, len(specs), story.get("title", "")
+
+
+def _draw_page(c, spec, total_pages, template_title, image_dpi):
+    page_number, story_text, local_image_path = spec
+
+    # Draw left image panel
+    _draw_image_panel(c, local_image_path, page_number, total_pages, image_dpi)
+
+    # Draw right text panel
+    _draw_text_panel(c, story_text, page_number, total_pages, template_title)
+
+    c.showPage()
+
+
+def page_fragment_key(spec, total_pages, template_title, image_dpi):
+    page_number, story_text, local_image_path = spec
+    image_hash = file_sha256(local_image_path) if local_image_path and os.path.exists(local_image_path) else ""
+    # The embedded image also depends on how prepare_image encodes it
+    return content_key(
+        LAYOUT_VERSION, story_text, image_hash, template_title, page_number, total_pages, image_dpi,
+        PDF_JPEG_QUALITY, PREPARE_VERSION
+    )
+
 
-        # Draw right text panel
-        _draw_text_panel(c, story_text, page_number, total_pages, template_title)
+def render_page_fragment(spec, total_pages, template_title, image_dpi=PDF_IMAGE_DPI):
+    """Path of a cached single-page PDF for this page, rendering it on a miss."""
+    key = page_fragment_key(spec, total_pages, template_title, image_dpi)
+    cached_path = page_fragment_cache.lookup(key, ".pdf")
+    if cached_path:
+        return cached_path
 
-        c.showPage()
+    tmp_path = page_fragment_cache.temp_path(".pdf")
+    try:
+        c = canvas.Canvas(str(tmp_path), pagesize=landscape(A4))
+        define_page_forms(c)
+        _draw_page(c, spec, total_pages, template_title, image_dpi)
+        c.save()
+        page_fragment_cache.commit(key, ".pdf", tmp_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return page_fragment_cache.path_for(key, ".pdf")
 
+
+def assemble_pdf(fragment_paths, output_path):
+    """Concatenates single-page fragments; backgrounds, fonts and images repeated across them are stored once."""
+    writer = PdfWriter()
+    for fragment_path in fragment_paths:
+        writer.append(str(fragment_path))
+    # Each pass folds one level of the per-fragment resource tree
+    # (fonts → font dict → background form), so three passes share them all
+    for _ in range(3):
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+def _new_pdf_path():
+    os.makedirs("generated_pdfs", exist_ok=True)
+    unique_name = f"{uuid.uuid4()}.pdf"
+    return os.path.join("generated_pdfs", unique_name), f"/generated_pdfs/{unique_name}"
+
+
+def assemble_book(fragment_paths):
+    """Merges rendered page fragments into a new book PDF and returns its URL."""
+    local_path, pdf_url = _new_pdf_path()
+    assemble_pdf(fragment_paths, local_path)
+    print(f"[PDFService] Premium PDF saved: {local_path}")
+    return pdf_url
+
+
+def generate_pdf(order, use_forms=True, image_dpi=PDF_IMAGE_DPI, incremental=True):
+    """
+    Generates a premium children's book PDF.
+    Layout: Landscape A4 two-page spread
+      • Left  half: dark panel with 9:16 portrait illustration
+      • Right half: warm paper panel with centred serif story text
+    The static right-panel background is stored once and referenced from
+    every page (use_forms=False draws it inline on each page instead).
+    Images are embedded as JPEGs prepared for image_dpi (150 screen / 300 print).
+
+    With incremental=True each page is a cached single-page PDF keyed by its
+    content and LAYOUT_VERSION, so only changed pages are re-rendered before
+    the merge; incremental=False draws the whole book on one canvas.
+    """
+    specs, total_pages, template_title = book_layout(order)
+
+    if incremental:
+        fragments = [render_page_fragment(spec, total_pages, template_title, image_dpi) for spec in specs]
+        return assemble_book(fragments)
+
+    local_path, pdf_url = _new_pdf_path()
+    c = canvas.Canvas(local_path, pagesize=landscape(A4))
+    if use_forms:
+        define_page_forms(c)
+    for spec in specs:
+        _draw_page(c, spec, total_pages, template_title, image_dpi)
     c.save()
+
     print(f"[PDFService] Premium PDF saved: {local_path}")
-    return f"/generated_pdfs/{unique_name}"
\ No newline at end of file
+    return pdf_url
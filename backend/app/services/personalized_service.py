@@ -1,9 +1,83 @@
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bson import ObjectId
 from datetime import datetime
+from app.config import PAGE_WORKERS
 from app.services.db import db
-from app.services.image_service import generate_image, generate_personalized_image
+from app.services.image_service import (
+    PLACEHOLDER_IMAGE_URL,
+    generate_image,
+    generate_personalized_image,
+    get_source_face,
+    swap_result_cache,
+    template_image_hash,
+)
+from app.services.face_cache import serialize_face, deserialize_face
+from app.services.checkpoint_service import PageCheckpoints, page_input_hash
 from app.services.pdf_service import generate_pdf
+from app.services.template_service import resolve_order_story
+
+
+def _render_page(page: dict, hero_name: str, face_image_path: str | None, source_face) -> dict | None:
+    """Renders one page (face swap or plain generation). Runs on a page worker thread."""
+    page_number = page.get("page_number")
+    base_image_path = page.get("base_image_path")
+
+    # Replace HERO in text + prompt
+    personalized_text = re.sub(
+        r"\[HERO\]",
+        hero_name,
+        page.get("text", ""),
+        flags=re.IGNORECASE
+    )
+
+    prompt = re.sub(
+        r"\[HERO\]",
+        hero_name,
+        page.get("image_prompt", ""),
+        flags=re.IGNORECASE
+    )
+
+    image_url = None
+    face_swapped = False
+
+    try:
+        # If face + template available → do face swap
+        if face_image_path and base_image_path:
+            image_url, face_swapped = generate_personalized_image(
+                prompt=prompt,
+                face_image_path=face_image_path,
+                base_image_path=base_image_path,
+                source_face=source_face
+            )
+
+        # Otherwise fallback to normal image generation
+        else:
+            image_url = generate_image(prompt)
+            face_swapped = False
+
+    except Exception as e:
+        print(f"[PersonalizedService] ❌ Page {page_number} error: {e}")
+        return None
+
+    if not image_url:
+        print(f"[PersonalizedService] ⚠ Page {page_number} returned empty image")
+        return None
+
+    print(
+        f"[PersonalizedService] Page {page_number} done — "
+        f"{'✅ face swap' if face_swapped else '🖼 base image'}"
+    )
+
+    return {
+        "page_number": page_number,
+        "text": personalized_text,
+        "image_url": image_url,
+        "face_swapped": face_swapped,
+        # Placeholders and unswapped template pages (no face, models missing,
+        # swap error) are shown but retried on the next run
+        "fallback": image_url == PLACEHOLDER_IMAGE_URL or bool(face_image_path and base_image_path and not face_swapped)
+    }
 
 
 def generate_full_personalized_book(order_id: str):
@@ -12,7 +86,7 @@ def generate_full_personalized_book(order_id: str):
     For each page:
       - Replace [HERO] with hero_name
       - Perform face swap using base template image
-      - Store result in DB
+      - Store result in DB (checkpointed; reruns skip unchanged pages)
       - Track progress
     Finally:
       - Generate PDF
@@ -23,120 +97,94 @@ def generate_full_personalized_book(order_id: str):
     # 1️⃣ Fetch Order
     # --------------------------------------------------
     order = db.orders.find_one({"_id": ObjectId(order_id)})
-    if not order or order.get("type") != "personalized":
-        return None
+    if not order:
+        raise ValueError(f"Order not found: {order_id}")
+    if order.get("type") != "personalized":
+        raise ValueError(f"Order {order_id} is not a personalized order")
 
-    template = order.get("story", {})
+    template = resolve_order_story(order)
     pages = template.get("pages", [])
     hero_name = order.get("hero_name", "Hero")
     face_image_path = order.get("face_image_path")
 
     if not pages:
-        return None
+        raise ValueError(f"Template {order.get('template_id')} has no pages")
 
     total_pages = len(pages)
 
-    # --------------------------------------------------
-    # 2️⃣ Reset state before starting
-    # --------------------------------------------------
-    db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {
-            "$set": {
-                "status": "generating",
-                "progress": 0,
-                "generated_pages": [],
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
+    # Child face is detected once per order (normally at upload time)
+    source_face_data = order.get("source_face")
+    source_face = deserialize_face(source_face_data)
+    if source_face is None and face_image_path:
+        try:
+            source_face, photo_hash = get_source_face(face_image_path)
+            if source_face is not None:
+                source_face_data = serialize_face(source_face, photo_hash)
+                db.orders.update_one(
+                    {"_id": ObjectId(order_id)},
+                    {"$set": {"source_face": source_face_data}}
+                )
+        except Exception as e:
+            print(f"[PersonalizedService] Source face detection failed: {e}")
 
     # --------------------------------------------------
-    # 3️⃣ Generate Pages
+    # 2️⃣ Resume from checkpoints
     # --------------------------------------------------
-    for i, page in enumerate(pages):
-
-        page_number = page.get("page_number")
-        base_image_path = page.get("base_image_path")
-
-        # Replace HERO in text + prompt
-        personalized_text = re.sub(
-            r"\[HERO\]",
+    # A page is reused when its inputs (text, prompt, template image, hero,
+    # child photo) are unchanged; only missing or stale pages are rendered.
+    face_key = (source_face_data or {}).get("photo_hash") or face_image_path
+    input_hashes = {
+        page.get("page_number"): page_input_hash(
+            page.get("text"),
+            page.get("image_prompt"),
+            # Template PNG content, so replacing the image re-renders the page
+            template_image_hash(page.get("base_image_path")) or page.get("base_image_path"),
             hero_name,
-            page.get("text", ""),
-            flags=re.IGNORECASE
+            face_key
         )
+        for page in pages
+    }
+    checkpoints = PageCheckpoints(order, input_hashes)
+    pending = [page for page in pages if not checkpoints.is_done(page.get("page_number"))]
+    completed = total_pages - len(pending)
 
-        prompt = re.sub(
-            r"\[HERO\]",
-            hero_name,
-            page.get("image_prompt", ""),
-            flags=re.IGNORECASE
-        )
-
-        image_url = None
-        face_swapped = False
+    if completed:
+        print(f"[PersonalizedService] Resuming order {order_id}: {completed}/{total_pages} pages reused")
 
-        try:
-            # If face + template available → do face swap
-            if face_image_path and base_image_path:
-                image_url = generate_personalized_image(
-                    prompt=prompt,
-                    face_image_path=face_image_path,
-                    base_image_path=base_image_path
-                )
-                face_swapped = True
+    checkpoints.flush({
+        "status": "generating",
+        "progress": int((completed / total_pages) * 90)
+    })
 
-            # Otherwise fallback to normal image generation
-            else:
-                image_url = generate_image(prompt)
-                face_swapped = False
-
-        except Exception as e:
-            print(f"[PersonalizedService] ❌ Page {page_number} error: {e}")
-            continue
-
-        if not image_url:
-            print(f"[PersonalizedService] ⚠ Page {page_number} returned empty image")
-            continue
-
-        # --------------------------------------------------
-        # Save page to DB immediately
-        # --------------------------------------------------
-        db.orders.update_one(
-            {"_id": ObjectId(order_id)},
-            {
-                "$push": {
-                    "generated_pages": {
-                        "page_number": page_number,
-                        "text": personalized_text,
-                        "image_url": image_url,
-                        "face_swapped": face_swapped
-                    }
-                }
-            }
-        )
-
-        # --------------------------------------------------
-        # Update progress (0–90%)
-        # --------------------------------------------------
-        progress = int(((i + 1) / total_pages) * 90)
-
-        db.orders.update_one(
-            {"_id": ObjectId(order_id)},
-            {
-                "$set": {
-                    "progress": progress,
-                    "status": "generating",
-                    "updated_at": datetime.utcnow()
-                }
+    # --------------------------------------------------
+    # 3️⃣ Generate Pages (bounded worker pool)
+    # --------------------------------------------------
+    # Pages finish out of order: checkpoints keep generated_pages sorted by
+    # page_number and progress counts finished pages rather than the loop index.
+    workers = max(1, min(PAGE_WORKERS, len(pending) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page") as executor:
+        futures = [
+            executor.submit(_render_page, page, hero_name, face_image_path, source_face)
+            for page in pending
+        ]
+
+        for future in as_completed(futures):
+            completed += 1
+            generated_page = future.result()
+
+            # --------------------------------------------------
+            # Save page + progress (0–90%) to DB immediately
+            # --------------------------------------------------
+            progress = {
+                "progress": int((completed / total_pages) * 90),
+                "status": "generating"
             }
-        )
-
-        print(
-            f"[PersonalizedService] Page {page_number}/{total_pages} done — "
-            f"{'✅ face swap' if face_swapped else '🖼 base image'}"
-        )
+            if generated_page:
+                fallback = generated_page.pop("fallback")
+                checkpoints.save(generated_page, progress, complete=not fallback)
+            else:
+                checkpoints.flush(progress)
 
     # --------------------------------------------------
     # 4️⃣ Generate PDF
@@ -151,8 +199,10 @@ def generate_full_personalized_book(order_id: str):
         }
     )
 
-    updated_order = db.orders.find_one({"_id": ObjectId(order_id)})
-    pdf_url = generate_pdf(updated_order)
+    order["generated_pages"] = checkpoints.sorted_pages()
+    pdf_url = generate_pdf(order)
+    if not pdf_url:
+        raise RuntimeError("PDF generation failed")
 
     # --------------------------------------------------
     # 5️⃣ Mark Completed
@@ -170,5 +220,7 @@ def generate_full_personalized_book(order_id: str):
     )
 
     print(f"[PersonalizedService] ✅ Order {order_id} complete. PDF: {pdf_url}")
+    cache_stats = swap_result_cache.stats()
+    print(f"[PersonalizedService] Swap cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
     return pdf_url
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Async client for the NVIDIA SDXL image endpoint.
+
+One pooled httpx.AsyncClient (keep-alive) per book, a concurrency semaphore,
+a simple request-rate limiter and retries with jittered exponential backoff
+on timeouts, 429 and 5xx. All page prompts of a book are fired concurrently.
+"""
+
+import asyncio
+import random
+import time
+
+import httpx
+
+from app.config import (
+    SDXL_CONCURRENCY,
+    SDXL_INVOKE_URL,
+    SDXL_MAX_RETRIES,
+    SDXL_RATE_PER_SEC,
+    SDXL_TIMEOUT_SECONDS,
+)
+from app.services.image_service import (
+    build_sdxl_payload,
+    placeholder_image,
+    save_sdxl_artifact,
+    sdxl_cache_key,
+    sdxl_headers,
+    sdxl_image_cache,
+)
+
+RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 20.0
+
+
+class SDXLClient:
+    def __init__(
+        self,
+        invoke_url: str = SDXL_INVOKE_URL,
+        concurrency: int = SDXL_CONCURRENCY,
+        rate_per_sec: float = SDXL_RATE_PER_SEC,
+        max_retries: int = SDXL_MAX_RETRIES,
+        timeout: float = SDXL_TIMEOUT_SECONDS,
+        use_cache: bool = True,
+    ):
+        self.invoke_url = invoke_url
+        self.use_cache = use_cache
+        self.concurrency = max(concurrency, 1)
+        self.min_interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self.max_retries = max(max_retries, 0)
+        self.timeout = timeout
+        self._client = None
+        self._semaphore = None
+        self._rate_lock = None
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=sdxl_headers(),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._rate_lock = asyncio.Lock()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+        self._client = None
+
+    async def _wait_for_rate_slot(self):
+        if not self.min_interval:
+            return
+        async with self._rate_lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        # "Full jitter": uniform in [0, base * 2^attempt]
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    async def generate(self, prompt: str) -> str:
+        """Returns a /generated_images URL (placeholder image after exhausting retries)."""
+        payload = build_sdxl_payload(prompt)
+
+        # Cache hits never touch the network (or the semaphore / rate limiter)
+        cache_key = sdxl_cache_key(self.invoke_url, payload) if self.use_cache else None
+        if cache_key:
+            cached_url = sdxl_image_cache.get_kept(cache_key, ".png")
+            if cached_url:
+                print("[SDXLClient] SDXL cache hit.")
+                return cached_url
+
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._wait_for_rate_slot()
+                retry_after = None
+                try:
+                    response = await self._client.post(self.invoke_url, json=payload)
+                    if response.status_code in RETRY_STATUS_CODES:
+                        retry_after = response.headers.get("Retry-After")
+                        raise httpx.HTTPStatusError(
+                            f"SDXL returned {response.status_code}",
+                            request=response.request,
+                            response=response,
+                        )
+                    response.raise_for_status()
+
+                    image_url = await asyncio.to_thread(save_sdxl_artifact, response.json(), cache_key)
+                    if image_url:
+                        print("[SDXLClient] NVIDIA image generated.")
+                        return image_url
+                    print("[SDXLClient] NVIDIA returned no artifacts.")
+                    break
+
+                except (httpx.TimeoutException, httpx.TransportError, httpx.HTTPStatusError) as e:
+                    status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                    if status is not None and status not in RETRY_STATUS_CODES:
+                        print(f"[SDXLClient] NVIDIA API error: {e}")
+                        break
+                    if attempt == self.max_retries:
+                        print(f"[SDXLClient] Giving up after {attempt + 1} attempts: {e}")
+                        break
+                    delay = self._backoff(attempt, retry_after)
+                    print(f"[SDXLClient] Retry {attempt + 1}/{self.max_retries} in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+
+                except Exception as e:
+                    print(f"[SDXLClient] NVIDIA API error: {e}")
+                    break
+
+        return await asyncio.to_thread(placeholder_image)
+
+    async def generate_many(self, prompts: list[str]) -> list[str]:
+        return await asyncio.gather(*(self.generate(prompt) for prompt in prompts))
+
+
+async def generate_images_async(prompts: list[str], **client_options) -> list[str]:
+    """Generates all prompts concurrently over one pooled connection set; results keep input order."""
+    async with SDXLClient(**client_options) as client:
+        return await client.generate_many(prompts)
@@ -0,0 +1,196 @@
+"""
+Micro-batching for inswapper_128 inference.
+
+Pages (and concurrent orders) submit (target image, target face, source face)
+items; a single background thread collects them for up to SWAP_BATCH_MAX_WAIT_MS
+or SWAP_BATCH_SIZE items and runs one batched ONNX call; each caller then pastes
+its result back onto its own image. Pre/post-processing mirrors INSwapper.get.
+
+The official inswapper_128 export has a fixed batch dimension of 1;
+scripts/quantize_models.py writes a dynamic-batch re-export
+(inswapper_128.batch.onnx) that face_engine loads when present. Models that
+still cannot batch gain nothing from this, so batched_swap runs them directly
+on the caller's thread, keeping swaps parallel across page and job workers.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from app.config import SWAP_BATCH_MAX_WAIT_MS, SWAP_BATCH_SIZE
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def _prepare(swapper, img, target_face, source_face):
+    from insightface.utils import face_align
+
+    aimg, M = face_align.norm_crop2(img, target_face.kps, swapper.input_size[0])
+    blob = cv2.dnn.blobFromImage(
+        aimg,
+        1.0 / swapper.input_std,
+        swapper.input_size,
+        (swapper.input_mean, swapper.input_mean, swapper.input_mean),
+        swapRB=True,
+    )
+    latent = source_face.normed_embedding.reshape((1, -1))
+    latent = np.dot(latent, swapper.emap)
+    latent /= np.linalg.norm(latent)
+    return aimg, M, blob, latent.astype(np.float32)
+
+
+def model_supports_batching(swapper) -> bool:
+    batch_dim = swapper.session.get_inputs()[0].shape[0]
+    return not isinstance(batch_dim, int) or batch_dim != 1
+
+
+def _paste_back(target_img, bgr_fake, aimg, M):
+    """
+    Blend the swapped 128x128 crop back into the full image. Same mask as
+    INSwapper.get (its fake_diff map is computed there but never used, so it is skipped).
+    """
+    IM = cv2.invertAffineTransform(M)
+    size = (target_img.shape[1], target_img.shape[0])
+    img_white = np.full((aimg.shape[0], aimg.shape[1]), 255, dtype=np.float32)
+    bgr_fake = cv2.warpAffine(bgr_fake, IM, size, borderValue=0.0)
+    img_white = cv2.warpAffine(img_white, IM, size, borderValue=0.0)
+    img_white[img_white > 20] = 255
+
+    img_mask = img_white
+    mask_h_inds, mask_w_inds = np.where(img_mask == 255)
+    mask_h = np.max(mask_h_inds) - np.min(mask_h_inds)
+    mask_w = np.max(mask_w_inds) - np.min(mask_w_inds)
+    mask_size = int(np.sqrt(mask_h * mask_w))
+
+    k = max(mask_size // 10, 10)
+    img_mask = cv2.erode(img_mask, np.ones((k, k), np.uint8), iterations=1)
+    k = max(mask_size // 20, 5)
+    img_mask = cv2.GaussianBlur(img_mask, (2 * k + 1, 2 * k + 1), 0)
+
+    img_mask /= 255
+    img_mask = np.reshape(img_mask, [img_mask.shape[0], img_mask.shape[1], 1])
+    fake_merged = img_mask * bgr_fake + (1 - img_mask) * target_img.astype(np.float32)
+    return fake_merged.astype(np.uint8)
+
+
+class SwapBatcher:
+    """Collects swap requests from any thread and runs them as batched ONNX calls."""
+
+    def __init__(self, swapper, max_batch: int = SWAP_BATCH_SIZE, max_wait_ms: float = SWAP_BATCH_MAX_WAIT_MS):
+        self.swapper = swapper
+        self.max_batch = max(max_batch, 1)
+        self.max_wait = max(max_wait_ms, 0) / 1000
+        self.batches_run = 0
+        self.items_run = 0
+
+        # With a fixed batch of 1 items run back-to-back inside one batch
+        # (batched_swap avoids the batcher for such models)
+        self.supports_batching = model_supports_batching(swapper)
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="swap-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, img, target_face, source_face) -> Future:
+        """Queues one item; the future resolves to (bgr_fake, aimg, M) for paste-back."""
+        future = Future()
+        self._queue.put((img, target_face, source_face, future))
+        return future
+
+    def swap(self, img, target_face, source_face):
+        # Paste-back runs on the calling thread so it stays parallel across pages
+        bgr_fake, aimg, M = self.submit(img, target_face, source_face).result()
+        return _paste_back(img, bgr_fake, aimg, M)
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            try:
+                self._run_batch(items)
+            except Exception as e:
+                for *_, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _infer(self, blobs, latents):
+        session = self.swapper.session
+        input_names = self.swapper.input_names
+        output_names = self.swapper.output_names
+
+        if self.supports_batching and len(blobs) > 1:
+            try:
+                return session.run(output_names, {
+                    input_names[0]: np.concatenate(blobs, axis=0),
+                    input_names[1]: np.concatenate(latents, axis=0),
+                })[0]
+            except Exception as e:
+                print(f"[SwapBatcher] Batched run failed, using per-item runs: {e}")
+                self.supports_batching = False
+
+        return np.concatenate([
+            session.run(output_names, {input_names[0]: blob, input_names[1]: latent})[0]
+            for blob, latent in zip(blobs, latents)
+        ], axis=0)
+
+    def _run_batch(self, items):
+        prepared, ready = [], []
+        for img, target_face, source_face, future in items:
+            try:
+                prepared.append(_prepare(self.swapper, img, target_face, source_face))
+                ready.append(future)
+            except Exception as e:
+                future.set_exception(e)
+
+        if not prepared:
+            return
+
+        pred = self._infer([p[2] for p in prepared], [p[3] for p in prepared])
+        self.batches_run += 1
+        self.items_run += len(prepared)
+
+        for i, ((aimg, M, _, _), future) in enumerate(zip(prepared, ready)):
+            try:
+                bgr_fake = np.clip(255 * pred[i].transpose((1, 2, 0)), 0, 255).astype(np.uint8)[:, :, ::-1]
+                future.set_result((bgr_fake, aimg, M))
+            except Exception as e:
+                future.set_exception(e)
+
+
+def get_swap_batcher(swapper) -> SwapBatcher:
+    """One batcher per loaded swapper model, shared by every page and order in the process."""
+    with _batchers_lock:
+        batcher = _batchers.get(id(swapper))
+        if batcher is None or batcher.swapper is not swapper:
+            batcher = SwapBatcher(swapper)
+            _batchers[id(swapper)] = batcher
+        return batcher
+
+
+def batched_swap(swapper, img, target_face, source_face):
+    """Drop-in for `swapper.get(img, target_face, source_face, paste_back=True)`."""
+    if SWAP_BATCH_SIZE <= 1 or not model_supports_batching(swapper):
+        # onnxruntime sessions are thread-safe: unbatchable models run in parallel on the callers' threads
+        return swapper.get(img, target_face, source_face, paste_back=True)
+
+    batcher = get_swap_batcher(swapper)
+    if not batcher.supports_batching:  # a batched run failed at runtime
+        return swapper.get(img, target_face, source_face, paste_back=True)
+    return batcher.swap(img, target_face, source_face)
@@ -0,0 +1,226 @@
+"""
+Precomputed target-face index for the static template pages under
+frontend/public/defaults/<template_id>/page-N.png.
+
+Each entry stores every detected face (bbox, 5-point landmarks, det score)
+plus the PNG's mtime/size/sha256 and the detector settings it was made with.
+Entries are validated on lookup and re-detected automatically when the PNG
+or the detector (FACE_DET_SIZE / FACE_MODEL_VARIANT) changes, so the index
+rebuilds itself.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.config import FACE_DET_SIZE, FACE_MODEL_VARIANT
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+DEFAULTS_DIR = BACKEND_ROOT.parent / "frontend" / "public" / "defaults"
+INDEX_PATH = BACKEND_ROOT / "models" / "target_face_index.npz"
+
+# Detections are only reused when made with the same detector settings
+DETECTOR = f"buffalo_l|{FACE_MODEL_VARIANT}|det{FACE_DET_SIZE}"
+
+_lock = threading.Lock()
+_entries = None      # key -> {"mtime", "size", "sha256", "detector", "faces": [(bbox, kps, score), ...]}
+_by_hash = None      # sha256 -> key
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _index_key(image_path: Path) -> str | None:
+    try:
+        return Path(image_path).resolve().relative_to(DEFAULTS_DIR.resolve()).as_posix()
+    except ValueError:
+        return None
+
+
+def _to_face(bbox, kps, score):
+    from insightface.app.common import Face
+
+    return Face(
+        bbox=np.array(bbox, dtype=np.float32),
+        kps=np.array(kps, dtype=np.float32),
+        det_score=np.float32(score),
+    )
+
+
+def _load():
+    global _entries, _by_hash
+    if _entries is not None:
+        return
+
+    _entries, _by_hash = {}, {}
+    if not INDEX_PATH.exists():
+        return
+
+    try:
+        data = np.load(INDEX_PATH, allow_pickle=False)
+        offsets = data["offsets"]
+        # Indexes written before the detector was recorded are treated as stale
+        detectors = data["detectors"].tolist() if "detectors" in data.files else [""] * len(data["keys"])
+        for i, key in enumerate(data["keys"].tolist()):
+            start, end = int(offsets[i]), int(offsets[i + 1])
+            faces = [
+                (data["bboxes"][j], data["kps"][j], float(data["scores"][j]))
+                for j in range(start, end)
+            ]
+            sha = str(data["hashes"][i])
+            _entries[key] = {
+                "mtime": float(data["mtimes"][i]),
+                "size": int(data["sizes"][i]),
+                "sha256": sha,
+                "detector": str(detectors[i]),
+                "faces": faces,
+            }
+            _by_hash[sha] = key
+        print(f"[FaceIndex] Loaded {len(_entries)} template pages from {INDEX_PATH}")
+    except Exception as e:
+        print(f"[FaceIndex] Could not read index, rebuilding: {e}")
+        _entries, _by_hash = {}, {}
+
+
+def _save():
+    keys = sorted(_entries)
+    offsets = [0]
+    bboxes, kps, scores = [], [], []
+    for key in keys:
+        for bbox, points, score in _entries[key]["faces"]:
+            bboxes.append(np.asarray(bbox, dtype=np.float32))
+            kps.append(np.asarray(points, dtype=np.float32))
+            scores.append(score)
+        offsets.append(len(scores))
+
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = INDEX_PATH.with_suffix(".tmp.npz")
+    np.savez_compressed(
+        tmp_path,
+        keys=np.array(keys, dtype=str),
+        mtimes=np.array([_entries[k]["mtime"] for k in keys], dtype=np.float64),
+        sizes=np.array([_entries[k]["size"] for k in keys], dtype=np.int64),
+        hashes=np.array([_entries[k]["sha256"] for k in keys], dtype=str),
+        detectors=np.array([_entries[k]["detector"] for k in keys], dtype=str),
+        offsets=np.array(offsets, dtype=np.int32),
+        bboxes=np.array(bboxes, dtype=np.float32).reshape(-1, 4),
+        kps=np.array(kps, dtype=np.float32).reshape(-1, 5, 2),
+        scores=np.array(scores, dtype=np.float32),
+    )
+    os.replace(tmp_path, INDEX_PATH)
+
+
+def _detect_entry(image_path: Path, stat, sha: str, detect_fn, image=None) -> dict:
+    if image is None:
+        import cv2
+
+        image = cv2.imread(str(image_path))
+        if image is None:
+            raise ValueError(f"Could not read template image: {image_path}")
+
+    faces = [(f.bbox, f.kps, float(f.det_score)) for f in detect_fn(image)]
+    return {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": sha, "detector": DETECTOR, "faces": faces}
+
+
+def _store(key: str, entry: dict):
+    """Must be called with _lock held."""
+    old = _entries.get(key)
+    if old:
+        _by_hash.pop(old["sha256"], None)
+    _entries[key] = entry
+    _by_hash[entry["sha256"]] = key
+
+
+def _refresh(key: str, image_path: Path, detect_fn, image=None, force=False) -> tuple[dict, bool]:
+    """
+    Returns (entry, changed). Takes _lock only to read and update the index:
+    hashing and detection run outside it, so cold pages do not serialize
+    every render thread. Callers save the index when changed.
+    """
+    stat = image_path.stat()
+    with _lock:
+        _load()
+        entry = _entries.get(key)
+        if entry and not force and entry["detector"] == DETECTOR:
+            if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+                return entry, False
+        else:
+            entry = None
+
+    sha = _sha256(image_path)
+    if entry and sha == entry["sha256"]:
+        # mtime changed but the content did not: no re-detection
+        with _lock:
+            entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+        return entry, True
+
+    entry = _detect_entry(image_path, stat, sha, detect_fn, image)
+    with _lock:
+        _store(key, entry)
+    return entry, True
+
+
+def get_target_faces(image_path, detect_fn, image=None):
+    """
+    Faces for a template default page, detected at most once per PNG version.
+    Returns None for images outside the defaults directory (caller detects itself).
+    """
+    image_path = Path(image_path)
+    key = _index_key(image_path)
+    if key is None or not image_path.exists():
+        return None
+
+    entry, changed = _refresh(key, image_path, detect_fn, image)
+    if changed:
+        with _lock:
+            _save()
+
+    return [_to_face(*f) for f in entry["faces"]]
+
+
+def lookup_by_hash(sha: str):
+    """Faces for an indexed template page with this exact content hash, else None."""
+    with _lock:
+        _load()
+        key = _by_hash.get(sha)
+        if key is None or _entries[key]["detector"] != DETECTOR:
+            return None
+        faces = list(_entries[key]["faces"])
+
+    return [_to_face(*f) for f in faces]
+
+
+def build_index(image_paths, detect_fn, force=False) -> dict:
+    """Index (or refresh) the given template pages. Returns simple counters."""
+    stats = {"indexed": 0, "updated": 0, "no_face": 0, "missing": 0}
+
+    for image_path in image_paths:
+        image_path = Path(image_path)
+        key = _index_key(image_path)
+        if key is None or not image_path.exists():
+            stats["missing"] += 1
+            continue
+
+        entry, changed = _refresh(key, image_path, detect_fn, force=force)
+        stats["indexed"] += 1
+        stats["updated"] += int(changed)
+        stats["no_face"] += int(not entry["faces"])
+
+    with _lock:
+        _load()
+        # Drop pages whose PNG no longer exists
+        for key in [k for k in _entries if not (DEFAULTS_DIR / k).exists()]:
+            _by_hash.pop(_entries.pop(key)["sha256"], None)
+            stats["updated"] += 1
+
+        _save()
+
+    return stats
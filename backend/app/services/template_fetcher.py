@@ -0,0 +1,133 @@
+"""
+Async template downloads for /face-swap.
+
+One pooled httpx.AsyncClient per process, streamed to disk in chunks with a
+byte cap and per-request timeouts. Downloads are cached by URL and
+revalidated with ETag / Last-Modified, so an unchanged template costs a 304.
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+
+from app.config import (
+    TEMPLATE_CACHE_MAX_MB,
+    TEMPLATE_FETCH_CONCURRENCY,
+    TEMPLATE_FETCH_MAX_MB,
+    TEMPLATE_FETCH_TIMEOUT_SECONDS,
+)
+from app.services.content_store import ContentStore, content_key
+
+CHUNK_SIZE = 64 * 1024
+MAX_TEMPLATE_BYTES = int(TEMPLATE_FETCH_MAX_MB * 1024 * 1024)
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+template_cache = ContentStore(
+    "templates",
+    BACKEND_ROOT / "generated_images" / "template_cache",
+    "/generated_images/template_cache",
+    max_bytes=TEMPLATE_CACHE_MAX_MB * 1024 * 1024
+)
+
+_client = None
+
+
+class TemplateFetchError(Exception):
+    pass
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(TEMPLATE_FETCH_TIMEOUT_SECONDS, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=TEMPLATE_FETCH_CONCURRENCY,
+                max_keepalive_connections=TEMPLATE_FETCH_CONCURRENCY,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _read_validators(key: str) -> dict:
+    path = template_cache.lookup(key, ".json")
+    if not path:
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+async def fetch_template(url: str) -> Path:
+    """Local path of the template at `url` (downloaded, or revalidated from cache)."""
+    key = content_key(url)
+    cached_path = template_cache.lookup(key, ".img")
+
+    headers = {}
+    if cached_path:
+        validators = _read_validators(key)
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    async with get_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and cached_path:
+            return cached_path
+        if response.status_code != 200:
+            raise TemplateFetchError(f"HTTP {response.status_code} for {url}")
+
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > MAX_TEMPLATE_BYTES:
+            raise TemplateFetchError(f"Template larger than {MAX_TEMPLATE_BYTES} bytes: {url}")
+
+        tmp_path = template_cache.temp_path(".img")
+        try:
+            size = 0
+            with open(tmp_path, "wb") as f:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_TEMPLATE_BYTES:
+                        raise TemplateFetchError(f"Template larger than {MAX_TEMPLATE_BYTES} bytes: {url}")
+                    f.write(chunk)
+            template_cache.commit(key, ".img", tmp_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        validators = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        template_cache.put_bytes(key, ".json", json.dumps(validators).encode("utf-8"))
+
+    return template_cache.path_for(key, ".img")
+
+
+async def fetch_templates(urls: list[str]):
+    """
+    Downloads all templates concurrently and yields (index, path, error) in
+    completion order, so callers can start on the first one that arrives.
+    Each download is capped at TEMPLATE_FETCH_TIMEOUT_SECONDS in total (httpx's
+    timeout only bounds each read, so a slow trickle could run on forever).
+    """
+    async def fetch(index, url):
+        try:
+            path = await asyncio.wait_for(fetch_template(url), TEMPLATE_FETCH_TIMEOUT_SECONDS)
+            return index, path, None
+        except asyncio.TimeoutError:
+            return index, None, f"Timed out after {TEMPLATE_FETCH_TIMEOUT_SECONDS}s: {url}"
+        except (httpx.HTTPError, httpx.InvalidURL, TemplateFetchError, OSError, TypeError, ValueError) as e:
+            # TypeError / ValueError: not a usable URL (e.g. a number or null from the JSON array)
+            return index, None, str(e)
+
+    for next_done in asyncio.as_completed([fetch(i, url) for i, url in enumerate(urls)]):
+        yield await next_done
@@ -1,5 +1,11 @@
+import json
+import threading
+from datetime import datetime
 from typing import List, Dict
 
+from app.services.content_store import content_key
+from app.services.db import db
+
 BOOK_TEMPLATES = [
     {
         "id": "space-adventures",
@@ -171,8 +177,127 @@ BOOK_TEMPLATES = [
     }
 ]
 
+# ── TEMPLATE REGISTRY ─────────────────────────────────────────────────────────
+# Personalized orders store template_id + template_version (+ story_overrides)
+# instead of a copy of the template; the story is resolved from here on read.
+# Every version the app has served is kept in db.template_versions, so orders
+# made before a template was edited still resolve to the template they used.
+TEMPLATE_REGISTRY = {t["id"]: t for t in BOOK_TEMPLATES}
+
+
+def _template_version(template: Dict) -> str:
+    return content_key(json.dumps(template, sort_keys=True))[:12]
+
+
+TEMPLATE_VERSIONS = {template_id: _template_version(t) for template_id, t in TEMPLATE_REGISTRY.items()}
+
+
 def get_all_templates() -> List[Dict]:
     return BOOK_TEMPLATES
 
 def get_template_by_id(template_id: str) -> Dict:
-    return next((t for t in BOOK_TEMPLATES if t["id"] == template_id), None)
+    return TEMPLATE_REGISTRY.get(template_id)
+
+def get_template_version(template_id: str) -> str:
+    return TEMPLATE_VERSIONS.get(template_id)
+
+
+class TemplateVersionMissing(ValueError):
+    """An order references a template version that was never snapshotted."""
+
+
+# Snapshots never change, so they are cached once read
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def register_template_versions(database=db):
+    """Snapshots the current version of every template; safe to call on every startup."""
+    for template_id, template in TEMPLATE_REGISTRY.items():
+        version = TEMPLATE_VERSIONS[template_id]
+        database.template_versions.update_one(
+            {"_id": f"{template_id}@{version}"},
+            {"$setOnInsert": {
+                "template_id": template_id,
+                "version": version,
+                "template": template,
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+
+def get_template_at_version(template_id: str, version: str | None) -> Dict | None:
+    """The template as it was at `version` (the current one when version is None or current)."""
+    if not version or version == get_template_version(template_id):
+        return get_template_by_id(template_id)
+
+    snapshot_id = f"{template_id}@{version}"
+    with _snapshots_lock:
+        if snapshot_id in _snapshots:
+            return _snapshots[snapshot_id]
+
+    doc = db.template_versions.find_one({"_id": snapshot_id}, {"template": 1})
+    if not doc:
+        return None
+    with _snapshots_lock:
+        _snapshots[snapshot_id] = doc["template"]
+    return doc["template"]
+
+
+def story_overrides_for(template: Dict, story: Dict) -> Dict:
+    """
+    The smallest overrides that turn `template` into `story`:
+    changed top-level fields, plus "pages" as {page_number: {changed fields}},
+    or as a full list when the set of pages differs.
+    """
+    overrides = {k: v for k, v in story.items() if k != "pages" and template.get(k) != v}
+
+    template_pages = {p["page_number"]: p for p in template.get("pages", [])}
+    story_pages = story.get("pages", [])
+    if [p.get("page_number") for p in story_pages] != list(template_pages):
+        overrides["pages"] = story_pages
+        return overrides
+
+    page_overrides = {}
+    for page in story_pages:
+        changed = {k: v for k, v in page.items() if template_pages[page["page_number"]].get(k) != v}
+        if changed:
+            page_overrides[str(page["page_number"])] = changed
+    if page_overrides:
+        overrides["pages"] = page_overrides
+    return overrides
+
+
+def resolve_order_story(order: Dict) -> Dict:
+    """
+    The story of an order: its own `story` if it has one (free-form books,
+    not yet compacted orders), else its template at the order's
+    template_version with the order's story_overrides applied.
+    Raises TemplateVersionMissing rather than resolving against a newer template.
+    """
+    if order.get("story"):
+        return order["story"]
+
+    template_id = order.get("template_id")
+    version = order.get("template_version")
+    template = get_template_at_version(template_id, version)
+    if not template:
+        if template_id and version:
+            raise TemplateVersionMissing(f"Template {template_id} version {version} is not available")
+        return {}
+
+    overrides = order.get("story_overrides") or {}
+    if not overrides:
+        return template
+
+    story = {**template, **{k: v for k, v in overrides.items() if k != "pages"}}
+    page_overrides = overrides.get("pages")
+    if isinstance(page_overrides, list):
+        story["pages"] = page_overrides
+    elif page_overrides:
+        story["pages"] = [
+            {**page, **page_overrides.get(str(page["page_number"]), {})}
+            for page in template["pages"]
+        ]
+    return story
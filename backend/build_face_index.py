@@ -0,0 +1,57 @@
+"""
+build_face_index.py
+Offline target-face indexer for template default pages.
+
+Detects the face on every frontend/public/defaults/<template_id>/page-N.png
+once and stores bbox / landmarks / det score in models/target_face_index.npz.
+Pages whose PNG changed (mtime + sha256) are re-detected; unchanged pages are kept.
+
+Usage:
+    python build_face_index.py            # incremental
+    python build_face_index.py --force    # re-detect every page
+"""
+
+import argparse
+import time
+
+from app.services.image_service import get_insightface_models
+from app.services.target_face_index import DEFAULTS_DIR, INDEX_PATH, build_index
+from app.services.template_service import BOOK_TEMPLATES
+
+
+def template_page_paths():
+    for template in BOOK_TEMPLATES:
+        for page in template["pages"]:
+            base_image_path = page.get("base_image_path") or ""
+            relative = base_image_path.replace("\\", "/").lstrip("/")
+            if relative.startswith("defaults/"):
+                yield DEFAULTS_DIR / relative[len("defaults/"):]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the template target-face index")
+    parser.add_argument("--force", action="store_true", help="re-detect every page")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Template Target-Face Indexer")
+    print("=" * 60)
+
+    app, _ = get_insightface_models()
+    if not app:
+        raise RuntimeError("InsightFace models could not be loaded")
+
+    start = time.perf_counter()
+    stats = build_index(template_page_paths(), app.get, force=args.force)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Indexed {stats['indexed']} pages "
+        f"({stats['updated']} updated, {stats['no_face']} without a face, "
+        f"{stats['missing']} missing) in {elapsed:.1f}s"
+    )
+    print(f"Index: {INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark: face engine onnxruntime configurations.
+
+Every combination of model variant (fp32/int8/fp16), intra-op threads, graph
+optimization level and memory arena is loaded with face_engine and timed per
+stage over a template's pages:
+
+    detect   detector only (SCRFD)
+    embed    ArcFace embedding of the child face
+    analyse  full FaceAnalysis.get on a page (detect + landmarks + attributes + embedding)
+    swap     inswapper_128 + paste-back
+    thrpt    swaps/s with --concurrency pages swapped at once (oversubscription shows here)
+
+Quality is the cosine similarity between the child's embedding and the
+embedding of the swapped face, both computed by the fp32 reference model, so
+every configuration is scored with the same recognizer.
+
+Usage (from backend/):
+    python scripts/benchmark_onnx_configs.py path/to/child.jpg [--template space-adventures]
+        [--variants fp32,int8] [--threads 0,1,2] [--opt all] [--arena on] [--repeat 3] [--concurrency 2]
+"""
+
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.services import face_engine
+from app.services.image_service import _pick_largest_face
+from app.services.template_service import get_template_by_id
+
+DEFAULTS_DIR = Path(__file__).parent.parent.parent / "frontend" / "public" / "defaults"
+
+
+def load_pages(template_id):
+    pages = []
+    for page in get_template_by_id(template_id)["pages"]:
+        img = cv2.imread(str(DEFAULTS_DIR / template_id / f"page-{page['page_number']}.png"))
+        if img is not None:
+            pages.append(img)
+    return pages
+
+
+def timed_ms(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def cosine(a, b):
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def run_config(config, child_img, pages, reference_app, reference_embedding, args) -> dict:
+    variant, threads, opt, arena = config
+    options = face_engine.session_options(intra_op_threads=threads, graph_optimization=opt, cpu_mem_arena=arena)
+
+    start = time.perf_counter()
+    app = face_engine.create_face_app(variant, sess_options=options)
+    swapper = face_engine.create_swapper(variant, sess_options=options)
+    load_s = time.perf_counter() - start
+
+    source_faces = app.get(child_img)
+    if not source_faces:
+        raise ValueError("no face detected in child photo")
+    source_face = _pick_largest_face(source_faces)
+
+    targets = []
+    for img in pages:
+        faces = app.get(img)
+        if faces:
+            targets.append((img, _pick_largest_face(faces)))
+    if not targets:
+        raise ValueError("no faces detected on the template pages")
+
+    # First runs allocate the arena / initialise kernels; keep them out of the timings
+    app.det_model.detect(pages[0], max_num=0, metric="default")
+    swapper.get(targets[0][0], targets[0][1], source_face, paste_back=True)
+
+    recognizer = app.models["recognition"]
+
+    def detect(img):
+        return app.det_model.detect(img, max_num=0, metric="default")
+
+    detect_ms, embed_ms, analyse_ms, swap_ms, similarities = [], [], [], [], []
+    misses = 0
+    for _ in range(args.repeat):
+        embed_ms.append(timed_ms(recognizer.get, child_img, source_face)[0])
+        for img in pages:
+            detect_ms.append(timed_ms(detect, img)[0])
+            analyse_ms.append(timed_ms(app.get, img)[0])
+        for img, face in targets:
+            ms, swapped = timed_ms(swapper.get, img, face, source_face, True)
+            swap_ms.append(ms)
+
+            swapped_faces = reference_app.get(swapped)
+            if swapped_faces:
+                similarities.append(cosine(reference_embedding, _pick_largest_face(swapped_faces).normed_embedding))
+            else:
+                misses += 1
+
+    jobs = targets * args.repeat
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda t: swapper.get(t[0], t[1], source_face, paste_back=True), jobs))
+    throughput = len(jobs) / (time.perf_counter() - start)
+
+    return {
+        "load_s": load_s,
+        "detect_ms": statistics.median(detect_ms),
+        "embed_ms": statistics.median(embed_ms),
+        "analyse_ms": statistics.median(analyse_ms),
+        "swap_ms": statistics.median(swap_ms),
+        "throughput": throughput,
+        "cosine": statistics.mean(similarities) if similarities else float("nan"),
+        "cosine_min": min(similarities) if similarities else float("nan"),
+        "misses": misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face engine onnxruntime configuration benchmark")
+    parser.add_argument("child_photo")
+    parser.add_argument("--template", default="space-adventures")
+    parser.add_argument("--variants", default="fp32,int8,fp16")
+    parser.add_argument("--threads", default="0", help="intra-op threads to try (0 = onnxruntime default)")
+    parser.add_argument("--opt", default="all", help=f"graph optimization levels ({', '.join(face_engine.GRAPH_OPTIMIZATION_LEVELS)})")
+    parser.add_argument("--arena", default="on", help="cpu memory arena: on, off or on,off")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=2, help="concurrent swaps for the throughput column")
+    args = parser.parse_args()
+
+    child_img = cv2.imread(args.child_photo)
+    if child_img is None:
+        sys.exit(f"Cannot read {args.child_photo}")
+    pages = load_pages(args.template)
+    if not pages:
+        sys.exit(f"No template pages found for {args.template}")
+
+    # Reference recognizer for the quality column: fp32 with default session options
+    reference_app = face_engine.create_face_app("fp32", sess_options=face_engine.session_options(0, 0, "all", True))
+    reference_faces = reference_app.get(child_img)
+    if not reference_faces:
+        sys.exit("No face detected in child photo")
+    reference_embedding = _pick_largest_face(reference_faces).normed_embedding
+
+    configs = list(itertools.product(
+        [v.strip() for v in args.variants.split(",") if v.strip()],
+        [int(t) for t in args.threads.split(",")],
+        [o.strip() for o in args.opt.split(",") if o.strip()],
+        [a.strip() == "on" for a in args.arena.split(",") if a.strip()],
+    ))
+
+    print("=" * 112)
+    print(f"Template: {args.template} ({len(pages)} pages) | repeat: {args.repeat} | "
+          f"concurrency: {args.concurrency} | cpus: {os.cpu_count()}")
+    print("-" * 112)
+    print(f"{'variant':7} {'thr':>3} {'opt':8} {'arena':5} | {'load s':>6} {'detect':>8} {'embed':>7} "
+          f"{'analyse':>8} {'swap':>8} {'thrpt/s':>7} | {'cosine':>6} {'min':>6} {'miss':>4}")
+    print("-" * 112)
+
+    for config in configs:
+        variant, threads, opt, arena = config
+        label = f"{variant:7} {threads:>3} {opt:8} {'on' if arena else 'off':5}"
+        try:
+            r = run_config(config, child_img, pages, reference_app, reference_embedding, args)
+        except Exception as e:
+            print(f"{label} | skipped: {e}")
+            continue
+        print(f"{label} | {r['load_s']:6.2f} {r['detect_ms']:6.1f}ms {r['embed_ms']:5.1f}ms "
+              f"{r['analyse_ms']:6.1f}ms {r['swap_ms']:6.1f}ms {r['throughput']:7.2f} | "
+              f"{r['cosine']:6.3f} {r['cosine_min']:6.3f} {r['misses']:4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: PDF render time and file size for one template book.
+
+Renders the book with the text-panel background drawn inline vs shared as a
+Form XObject, with original PNGs vs images prepared for screen / print DPI,
+and finally from cached page fragments, including after a one-page edit.
+
+Usage (from backend/):
+    python scripts/benchmark_pdf.py [--template space-adventures] [--hero Alex] [--runs 5]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pdf_service import generate_pdf
+from app.services.template_service import get_template_by_id
+
+
+def build_order(template_id, hero_name):
+    template = get_template_by_id(template_id)
+    pages = [
+        {
+            "page_number": page["page_number"],
+            "text": re.sub(r"\[HERO\]", hero_name, page["text"], flags=re.IGNORECASE),
+            "image_url": page.get("base_image_path"),
+        }
+        for page in template["pages"]
+    ]
+    return {"story": template, "generated_pages": pages}
+
+
+def run(order, runs, **pdf_options):
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf_url = generate_pdf(order, **pdf_options)
+        timings.append(time.perf_counter() - start)
+
+        local_path = pdf_url.lstrip("/")
+        size = os.path.getsize(local_path)
+        os.remove(local_path)
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF render time and size")
+    parser.add_argument("--template", default="space-adventures")
+    parser.add_argument("--hero", default="Alex")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    order = build_order(args.template, args.hero)
+    configs = [
+        ("Inline bg, original PNGs", dict(use_forms=False, image_dpi=0, incremental=False)),
+        ("Form bg, original PNGs", dict(use_forms=True, image_dpi=0, incremental=False)),
+        ("Form bg, print 300 dpi JPEG", dict(use_forms=True, image_dpi=300, incremental=False)),
+        ("Form bg, screen 150 dpi JPEG", dict(use_forms=True, image_dpi=150, incremental=False)),
+        ("Page fragments, screen", dict(image_dpi=150, incremental=True)),
+    ]
+
+    print("=" * 60)
+    print(f"Template: {args.template} | pages: {len(order['generated_pages'])} | runs: {args.runs}")
+    print("-" * 60)
+    baseline = None
+    for label, options in configs:
+        # Prepared images are cached after the first run, so the median is the warm time
+        seconds, size = run(order, args.runs, **options)
+        baseline = baseline or (seconds, size)
+        print(
+            f"{label:<30}: {seconds * 1000:8.1f} ms  {size / 1024:9.1f} KB"
+            f"  ({baseline[0] / seconds:5.2f}x, {size / baseline[1]:6.1%})"
+        )
+
+    # A single edited page: one fragment render + merge (timed on the first run only)
+    edited = build_order(args.template, args.hero)
+    edited["generated_pages"][len(edited["generated_pages"]) // 2]["text"] += f" (edit {time.time()})"
+    seconds, size = run(edited, 1, image_dpi=150, incremental=True)
+    print(f"{'One page edited, screen':<30}: {seconds * 1000:8.1f} ms  {size / 1024:9.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
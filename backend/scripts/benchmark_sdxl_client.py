@@ -0,0 +1,67 @@
+"""
+Benchmark: serial blocking generate_image vs the async pooled SDXLClient.
+
+Start the mock first:
+    python scripts/mock_sdxl_server.py --min-delay 1 --max-delay 3
+Then:
+    python scripts/benchmark_sdxl_client.py [--url http://127.0.0.1:8001/v1/genai/stabilityai/stable-diffusion-xl]
+        [--pages 12] [--concurrency 4] [--rate 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import image_service
+from app.services.sdxl_client import generate_images_async
+
+DEFAULT_URL = "http://127.0.0.1:8001/v1/genai/stabilityai/stable-diffusion-xl"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs async SDXL generation")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--pages", type=int, default=12, help="prompts per book (11 pages + map)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=10, help="max requests per second")
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    prompts = [f"Benchmark page {i}: a child explorer in a magical forest" for i in range(args.pages)]
+
+    if not args.skip_serial:
+        image_service.SDXL_INVOKE_URL = args.url
+        start = time.perf_counter()
+        for prompt in prompts:
+            image_service.generate_image(prompt)
+        serial_s = time.perf_counter() - start
+    else:
+        serial_s = None
+
+    start = time.perf_counter()
+    urls = asyncio.run(generate_images_async(
+        prompts,
+        invoke_url=args.url,
+        concurrency=args.concurrency,
+        rate_per_sec=args.rate,
+    ))
+    async_s = time.perf_counter() - start
+    failed = sum(url == image_service.PLACEHOLDER_IMAGE_URL for url in urls)
+
+    print("=" * 60)
+    print(f"Prompts: {args.pages} | concurrency: {args.concurrency} | rate: {args.rate}/s")
+    print("-" * 60)
+    if serial_s is not None:
+        print(f"Serial : {serial_s:7.2f}s")
+    print(f"Async  : {async_s:7.2f}s  ({failed} placeholders)")
+    if serial_s:
+        print(f"Speed-up: {serial_s / async_s:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
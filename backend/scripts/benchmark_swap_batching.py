@@ -0,0 +1,106 @@
+"""
+Benchmark: single inswapper calls vs the micro-batching SwapBatcher.
+
+Usage:
+    python scripts/benchmark_swap_batching.py path/to/child.jpg [--template space-adventures]
+        [--repeat 3] [--batch-size 8] [--max-wait-ms 15] [--threads 8]
+
+Faces are detected once up front so only swap inference + paste-back is timed.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+
+from app.services.image_service import _pick_largest_face, get_insightface_models
+from app.services.swap_batcher import SwapBatcher
+from app.services.template_service import get_template_by_id
+
+DEFAULTS_DIR = Path(__file__).parent.parent.parent / "frontend" / "public" / "defaults"
+
+
+def load_targets(app, template_id):
+    targets = []
+    for page in get_template_by_id(template_id)["pages"]:
+        img = cv2.imread(str(DEFAULTS_DIR / template_id / f"page-{page['page_number']}.png"))
+        if img is None:
+            continue
+        faces = app.get(img)
+        if faces:
+            targets.append((img, _pick_largest_face(faces)))
+    return targets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single vs batched inswapper throughput")
+    parser.add_argument("child_photo")
+    parser.add_argument("--template", default="space-adventures")
+    parser.add_argument("--repeat", type=int, default=3, help="times each page is swapped")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=15)
+    parser.add_argument("--threads", type=int, default=8, help="concurrent submitters (pages/orders)")
+    args = parser.parse_args()
+
+    app, swapper = get_insightface_models()
+    if not app or not swapper:
+        sys.exit("InsightFace models could not be loaded")
+
+    source_faces = app.get(cv2.imread(args.child_photo))
+    if not source_faces:
+        sys.exit("No face detected in child photo")
+    source_face = _pick_largest_face(source_faces)
+
+    targets = load_targets(app, args.template) * args.repeat
+    if not targets:
+        sys.exit(f"No template pages with faces found for {args.template}")
+
+    # Warm-up (first ONNX run allocates the arena)
+    swapper.get(targets[0][0], targets[0][1], source_face, paste_back=True)
+
+    # Single: one ONNX call per page, pages swapped concurrently like the page pool
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lambda t: swapper.get(t[0], t[1], source_face, paste_back=True), targets))
+    single_s = time.perf_counter() - start
+
+    # Batched: same submitters, inference grouped by the batcher
+    batcher = SwapBatcher(swapper, max_batch=args.batch_size, max_wait_ms=args.max_wait_ms)
+
+    def batched(target):
+        return batcher.swap(target[0], target[1], source_face)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(batched, targets))
+    batched_s = time.perf_counter() - start
+
+    # Inference only (no paste-back), to isolate the ONNX batching effect
+    start = time.perf_counter()
+    futures = [batcher.submit(img, face, source_face) for img, face in targets]
+    for future in futures:
+        future.result()
+    infer_only_s = time.perf_counter() - start
+
+    n = len(targets)
+    print("=" * 60)
+    print(f"Swaps: {n} | batch size: {args.batch_size} | max wait: {args.max_wait_ms}ms")
+    print(f"Model: {Path(swapper.model_file).name} | accepts batches > 1: {batcher.supports_batching}")
+    if not batcher.supports_batching:
+        print("  (fixed batch of 1: write inswapper_128.batch.onnx with scripts/quantize_models.py)")
+    print("-" * 60)
+    print(f"Single   : {single_s:7.2f}s  {n / single_s:6.2f} swaps/s")
+    print(f"Batched  : {batched_s:7.2f}s  {n / batched_s:6.2f} swaps/s  ({single_s / batched_s:.2f}x)")
+    print(f"Inference: {infer_only_s:7.2f}s  {n / infer_only_s:6.2f} swaps/s (batched, no paste-back)")
+    print(f"Batches run: {batcher.batches_run} (avg {batcher.items_run / max(batcher.batches_run, 1):.1f} items)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Microbenchmark: pdf_service._wrap_text vs the original trial-string wrapper.
+
+Wraps every BOOK_TEMPLATES page text (with a few hero names) at the text-panel
+width and a sweep of other widths, asserts the lines are identical, and prints
+timings for the original, the per-word layout (cold) and the memoized layout.
+
+Usage (from backend/):
+    python scripts/benchmark_wrap_text.py [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.pdfbase import pdfmetrics
+
+from app.services import pdf_service
+from app.services.template_service import BOOK_TEMPLATES
+
+HERO_NAMES = ["Alex", "Mia", "Arjun", "Olivia-Grace"]
+FONTS = [("Times-Roman", 13), ("Helvetica", 11)]
+
+
+def legacy_wrap_text(text, font_name, font_size, max_width):
+    """The original _wrap_text: re-measures the whole trial line for every word."""
+    words = text.split()
+    lines = []
+    current = ""
+    for word in words:
+        trial = f"{current} {word}".strip()
+        if pdfmetrics.stringWidth(trial, font_name, font_size) <= max_width:
+            current = trial
+        else:
+            if current:
+                lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def template_texts():
+    texts = []
+    for template in BOOK_TEMPLATES:
+        for page in template["pages"]:
+            for name in HERO_NAMES:
+                texts.append(page["text"].replace("[HERO]", name))
+    texts.append("End of story. ✨")
+    return texts
+
+
+def clear_layout_cache():
+    pdf_service._wrap_lines.cache_clear()
+    pdf_service._word_width.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text wrapping microbenchmark")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = template_texts()
+    panel_width = pdf_service.RIGHT_W - 72
+    widths = [panel_width] + list(range(40, 520, 23))
+
+    # Identical output across fonts and widths, plus widths exactly equal to a wrapped line
+    checked = 0
+    for font_name, font_size in FONTS:
+        for width in widths:
+            for text in texts:
+                expected = legacy_wrap_text(text, font_name, font_size, width)
+                assert pdf_service._wrap_text(text, font_name, font_size, width) == expected, (text, width)
+                checked += 1
+
+        for text in texts:
+            for line in legacy_wrap_text(text, font_name, font_size, panel_width):
+                exact = pdfmetrics.stringWidth(line, font_name, font_size)
+                assert pdf_service._wrap_text(text, font_name, font_size, exact) == \
+                    legacy_wrap_text(text, font_name, font_size, exact), (text, exact)
+                checked += 1
+    print(f"✅ Identical output for {checked} wraps ({len(texts)} texts)")
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in texts:
+                fn(text, "Times-Roman", 13, panel_width)
+        return (time.perf_counter() - start) / (args.repeat * len(texts)) * 1e6
+
+    legacy_us = timed(legacy_wrap_text)
+
+    def cold_wrap(*wrap_args):
+        clear_layout_cache()
+        return pdf_service._wrap_text(*wrap_args)
+
+    cold_us = timed(cold_wrap)
+    clear_layout_cache()
+    warm_us = timed(pdf_service._wrap_text)
+
+    print("=" * 60)
+    print(f"Texts: {len(texts)} | width: {panel_width:.1f} pt | repeat: {args.repeat}")
+    print("-" * 60)
+    print(f"Original (trial strings) : {legacy_us:8.1f} µs/text")
+    print(f"Per-word widths (cold)   : {cold_us:8.1f} µs/text  ({legacy_us / cold_us:.1f}x)")
+    print(f"Memoized layout          : {warm_us:8.1f} µs/text  ({legacy_us / warm_us:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Re-render book PDFs in a process pool, e.g. after a LAYOUT_VERSION bump.
+
+Usage (from backend/):
+    python scripts/bulk_render_pdfs.py [--since 2026-01-01] [--limit 500] [--workers 8] [--dpi 150] [--dry-run]
+    python scripts/bulk_render_pdfs.py --synthetic 40 --workers 8   # template books, no Mongo writes
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import PDF_IMAGE_DPI
+from app.services.bulk_pdf_service import find_orders_for_reprint, render_books
+from app.services.template_service import BOOK_TEMPLATES
+
+
+def synthetic_orders(count):
+    """Template books with distinct hero names (so every page is a fresh render)."""
+    orders = []
+    for i in range(count):
+        template = BOOK_TEMPLATES[i % len(BOOK_TEMPLATES)]
+        hero = f"Hero{i}"
+        orders.append({
+            "_id": f"synthetic-{i}",
+            "story": template,
+            "generated_pages": [
+                {
+                    "page_number": page["page_number"],
+                    "text": page["text"].replace("[HERO]", hero),
+                    "image_url": page.get("base_image_path"),
+                }
+                for page in template["pages"]
+            ],
+        })
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk re-render book PDFs")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="only orders with updated_at >= this (ISO date)")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--dpi", type=int, default=PDF_IMAGE_DPI)
+    parser.add_argument("--dry-run", action="store_true", help="render but leave order.pdf_url unchanged")
+    parser.add_argument("--synthetic", type=int, default=0, help="render N template books instead of orders")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        orders = synthetic_orders(args.synthetic)
+        update_orders = False
+    else:
+        orders = list(find_orders_for_reprint(args.since, args.limit))
+        update_orders = not args.dry_run
+
+    print(f"Rendering {len(orders)} books with {args.workers} workers at {args.dpi} dpi...")
+    stats = render_books(orders, workers=args.workers, image_dpi=args.dpi, update_orders=update_orders)
+
+    print("=" * 60)
+    print(f"Books: {stats['books']} | pages: {stats['pages']} | failed: {len(stats['failed'])}")
+    print(f"Time: {stats['seconds']}s | throughput: {stats['pages_per_sec']} pages/sec")
+    for order_id in stats["failed"]:
+        print(f"  ❌ {order_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compact personalized orders that still embed a full copy of their template.
+
+For each order with a template_id and an embedded `story`, the story is
+replaced by template_version + story_overrides (only the fields that differ
+from the registry template). An order is only rewritten if resolving it again
+gives back exactly the embedded story. The current template versions are
+snapshotted first, so compacted orders keep resolving after a template edit.
+
+Usage (from backend/):
+    python scripts/compact_orders.py [--dry-run] [--limit 1000] [--batch-size 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from pymongo import UpdateOne
+
+from app.services.db import db
+from app.services.template_service import (
+    get_template_by_id,
+    get_template_version,
+    register_template_versions,
+    resolve_order_story,
+    story_overrides_for,
+)
+
+
+def compacted_fields(order):
+    """Fields that replace the embedded story, or None if it cannot be compacted losslessly."""
+    template = get_template_by_id(order.get("template_id"))
+    story = order.get("story")
+    if not template or not story:
+        return None
+
+    version = get_template_version(order["template_id"])
+    overrides = story_overrides_for(template, story)
+    compacted = {"template_id": order["template_id"], "template_version": version, "story_overrides": overrides}
+    if resolve_order_story(compacted) != story:
+        return None
+
+    fields = {"template_version": version}
+    if overrides:
+        fields["story_overrides"] = overrides
+    return fields
+
+
+def read_latency_ms(order_ids, repeat=3):
+    """Median time of find_one over the given orders (the /book and worker read)."""
+    timings = []
+    for _ in range(repeat):
+        for order_id in order_ids:
+            start = time.perf_counter()
+            db.orders.find_one({"_id": order_id})
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2] if timings else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replace embedded template copies with template references")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        register_template_versions()
+
+    query = {"template_id": {"$ne": None}, "story": {"$type": "object"}}
+    sample_ids = [order["_id"] for order in db.orders.find(query, {"_id": 1}).limit(200)]
+    latency_before = read_latency_ms(sample_ids)
+
+    batch = []
+    compacted = skipped = 0
+    bytes_before = bytes_after = 0
+
+    for order in db.orders.find(query).limit(args.limit):
+        fields = compacted_fields(order)
+        if fields is None:
+            skipped += 1
+            print(f"⚠️  Skipped {order['_id']} (unknown template or not losslessly compactable)")
+            continue
+
+        after = {k: v for k, v in order.items() if k != "story"}
+        after.update(fields)
+        bytes_before += len(bson.encode(order))
+        bytes_after += len(bson.encode(after))
+        compacted += 1
+
+        batch.append(UpdateOne({"_id": order["_id"]}, {"$set": fields, "$unset": {"story": ""}}))
+        if len(batch) >= args.batch_size:
+            if not args.dry_run:
+                db.orders.bulk_write(batch, ordered=False)
+            batch = []
+
+    if batch and not args.dry_run:
+        db.orders.bulk_write(batch, ordered=False)
+
+    print("=" * 60)
+    print(f"{'Would compact' if args.dry_run else 'Compacted'}: {compacted} orders | skipped: {skipped}")
+    if compacted:
+        print(f"Avg document size: {bytes_before / compacted / 1024:.1f} KB → {bytes_after / compacted / 1024:.1f} KB")
+    if sample_ids and not args.dry_run:
+        print(f"find_one latency (median of {len(sample_ids)} orders): "
+              f"{latency_before:.2f} ms → {read_latency_ms(sample_ids):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,14 +37,13 @@ async def generate_preview_images():
                     relative_path = generate_image(prompt)
                     
                     if relative_path:
-                        # Find the actual generated file
-                        basename = os.path.basename(relative_path)
-                        backend_image_path = Path(__file__).parent.parent / "generated_images" / basename
+                        # Find the actual generated file (may live in the SDXL prompt cache)
+                        backend_image_path = Path(__file__).parent.parent / relative_path.lstrip("/")
                         
                         if backend_image_path.exists():
-                            # Move it to the frontend public /defaults folder
+                            # Copy it to the frontend public /defaults folder (keeps the cache entry)
                             import shutil
-                            shutil.move(str(backend_image_path), str(image_path))
+                            shutil.copyfile(str(backend_image_path), str(image_path))
                             print(f"✅ Saved to frontend: {image_path}")
                         else:
                             print(f"❌ Failed to locate generated file for {template_id} - Page {page_num}")
@@ -0,0 +1,130 @@
+"""
+Load test for GET /books against a local mongod.
+
+Seeds a separate database with synthetic orders (11 generated pages each and,
+with --embedded-story, the full template copy pre-compaction orders carried),
+creates the startup
+indexes, then times the paginated listing (first page and a deep page reached
+by following next_cursor) and, optionally, the old unbounded listing.
+
+Usage (from backend/):
+    python scripts/load_test_books.py [--uri mongodb://localhost:27017] [--orders 100000]
+        [--pages 50] [--limit 24] [--embedded-story] [--legacy] [--keep]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient
+
+from app.routes import book
+from app.services.db import ensure_indexes
+from app.services.template_service import BOOK_TEMPLATES
+
+LOAD_TEST_DB = "ai_kids_books_loadtest"
+
+
+def seed(database, count, embedded_story=False, batch_size=1000):
+    database.orders.drop()
+    start_time = datetime.utcnow() - timedelta(days=365)
+    batch = []
+    for i in range(count):
+        template = BOOK_TEMPLATES[i % len(BOOK_TEMPLATES)]
+        hero = f"Hero{i}"
+        batch.append({
+            "title": template["title"],
+            "template_id": template["id"],
+            **({"story": template} if embedded_story else {}),
+            "hero_name": hero,
+            "status": random.choice(["completed", "completed", "completed", "failed"]),
+            "generated_pages": [
+                {
+                    "page_number": page["page_number"],
+                    "text": page["text"].replace("[HERO]", hero),
+                    "image_url": f"/generated_images/swaps/{i:08d}-{page['page_number']}.png",
+                }
+                for page in template["pages"]
+            ],
+            # Some orders share a timestamp so the _id tie-breaker is exercised
+            "created_at": start_time + timedelta(seconds=(i // 3) * 60),
+        })
+        if len(batch) >= batch_size:
+            database.orders.insert_many(batch)
+            batch = []
+    if batch:
+        database.orders.insert_many(batch)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GET /books load test")
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=50, help="pages to walk with next_cursor")
+    parser.add_argument("--limit", type=int, default=book.BOOKS_PAGE_SIZE)
+    parser.add_argument("--embedded-story", action="store_true", help="seed orders with a full template copy")
+    parser.add_argument("--legacy", action="store_true", help="also time the old unbounded listing")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    database = client[LOAD_TEST_DB]
+    book.db = database  # the route reads the module-level db
+
+    print(f"Seeding {args.orders} orders into {LOAD_TEST_DB}...")
+    seed_ms, _ = timed(lambda: seed(database, args.orders, args.embedded_story))
+    ensure_indexes(database)
+    print(f"Seeded in {seed_ms / 1000:.1f}s")
+
+    first_page_ms = []
+    for _ in range(10):
+        ms, _ = timed(lambda: book.get_all_books(limit=args.limit, cursor=None))
+        first_page_ms.append(ms)
+
+    walk_ms = []
+    cursor = None
+    seen = 0
+    for _ in range(args.pages):
+        ms, page = timed(lambda: book.get_all_books(limit=args.limit, cursor=cursor))
+        walk_ms.append(ms)
+        seen += len(page["books"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    listing_filter = {"$and": [{"$or": [{"story": {"$ne": None}}, {"template_id": {"$ne": None}}]}]}
+    plan = database.orders.find(listing_filter, book.BOOK_LISTING_PROJECTION) \
+        .sort([("created_at", -1), ("_id", -1)]).limit(args.limit + 1).explain()
+    winning = plan["queryPlanner"]["winningPlan"]
+
+    print("=" * 60)
+    print(f"Orders: {args.orders} | page size: {args.limit}")
+    print("-" * 60)
+    print(f"First page        : median {statistics.median(first_page_ms):7.1f} ms")
+    print(f"Cursor walk       : median {statistics.median(walk_ms):7.1f} ms  "
+          f"p95 {sorted(walk_ms)[int(len(walk_ms) * 0.95) - 1]:7.1f} ms  ({len(walk_ms)} pages, {seen} books)")
+    print(f"Uses index        : {'IXSCAN' in str(winning)}  (no in-memory SORT: {'SORT' not in str(winning)})")
+
+    if args.legacy:
+        legacy_ms, orders = timed(lambda: list(database.orders.find({"template_id": {"$ne": None}}).sort("created_at", -1)))
+        print(f"Legacy full list  : {legacy_ms:7.1f} ms  ({len(orders)} full documents)")
+
+    if not args.keep:
+        client.drop_database(LOAD_TEST_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Local mock of the NVIDIA SDXL endpoint for tests and benchmarks.
+
+Returns a small PNG (colour derived from the request seed) after a random
+latency, and can inject 429 / 503 responses to exercise retries.
+
+Usage:
+    python scripts/mock_sdxl_server.py [--port 8001] [--min-delay 1] [--max-delay 3] [--error-rate 0.1]
+    SDXL_INVOKE_URL=http://127.0.0.1:8001/v1/genai/stabilityai/stable-diffusion-xl python ...
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+app = FastAPI()
+
+settings = {"min_delay": 1.0, "max_delay": 3.0, "error_rate": 0.0}
+stats = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def _png_for_seed(seed: int) -> str:
+    rng = random.Random(seed)
+    color = tuple(rng.randint(0, 255) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@app.post("/v1/genai/stabilityai/stable-diffusion-xl")
+async def generate(request: Request):
+    payload = await request.json()
+    stats["requests"] += 1
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        await asyncio.sleep(random.uniform(settings["min_delay"], settings["max_delay"]))
+
+        if random.random() < settings["error_rate"]:
+            stats["errors"] += 1
+            status = random.choice([429, 503])
+            return JSONResponse({"detail": "mock overload"}, status_code=status, headers={"Retry-After": "1"})
+
+        return {
+            "artifacts": [
+                {"base64": _png_for_seed(int(payload.get("seed", 0))), "finishReason": "SUCCESS"}
+            ]
+        }
+    finally:
+        stats["in_flight"] -= 1
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock NVIDIA SDXL server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--min-delay", type=float, default=1.0)
+    parser.add_argument("--max-delay", type=float, default=3.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    settings.update(min_delay=args.min_delay, max_delay=args.max_delay, error_rate=args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
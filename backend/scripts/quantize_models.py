@@ -0,0 +1,217 @@
+"""
+Write int8 / fp16 variants of the face models for FACE_MODEL_VARIANT, and
+dynamic-batch re-exports of inswapper_128 for the swap micro-batcher.
+
+- int8: dynamic quantization (weights stored as 8-bit, activations quantized
+  at run time), onnxruntime.quantization.quantize_dynamic.
+- fp16: weights and compute in float16 with float32 inputs/outputs, so
+  insightface's pre/post-processing is unchanged.
+
+- batch: the official inswapper_128 has a fixed batch dimension of 1, so the
+  swap batcher could never batch it. The re-export makes the batch dimension
+  symbolic (and Reshape targets that pin it to 1 copy it instead) and is only
+  kept if a batch of 2 gives the same output as two single runs of the source.
+
+inswapper_128 keeps its embedding map ("emap") as the graph's last, unused
+initializer and insightface reads it as graph.initializer[-1]. quantize_dynamic
+drops unused initializers, so the emap is copied back from the source model
+and checked; a variant where it does not round-trip is deleted.
+
+Outputs follow the names face_engine looks for:
+    inswapper_128.onnx        -> inswapper_128.int8.onnx (same folder)
+    inswapper_128[.int8].onnx -> inswapper_128[.int8].batch.onnx
+    ~/.insightface/models/buffalo_l/*.onnx -> ~/.insightface/models/buffalo_l_int8/*.onnx
+
+Usage (from backend/):
+    python scripts/quantize_models.py [--variants int8,fp16] [--models inswapper,buffalo_l] [--no-batch] [--force]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.face_engine import INSIGHTFACE_ROOT, batch_export_path, buffalo_name, inswapper_path
+
+
+def quantize_int8(src: Path, dst: Path, weight_type: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # ConvInteger on the CPU provider only takes uint8 weights, so QUInt8 is the default
+    quantize_dynamic(
+        str(src),
+        str(dst),
+        weight_type=QuantType.QUInt8 if weight_type == "uint8" else QuantType.QInt8,
+    )
+
+
+def convert_fp16(src: Path, dst: Path):
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(str(src)), keep_io_types=True)
+    onnx.save(model, str(dst))
+
+
+def make_dynamic_batch(src: Path, dst: Path):
+    import numpy as np
+    import onnx
+    from onnx import numpy_helper
+
+    model = onnx.load(str(src))
+    graph = model.graph
+    for value in list(graph.input) + list(graph.output):
+        dims = value.type.tensor_type.shape.dim
+        if dims:
+            dims[0].dim_param = "batch"
+    # Intermediate shapes were inferred for batch 1; onnxruntime re-infers them
+    del graph.value_info[:]
+
+    # Reshape targets like [1, C, 1, 1]: 0 copies the input's (batch) dimension
+    initializers = {init.name: init for init in graph.initializer}
+    for node in graph.node:
+        if node.op_type != "Reshape" or node.input[1] not in initializers:
+            continue
+        shape = numpy_helper.to_array(initializers[node.input[1]])
+        if shape.ndim == 1 and shape.size and shape[0] == 1:
+            shape = shape.copy()
+            shape[0] = 0
+            initializers[node.input[1]].CopyFrom(numpy_helper.from_array(shape.astype(np.int64), node.input[1]))
+    onnx.save(model, str(dst))
+
+
+def check_dynamic_batch(src: Path, dst: Path, batch: int = 2):
+    """Raises unless a batch through `dst` matches single runs through `src`."""
+    import numpy as np
+    import onnxruntime as ort
+
+    single = ort.InferenceSession(str(src), providers=["CPUExecutionProvider"])
+    batched = ort.InferenceSession(str(dst), providers=["CPUExecutionProvider"])
+    rng = np.random.default_rng(0)
+    items = [
+        {inp.name: rng.random([1] + list(inp.shape[1:]), dtype=np.float32) for inp in single.get_inputs()}
+        for _ in range(batch)
+    ]
+
+    expected = np.concatenate([single.run(None, item)[0] for item in items], axis=0)
+    got = batched.run(None, {name: np.concatenate([item[name] for item in items], axis=0) for name in items[0]})[0]
+    if got.shape != expected.shape or not np.allclose(got, expected, rtol=1e-3, atol=1e-3):
+        raise RuntimeError(f"{dst.name} does not batch like {src.name} (fixed batch-1 ops in the graph?)")
+
+
+def restore_emap(src: Path, dst: Path):
+    """Makes the source's last initializer (inswapper's emap) the last one of `dst` again, unchanged."""
+    import numpy as np
+    import onnx
+    from onnx import numpy_helper
+
+    emap = onnx.load(str(src)).graph.initializer[-1]
+    model = onnx.load(str(dst))
+    initializers = [init for init in model.graph.initializer if init.name != emap.name]
+    del model.graph.initializer[:]
+    model.graph.initializer.extend(initializers)
+    model.graph.initializer.append(emap)
+    onnx.save(model, str(dst))
+
+    restored = onnx.load(str(dst)).graph.initializer[-1]
+    if restored.name != emap.name or not np.array_equal(
+        numpy_helper.to_array(restored), numpy_helper.to_array(emap)
+    ):
+        raise RuntimeError(f"emap did not survive conversion of {src.name}")
+
+
+def write_variant(src: Path, dst: Path, variant: str, args) -> dict:
+    if dst.exists() and not args.force:
+        return {"model": dst.name, "variant": variant, "status": "exists"}
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    try:
+        if variant == "int8":
+            quantize_int8(src, dst, args.weight_type)
+        elif variant == "fp16":
+            convert_fp16(src, dst)
+        else:
+            make_dynamic_batch(src, dst)
+            check_dynamic_batch(src, dst)
+        if src.name.startswith("inswapper"):
+            restore_emap(src, dst)
+    except BaseException:
+        # A half-written or emap-less variant must not be picked up (or skipped as "exists")
+        dst.unlink(missing_ok=True)
+        raise
+    return {
+        "model": dst.name,
+        "variant": variant,
+        "status": "written",
+        "seconds": round(time.perf_counter() - start, 1),
+        "mb": (round(src.stat().st_size / 1e6, 1), round(dst.stat().st_size / 1e6, 1)),
+    }
+
+
+def model_jobs(models, variants, batch=True):
+    """
+    (source, destination, variant) for every requested model file, in an order
+    where a variant is written before its batch re-export ("batch" jobs).
+    """
+    jobs = []
+    for variant in variants:
+        if "inswapper" in models:
+            jobs.append((inswapper_path("fp32"), inswapper_path(variant), variant))
+        if "buffalo_l" in models:
+            src_dir = INSIGHTFACE_ROOT / "models" / buffalo_name("fp32")
+            dst_dir = INSIGHTFACE_ROOT / "models" / buffalo_name(variant)
+            for src in sorted(src_dir.glob("*.onnx")):
+                jobs.append((src, dst_dir / src.name, variant))
+    if batch and "inswapper" in models:
+        for variant in ["fp32"] + list(variants):
+            jobs.append((inswapper_path(variant), batch_export_path(inswapper_path(variant)), "batch"))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write quantized face model variants")
+    parser.add_argument("--variants", default="int8,fp16")
+    parser.add_argument("--models", default="inswapper,buffalo_l")
+    parser.add_argument("--weight-type", choices=["uint8", "int8"], default="uint8", help="int8 variant weight type")
+    parser.add_argument("--no-batch", dest="batch", action="store_false", help="skip the inswapper dynamic-batch re-exports")
+    parser.add_argument("--force", action="store_true", help="overwrite existing variants")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip() in ("int8", "fp16")]
+    models = {m.strip() for m in args.models.split(",")}
+
+    jobs = model_jobs(models, variants, args.batch)
+    produced = {dst for _, dst, _ in jobs}
+    missing = [str(src) for src, _, _ in jobs if not src.exists() and src not in produced]
+    if "buffalo_l" in models and not (INSIGHTFACE_ROOT / "models" / "buffalo_l").is_dir():
+        missing.append(str(INSIGHTFACE_ROOT / "models" / "buffalo_l"))
+    if missing:
+        sys.exit("Missing source models (start the app once to download buffalo_l):\n  " + "\n  ".join(missing))
+
+    failed = 0
+    for src, dst, variant in jobs:
+        try:
+            result = write_variant(src, dst, variant, args)
+        except Exception as e:
+            failed += 1
+            print(f"❌ {variant:4} {src.name}: {e}")
+            continue
+        if result["status"] == "exists":
+            print(f"⏭️  {variant:4} {dst} (exists, --force to overwrite)")
+        else:
+            before, after = result["mb"]
+            print(f"✅ {variant:4} {dst}  {before} MB → {after} MB in {result['seconds']}s")
+
+    print("=" * 60)
+    print(f"{len(jobs) - failed}/{len(jobs)} variants ready. Select one with FACE_MODEL_VARIANT=<int8|fp16>.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
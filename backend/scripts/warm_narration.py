@@ -0,0 +1,84 @@
+"""
+Pre-render narration for every BOOK_TEMPLATES page with common hero names,
+so template books are served from the narration store instead of edge-tts.
+
+Usage:
+    python scripts/warm_narration.py [--names Alex,Mia] [--languages English,Hindi] [--concurrency 4]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+
+# Add the parent directory to the path so we can import app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.audio_service import VOICES, generate_audio, narration_cache
+from app.services.template_service import BOOK_TEMPLATES
+
+COMMON_HERO_NAMES = [
+    "Alex", "Aarav", "Ava", "Emma", "Liam", "Mia", "Noah", "Olivia",
+    "Sophia", "Lucas", "Aria", "Vivaan", "Ananya", "Diya", "Arjun", "Zara",
+]
+
+
+def narration_texts(names):
+    texts = set()
+    for template in BOOK_TEMPLATES:
+        for page in template["pages"]:
+            text = page.get("text", "")
+            if not text:
+                continue
+            if re.search(r"\[HERO\]", text, flags=re.IGNORECASE):
+                for name in names:
+                    texts.add(re.sub(r"\[HERO\]", name, text, flags=re.IGNORECASE))
+            else:
+                texts.add(text)
+    return sorted(texts)
+
+
+async def warm(texts, languages, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    done = failed = 0
+
+    async def render(text, language):
+        nonlocal done, failed
+        async with semaphore:
+            try:
+                # Only fills the cache; orders get their own kept copy when they use it
+                await generate_audio(text, language, keep=False)
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"❌ {language}: {text[:40]}... — {e}")
+
+    await asyncio.gather(*(render(text, language) for text in texts for language in languages))
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the narration store for template books")
+    parser.add_argument("--names", default=",".join(COMMON_HERO_NAMES))
+    parser.add_argument("--languages", default="English")
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.names.split(",") if n.strip()]
+    languages = [l.strip() for l in args.languages.split(",") if l.strip() in VOICES]
+    texts = narration_texts(names)
+
+    print(f"Warming {len(texts)} texts × {len(languages)} languages ({len(names)} hero names)")
+    start = time.perf_counter()
+    done, failed = asyncio.run(warm(texts, languages, args.concurrency))
+    elapsed = time.perf_counter() - start
+
+    stats = narration_cache.stats()
+    print(f"✅ {done} narrations ready, {failed} failed in {elapsed:.1f}s")
+    print(f"Store: {stats['hits']} already cached, {stats['misses']} synthesized")
+
+
+if __name__ == "__main__":
+    main()
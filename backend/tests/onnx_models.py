@@ -0,0 +1,64 @@
+"""
+Tiny ONNX stand-ins with the input/output layout insightface routes on
+(model_zoo.ModelRouter): SCRFD detector, ArcFace recognizer and inswapper
+(whose emap is the last, unused initializer).
+"""
+
+import numpy as np
+import onnx
+from onnx import TensorProto, helper, numpy_helper
+
+
+def _with_shape(value):
+    # Outputs are "name" (shape left to inference) or ("name", shape)
+    return value if isinstance(value, tuple) else (value, None)
+
+
+def _save(path, nodes, inputs, outputs, initializers=()):
+    graph = helper.make_graph(
+        nodes,
+        path.stem,
+        [helper.make_tensor_value_info(name, TensorProto.FLOAT, shape) for name, shape in inputs],
+        [helper.make_tensor_value_info(name, TensorProto.FLOAT, shape) for name, shape in map(_with_shape, outputs)],
+        list(initializers),
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+
+
+def make_detector(path):
+    # 9 outputs: SCRFD with keypoints
+    outputs = [f"out{i}" for i in range(9)]
+    _save(path, [helper.make_node("Identity", ["input.1"], [name]) for name in outputs], [("input.1", [1, 3, 640, 640])], outputs)
+
+
+def make_recognizer(path):
+    weights = numpy_helper.from_array(np.ones((3, 512), dtype=np.float32), "fc")
+    _save(
+        path,
+        [
+            helper.make_node("ReduceMean", ["input.1"], ["pooled"], axes=[2, 3], keepdims=0),
+            helper.make_node("MatMul", ["pooled", "fc"], ["embedding"]),
+        ],
+        [("input.1", [1, 3, 112, 112])],
+        ["embedding"],
+        [weights],
+    )
+
+
+def make_swapper(path):
+    weights = numpy_helper.from_array(np.zeros((512, 3), dtype=np.float32), "style")
+    shape = numpy_helper.from_array(np.array([1, 3, 1, 1], dtype=np.int64), "style_shape")
+    emap = numpy_helper.from_array(np.eye(512, dtype=np.float32), "emap")  # unused, last
+    _save(
+        path,
+        [
+            helper.make_node("MatMul", ["source", "style"], ["style_out"]),
+            helper.make_node("Reshape", ["style_out", "style_shape"], ["style_4d"]),
+            helper.make_node("Add", ["target", "style_4d"], ["output"]),
+        ],
+        [("target", [1, 3, 128, 128]), ("source", [1, 512])],
+        [("output", [1, 3, 128, 128])],
+        [weights, shape, emap],
+    )
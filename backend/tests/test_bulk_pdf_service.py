@@ -0,0 +1,92 @@
+"""
+Bulk reprints must render a template order at the template_version it was
+made with, not at the current (edited) registry template.
+"""
+
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+pypdf = pytest.importorskip("pypdf")
+
+from app.services import bulk_pdf_service, pdf_service, template_service
+from app.services.content_store import ContentStore
+
+TEMPLATE_ID = "pirate-adventure"
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(bulk_pdf_service, "db", database)
+    monkeypatch.setattr(template_service, "db", database)
+    monkeypatch.setattr(template_service, "_snapshots", {})
+    return database
+
+
+@pytest.fixture
+def local_render(tmp_path, monkeypatch):
+    # Render in-process and keep fragments / books out of the repo's generated folders
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        pdf_service,
+        "page_fragment_cache",
+        ContentStore("pdf_pages", tmp_path / "pages", "/generated_pdfs/pages", max_bytes=64 * 1024 * 1024),
+    )
+    monkeypatch.setattr(
+        bulk_pdf_service,
+        "ProcessPoolExecutor",
+        lambda max_workers, mp_context=None: ThreadPoolExecutor(max_workers=max_workers),
+    )
+    return tmp_path
+
+
+def edit_template(monkeypatch):
+    edited = copy.deepcopy(template_service.get_template_by_id(TEMPLATE_ID))
+    edited["title"] = "Edited Title"
+    edited["pages"][1]["text"] = "Edited page text."
+    monkeypatch.setitem(template_service.TEMPLATE_REGISTRY, TEMPLATE_ID, edited)
+    monkeypatch.setitem(template_service.TEMPLATE_VERSIONS, TEMPLATE_ID, template_service._template_version(edited))
+
+
+def pdf_text(local_root, pdf_url):
+    reader = pypdf.PdfReader(str(local_root / pdf_url.lstrip("/")))
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
+def test_bulk_render_uses_the_order_template_version(mock_db, local_render, monkeypatch):
+    original = template_service.get_template_by_id(TEMPLATE_ID)
+    template_service.register_template_versions(mock_db)
+
+    # Compacted order on the current version; page 2 has no text of its own
+    order_id = mock_db.orders.insert_one({
+        "template_id": TEMPLATE_ID,
+        "template_version": template_service.get_template_version(TEMPLATE_ID),
+        "generated_pages": [{"page_number": 1, "text": "Cover"}, {"page_number": 2, "image_url": ""}],
+    }).inserted_id
+
+    edit_template(monkeypatch)
+
+    stats = bulk_pdf_service.render_books(bulk_pdf_service.find_orders_for_reprint(), workers=1)
+    assert stats["books"] == 1 and stats["failed"] == []
+
+    text = pdf_text(local_render, mock_db.orders.find_one({"_id": order_id})["pdf_url"])
+    assert original["title"].upper() in text
+    assert original["pages"][1]["text"].split()[0] in text
+    assert "EDITED TITLE" not in text
+    assert "Edited page text." not in text
+
+
+def test_bulk_render_skips_orders_with_an_unknown_version(mock_db, local_render):
+    mock_db.orders.insert_one({
+        "template_id": TEMPLATE_ID,
+        "template_version": "0123456789ab",
+        "generated_pages": [{"page_number": 1, "text": "Cover"}],
+    })
+
+    stats = bulk_pdf_service.render_books(bulk_pdf_service.find_orders_for_reprint(), workers=1)
+
+    assert stats["books"] == 0
+    assert len(stats["failed"]) == 1
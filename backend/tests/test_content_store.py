@@ -0,0 +1,94 @@
+"""
+Kept copies (URLs stored on orders) must count against a store's max_bytes
+and be collected once no order references them.
+"""
+
+import pytest
+
+from app.services import content_store, order_media
+from app.services.content_store import ContentStore
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def collect_immediately(monkeypatch):
+    monkeypatch.setattr(content_store, "KEPT_GRACE_SECONDS", 0)
+    monkeypatch.setattr(content_store, "KEPT_GC_INTERVAL_SECONDS", 0)
+
+
+def make_store(tmp_path, referenced):
+    return ContentStore(
+        "swaps",
+        tmp_path / "generated_images" / "swaps",
+        "/generated_images/swaps",
+        max_bytes=3 * MB,
+        referenced_urls=lambda prefix: set(referenced),
+    )
+
+
+def disk_bytes(tmp_path):
+    inodes = {}
+    for path in (tmp_path / "generated_images").rglob("*"):
+        if path.is_file():
+            stat = path.stat()
+            inodes[(stat.st_dev, stat.st_ino)] = stat.st_size
+    return sum(inodes.values())
+
+
+def test_kept_copies_are_linked_under_kept(tmp_path):
+    store = make_store(tmp_path, [])
+    url = store.put_bytes("a", ".png", b"x" * 10, keep=True)
+
+    assert url == "/generated_images/kept/swaps/a.png"
+    kept = tmp_path / "generated_images" / "kept" / "swaps" / "a.png"
+    assert kept.read_bytes() == b"x" * 10
+    assert kept.stat().st_ino == store.path_for("a", ".png").stat().st_ino
+
+
+def test_unreferenced_kept_copies_are_collected_to_stay_in_budget(tmp_path):
+    store = make_store(tmp_path, [])
+    for key in "abcdef":
+        store.put_bytes(key, ".png", b"x" * MB, keep=True)
+
+    assert disk_bytes(tmp_path) <= store.max_bytes
+    assert store.stats()["kept_collected"] > 0
+
+
+def test_referenced_kept_copies_survive_collection(tmp_path):
+    referenced = ["/generated_images/kept/swaps/a.png"]
+    store = make_store(tmp_path, referenced)
+    for key in "abcdef":
+        store.put_bytes(key, ".png", b"x" * MB, keep=True)
+
+    kept_dir = tmp_path / "generated_images" / "kept" / "swaps"
+    assert (kept_dir / "a.png").exists()
+    assert disk_bytes(tmp_path) <= store.max_bytes
+
+
+def test_evicting_a_kept_entry_is_not_counted_as_freeing_space(tmp_path):
+    # Everything referenced: nothing can be freed, and linked cache entries keep their hits
+    referenced = [f"/generated_images/kept/swaps/{key}.png" for key in "abcd"]
+    store = make_store(tmp_path, referenced)
+    for key in "abcd":
+        store.put_bytes(key, ".png", b"x" * MB, keep=True)
+
+    assert store.stats()["bytes"] == 4 * MB
+    assert all(store.lookup(key, ".png") for key in "abcd")
+
+
+def test_order_media_urls_lists_referenced_kept_urls(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(order_media, "db", database)
+    database.orders.insert_many([
+        {"generated_pages": [
+            {"image_url": "/generated_images/kept/swaps/a.png", "narration_url": "/generated_audio/kept/narration/n.mp3"},
+            {"image_url": "/defaults/pirate-adventure/page-2.png"},
+        ]},
+        {"map_image_url": "/generated_images/kept/sdxl_cache/m.png", "generated_pages": []},
+    ])
+
+    assert order_media.order_media_urls("/generated_images/kept/swaps") == {"/generated_images/kept/swaps/a.png"}
+    assert order_media.order_media_urls("/generated_images/kept/sdxl_cache") == {"/generated_images/kept/sdxl_cache/m.png"}
+    assert order_media.order_media_urls("/generated_audio/kept/narration") == {"/generated_audio/kept/narration/n.mp3"}
@@ -0,0 +1,56 @@
+"""
+face_engine must build every insightface session with its own onnxruntime
+SessionOptions (insightface's get_model / FaceAnalysis drop sess_options).
+The models here are tiny stand-ins with the input/output layout insightface
+routes on: SCRFD detector, ArcFace recognizer and inswapper (emap last).
+"""
+
+import pytest
+
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+pytest.importorskip("insightface")
+
+from app.services import face_engine
+from onnx_models import make_detector, make_recognizer, make_swapper
+
+
+@pytest.fixture
+def options():
+    return face_engine.session_options(intra_op_threads=3, inter_op_threads=2, graph_optimization="basic", cpu_mem_arena=False)
+
+
+def assert_session_uses(session, options):
+    applied = session.get_session_options()
+    assert applied.intra_op_num_threads == options.intra_op_num_threads == 3
+    assert applied.inter_op_num_threads == options.inter_op_num_threads == 2
+    assert applied.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert applied.enable_cpu_mem_arena is False
+
+
+def test_swapper_session_uses_configured_options(tmp_path, monkeypatch, options):
+    model_path = tmp_path / "inswapper_128.onnx"
+    make_swapper(model_path)
+    monkeypatch.setattr(face_engine, "INSWAPPER_PATH", str(model_path))
+
+    swapper = face_engine.create_swapper("fp32", sess_options=options, providers=["CPUExecutionProvider"])
+
+    assert type(swapper).__name__ == "INSwapper"
+    assert_session_uses(swapper.session, options)
+    assert swapper.emap.shape == (512, 512)
+
+
+def test_face_app_sessions_use_configured_options(tmp_path, monkeypatch, options):
+    pack = tmp_path / "models" / "buffalo_l"
+    pack.mkdir(parents=True)
+    make_detector(pack / "det_10g.onnx")
+    make_recognizer(pack / "w600k_r50.onnx")
+    monkeypatch.setattr(face_engine, "INSIGHTFACE_ROOT", tmp_path)
+
+    face_app = face_engine.create_face_app("fp32", sess_options=options, providers=["CPUExecutionProvider"], det_size=320)
+
+    assert set(face_app.models) == {"detection", "recognition"}
+    assert face_app.det_model is face_app.models["detection"]
+    # prepare(ctx_id=-1) re-creates the sessions via set_providers; the options must survive that too
+    for model in face_app.models.values():
+        assert_session_uses(model.session, options)
@@ -0,0 +1,122 @@
+"""
+/face-swap/stream holds its inference admission for the whole response and
+gives it back only once the pool work it submitted has finished: also when
+the client goes away before the first event or while a swap is running.
+"""
+
+import asyncio
+import io
+import threading
+
+import pytest
+from fastapi import UploadFile
+from starlette.requests import ClientDisconnect
+
+from app.services.inference_executor import InferenceExecutor
+
+
+@pytest.fixture
+def route(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the route creates its upload folders on import
+    from app.routes import face_swap
+
+    executor = InferenceExecutor(workers=1, max_pending=8)
+    monkeypatch.setattr(face_swap, "inference_executor", executor)
+    monkeypatch.setattr(face_swap, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(face_swap, "OUTPUT_DIR", str(tmp_path / "generated"))
+    monkeypatch.setattr(face_swap, "detect_source_face", lambda path: ("face", None))
+
+    template = tmp_path / "template.png"
+    template.write_bytes(b"png")
+
+    async def fetch_templates(urls):
+        for index in range(len(urls)):
+            yield index, str(template), None
+
+    monkeypatch.setattr(face_swap, "fetch_templates", fetch_templates)
+    yield face_swap, executor
+    executor.shutdown()
+
+
+async def start_stream(face_swap, pages):
+    upload = UploadFile(file=io.BytesIO(b"jpg"), filename="child.jpg")
+    urls = "[" + ",".join('"https://example.com/t.png"' for _ in range(pages)) + "]"
+    return await face_swap.face_swap_stream(baby_image=upload, template_urls=urls)
+
+
+def test_cancelled_run_keeps_its_slot_until_the_pool_task_ends():
+    executor = InferenceExecutor(workers=1, max_pending=4)
+    started, finish = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        finish.wait(5)
+
+    async def scenario():
+        with executor.admit(2) as admission:
+            task = asyncio.create_task(admission.run(work))
+            await asyncio.to_thread(started.wait, 5)
+            task.cancel()
+        assert executor.stats()["reserved"] == 2  # request over, its swap still running
+        finish.set()
+        await asyncio.to_thread(executor._pool.submit(lambda: None).result)
+
+    asyncio.run(scenario())
+    assert executor.stats()["reserved"] == 0
+    executor.shutdown()
+
+
+def test_disconnect_before_the_first_event_releases_the_admission(route):
+    face_swap, executor = route
+
+    async def scenario():
+        response = await start_stream(face_swap, pages=3)
+        assert executor.stats()["reserved"] == 4
+
+        async def send(message):
+            raise OSError("client went away")
+
+        async def receive():
+            return {"type": "http.request"}
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(ClientDisconnect):
+            await response(scope, receive, send)
+        # released by the response itself, not when the unstarted generator is collected
+        assert executor.stats()["reserved"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_mid_swap_releases_after_the_swap_finishes(route, monkeypatch):
+    face_swap, executor = route
+    swapping, finish = threading.Event(), threading.Event()
+
+    def swap_target(source_face, template_path, output_path, page):
+        swapping.set()
+        finish.wait(5)
+        return {"page": page, "success": True}
+
+    monkeypatch.setattr(face_swap, "swap_target", swap_target)
+
+    async def scenario():
+        response = await start_stream(face_swap, pages=1)
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            await asyncio.to_thread(swapping.wait, 5)
+            return {"type": "http.disconnect"}
+
+        await response({"type": "http"}, receive, send)
+        assert b"event: job" in sent[1]["body"]
+        assert not any(b"event: page" in m.get("body", b"") for m in sent)
+        assert executor.stats()["reserved"] == 2  # the swap thread is still busy
+
+        finish.set()
+        await asyncio.to_thread(executor._pool.submit(lambda: None).result)
+
+    asyncio.run(scenario())
+    assert executor.stats()["reserved"] == 0
@@ -0,0 +1,58 @@
+"""
+Narration rate / pitch must be edge-tts prosody offsets ("+10%", "-5Hz");
+anything else is rejected with a 4xx before synthesis or streaming starts.
+"""
+
+import pytest
+
+pytest.importorskip("edge_tts")
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.routes import narration
+
+ORDER_PATH = "/narration/64b7f0c2a1b2c3d4e5f60718/1"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    looked_up = []
+
+    def page_narration(order_id, page_number, rate, pitch):
+        looked_up.append((rate, pitch))
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    monkeypatch.setattr(narration, "_page_narration", page_narration)
+    app = FastAPI()
+    app.include_router(narration.router)
+    client = TestClient(app)
+    client.looked_up = looked_up
+    return client
+
+
+@pytest.mark.parametrize("endpoint", ["stream", "marks"])
+@pytest.mark.parametrize("params", [
+    {"rate": "fast"},
+    {"rate": "+10"},
+    {"rate": "+1000%"},
+    {"rate": "+10%<prosody>"},
+    {"pitch": "+5%"},
+    {"pitch": "5Hz"},
+    {"pitch": "+5Hz\n"},
+])
+def test_bad_rate_or_pitch_is_rejected_before_synthesis(client, endpoint, params):
+    response = client.get(f"{ORDER_PATH}/{endpoint}", params=params)
+
+    assert response.status_code == 422
+    assert client.looked_up == []
+
+
+@pytest.mark.parametrize("endpoint", ["stream", "marks"])
+def test_prosody_offsets_reach_the_handler(client, endpoint):
+    response = client.get(f"{ORDER_PATH}/{endpoint}", params={"rate": "-25%", "pitch": "+10Hz"})
+    assert response.status_code == 404
+    assert client.looked_up == [("-25%", "+10Hz")]
+
+    client.get(f"{ORDER_PATH}/{endpoint}")
+    assert client.looked_up[-1] == (narration.DEFAULT_RATE, narration.DEFAULT_PITCH)
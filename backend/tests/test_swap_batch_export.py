@@ -0,0 +1,93 @@
+"""
+The official inswapper_128 export has a fixed batch of 1, so the swap batcher
+only runs on the dynamic-batch re-export written by scripts/quantize_models.py.
+"""
+
+import importlib.util
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("insightface")
+
+from onnx import TensorProto, helper
+
+from app.services import face_engine
+from app.services.swap_batcher import SwapBatcher, model_supports_batching
+from onnx_models import _save, make_swapper
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "quantize_models.py"
+
+
+@pytest.fixture(scope="module")
+def quantize_models():
+    spec = importlib.util.spec_from_file_location("quantize_models", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_batch_export(quantize_models, src):
+    dst = face_engine.batch_export_path(src)
+    args = types.SimpleNamespace(force=True, weight_type="uint8")
+    return dst, quantize_models.write_variant(src, dst, "batch", args)
+
+
+def test_batch_export_is_loaded_and_batched(tmp_path, monkeypatch, quantize_models):
+    src = tmp_path / "inswapper_128.onnx"
+    make_swapper(src)
+    dst, result = write_batch_export(quantize_models, src)
+    assert result["status"] == "written"
+    assert dst.name == "inswapper_128.batch.onnx"
+
+    monkeypatch.setattr(face_engine, "INSWAPPER_PATH", str(src))
+    monkeypatch.setattr(face_engine, "SWAP_BATCH_SIZE", 8)
+    swapper = face_engine.create_swapper("fp32", providers=["CPUExecutionProvider"])
+
+    assert swapper.model_file == str(dst)
+    assert model_supports_batching(swapper)
+    assert swapper.emap.shape == (512, 512)  # emap is still the last initializer
+
+    batcher = SwapBatcher(swapper)
+    blobs = [np.full((1, 3, 128, 128), i, dtype=np.float32) for i in range(3)]
+    latents = [np.ones((1, 512), dtype=np.float32) for _ in range(3)]
+    pred = batcher._infer(blobs, latents)
+    assert pred.shape == (3, 3, 128, 128)
+    assert batcher.supports_batching  # one batched run, no per-item fallback
+
+
+def test_fixed_batch_model_is_used_without_batching(tmp_path, monkeypatch):
+    src = tmp_path / "inswapper_128.onnx"
+    make_swapper(src)
+    monkeypatch.setattr(face_engine, "INSWAPPER_PATH", str(src))
+    monkeypatch.setattr(face_engine, "SWAP_BATCH_SIZE", 8)
+
+    swapper = face_engine.create_swapper("fp32", providers=["CPUExecutionProvider"])
+
+    assert swapper.model_file == str(src)
+    assert not model_supports_batching(swapper)
+
+
+def test_unbatchable_graph_is_refused(tmp_path, quantize_models):
+    # Flattens to a computed [1, -1] shape: a batch of 2 would be merged into one row
+    src = tmp_path / "inswapper_128.onnx"
+    _save(
+        src,
+        [
+            helper.make_node("Constant", [], ["flat"], value=helper.make_tensor("flat", TensorProto.INT64, [2], [1, -1])),
+            helper.make_node("Reshape", ["target", "flat"], ["flat_target"]),
+            helper.make_node("MatMul", ["flat_target", "proj"], ["projected"]),
+            helper.make_node("Add", ["projected", "source"], ["output"]),
+        ],
+        [("target", [1, 3, 128, 128]), ("source", [1, 512])],
+        [("output", [1, 512])],
+        [onnx.numpy_helper.from_array(np.ones((3 * 128 * 128, 512), dtype=np.float32), "proj")],
+    )
+
+    with pytest.raises(Exception):
+        write_batch_export(quantize_models, src)
+    assert not face_engine.batch_export_path(src).exists()
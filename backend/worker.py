@@ -0,0 +1,162 @@
+"""
+worker.py
+Book generation worker.
+
+Claims jobs from the MongoDB job queue (db.jobs) and runs them with a fixed
+number of concurrent slots. Models are loaded once at startup. While a job
+runs, its lease is renewed by heartbeats; if this process dies, the lease
+expires and another worker re-claims the job.
+
+Usage:
+    python worker.py
+    python worker.py --concurrency 4 --kinds personalized_book
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.config import JOB_LEASE_SECONDS, WORKER_CONCURRENCY, WORKER_POLL_SECONDS
+from app.services import job_queue
+from app.services.db import db
+from app.services import face_engine
+from app.services.order_service import generate_book_pipeline
+from app.services.personalized_service import generate_full_personalized_book
+
+JOB_HANDLERS = {
+    "personalized_book": lambda payload: generate_full_personalized_book(payload["order_id"]),
+    "book": lambda payload: generate_book_pipeline(payload["order_id"]),
+}
+
+REAP_INTERVAL_SECONDS = 30
+
+
+def _mark_order_failed(payload: dict, error: str):
+    order_id = (payload or {}).get("order_id")
+    if not order_id:
+        return
+    db.orders.update_one(
+        {"_id": ObjectId(order_id)},
+        {"$set": {"status": "failed", "error": error, "updated_at": datetime.utcnow()}}
+    )
+
+
+def _heartbeat_loop(job_id, worker_id: str, done: threading.Event):
+    interval = max(JOB_LEASE_SECONDS / 3, 1)
+    while not done.wait(interval):
+        try:
+            if not job_queue.heartbeat(job_id, worker_id):
+                print(f"[Worker] ⚠ Lost lease on job {job_id}")
+                return
+        except Exception as e:
+            print(f"[Worker] Heartbeat error for job {job_id}: {e}")
+
+
+def run_job(job: dict, worker_id: str):
+    job_id = job["_id"]
+    kind = job["kind"]
+    payload = job.get("payload", {})
+    print(f"[Worker] ▶ {kind} job {job_id} (attempt {job['attempts']}/{job['max_attempts']})")
+
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(job_id, worker_id, done), daemon=True)
+    heartbeat.start()
+
+    start = time.perf_counter()
+    try:
+        handler = JOB_HANDLERS[kind]
+        result = handler(payload)
+        if result is None:
+            # Nothing was produced (e.g. order missing or of another type): retrying cannot help
+            error = "Job produced no result"
+            job_queue.fail_job(job_id, worker_id, error=error, retry=False)
+            print(f"[Worker] ❌ {kind} job {job_id} failed: {error}")
+            _mark_order_failed(payload, error)
+            return
+        job_queue.complete_job(job_id, worker_id, result=result)
+        print(f"[Worker] ✅ {kind} job {job_id} done in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        traceback.print_exc()
+        status = job_queue.fail_job(job_id, worker_id, error=str(e))
+        print(f"[Worker] ❌ {kind} job {job_id} failed ({status}): {e}")
+        if status == "failed":
+            _mark_order_failed(payload, str(e))
+    finally:
+        done.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the book generation worker")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs run at once")
+    parser.add_argument("--kinds", default=",".join(JOB_HANDLERS), help="comma-separated job kinds")
+    args = parser.parse_args()
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip() in JOB_HANDLERS]
+    concurrency = max(args.concurrency, 1)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    print("=" * 60)
+    print(f"Book Worker {worker_id}")
+    print(f"Kinds: {', '.join(kinds)} | Concurrency: {concurrency}")
+    print("=" * 60)
+
+    job_queue.ensure_job_indexes()
+
+    # Preload models once so the first job does not pay the startup cost
+    if "personalized_book" in kinds:
+        try:
+            print(f"[Worker] Face engine warm: {face_engine.warm_up()}")
+        except Exception as e:
+            print(f"[Worker] Face engine warm-up failed: {e}")
+
+    stop = threading.Event()
+
+    def _request_stop(signum, frame):
+        print("[Worker] Stopping after running jobs finish...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    slots = threading.BoundedSemaphore(concurrency)
+    last_reap = 0.0
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        while not stop.is_set():
+            if time.monotonic() - last_reap > REAP_INTERVAL_SECONDS:
+                last_reap = time.monotonic()
+                for expired in job_queue.reap_expired_jobs():
+                    print(f"[Worker] Job {expired['_id']} exhausted its attempts")
+                    _mark_order_failed(expired.get("payload"), "Generation worker stopped responding")
+
+            if not slots.acquire(timeout=WORKER_POLL_SECONDS):
+                continue
+
+            try:
+                job = job_queue.claim_job(worker_id, kinds)
+            except Exception as e:
+                print(f"[Worker] Claim error: {e}")
+                job = None
+
+            if not job:
+                slots.release()
+                stop.wait(WORKER_POLL_SECONDS)
+                continue
+
+            future = pool.submit(run_job, job, worker_id)
+            future.add_done_callback(lambda _: slots.release())
+
+    print("[Worker] Stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,13 @@ export default function GeneratePage() {
   useEffect(() => {
     if (!orderId) return;
 
+    let pollTimer: ReturnType<typeof setInterval> | undefined;
+
     const generateBook = async () => {
       try {
         setMessage("📖 Writing your magical story...");
 
+        // The API only queues the job; a worker generates the book
         const res = await fetch(`${API_BASE}/generate-book/${orderId}`, {
           method: "POST",
         });
@@ -24,16 +27,31 @@ export default function GeneratePage() {
           throw new Error("Generation failed");
         }
 
-        const data = await res.json();
+        pollTimer = setInterval(async () => {
+          try {
+            const statusRes = await fetch(`${API_BASE}/book/${orderId}`);
+            const data = await statusRes.json();
 
-        if (data.pdf_url) {
-          setMessage("🎉 Almost done... opening your book!");
-          setTimeout(() => {
-            router.push(`/book/${orderId}`);
-          }, 1000);
-        } else {
-          throw new Error("Invalid response");
-        }
+            if (data.status === "story_generated") {
+              setMessage("🎨 Painting the pictures...");
+            } else if (data.status === "images_generated") {
+              setMessage("📚 Binding your book...");
+            }
+
+            if (data.status === "completed" && data.pdf_url) {
+              clearInterval(pollTimer);
+              setMessage("🎉 Almost done... opening your book!");
+              setTimeout(() => {
+                router.push(`/book/${orderId}`);
+              }, 1000);
+            } else if (data.status === "failed") {
+              clearInterval(pollTimer);
+              setMessage("❌ Something went wrong. Please try again.");
+            }
+          } catch (err) {
+            console.error("Polling failed:", err);
+          }
+        }, 3000);
       } catch (error) {
         console.error(error);
         setMessage("❌ Something went wrong. Please try again.");
@@ -41,6 +59,10 @@ export default function GeneratePage() {
     };
 
     generateBook();
+
+    return () => {
+      if (pollTimer) clearInterval(pollTimer);
+    };
   }, [orderId]);
 
   return (
@@ -8,20 +8,32 @@ import FlashScreen from "../components/FlashScreen";
 
 export default function LibraryPage() {
   const [books, setBooks] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [search, setSearch] = useState("");
   const router = useRouter();
   const [showFlash, setShowFlash] = useState(true);
 
   useEffect(() => { fetchBooks(); }, []);
 
-  const fetchBooks = async () => {
+  const fetchBooks = async (cursor?: string) => {
     try {
-      const res = await fetch(`${API_BASE}/books`);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const res = await fetch(`${API_BASE}/books${query}`);
       const data = await res.json();
-      setBooks(data || []);
+      const page = data?.books || [];
+      setBooks(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data?.next_cursor || null);
     } catch { console.error("Failed to fetch books"); }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    await fetchBooks(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleRemoveBook = async (e: any, id: string) => {
     e.stopPropagation();
     if (!confirm("Delete this story? 😢")) return;
@@ -78,7 +90,7 @@ export default function LibraryPage() {
             </h1>
           </div>
           <p className="text-purple-300 text-sm sm:text-base font-medium mb-6">
-            {books.length} magical {books.length === 1 ? "story" : "stories"} in your collection ✨
+            {books.length}{nextCursor ? "+" : ""} magical {books.length === 1 ? "story" : "stories"} in your collection ✨
           </p>
 
           {/* Search bar */}
@@ -156,6 +168,25 @@ export default function LibraryPage() {
             </motion.div>
           </div>
         )}
+
+        {/* Load more (keyset-paginated /books) */}
+        {nextCursor && (
+          <div className="text-center mt-10">
+            <motion.button
+              whileHover={{ scale: 1.05 }}
+              whileTap={{ scale: 0.95 }}
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="px-8 py-3 rounded-full font-black text-white text-base sm:text-lg disabled:opacity-50"
+              style={{
+                background: "rgba(255,255,255,0.08)",
+                border: "1.5px solid rgba(255,255,255,0.15)",
+                fontFamily: "var(--font-caveat), cursive",
+              }}>
+              {loadingMore ? "Loading... ✨" : "📚 Load more stories"}
+            </motion.button>
+          </div>
+        )}
       </div>
     </div>
   );
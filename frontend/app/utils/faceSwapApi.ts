@@ -45,3 +45,95 @@ export async function swapFaces(babyImage: File, templateUrls: string[]): Promis
         return { success: false, error: error.message || "An error occurred during face swap" };
     }
 }
+
+export interface StreamedSwapPage {
+    page: number;
+    success: boolean;
+    image_url?: string;
+    error?: string;
+    seconds: number;
+    elapsed: number;
+}
+
+export interface FaceSwapStreamSummary {
+    success: boolean;
+    job_id?: string;
+    swapped?: number;
+    failed?: number;
+    seconds?: number;
+    error?: string;
+}
+
+/**
+ * Streaming variant of swapFaces: calls /face-swap/stream (Server-Sent Events)
+ * and invokes onPage for each swapped page as soon as the backend writes it.
+ * Pages arrive in completion order, not page order.
+ *
+ * @param babyImage File object representing the baby's photo
+ * @param templateUrls Array of template image URLs to swap faces on
+ * @param onPage Called with each page result; image_url is relative to the API URL
+ * @returns Summary once every page has been processed
+ */
+export async function swapFacesStream(
+    babyImage: File,
+    templateUrls: string[],
+    onPage: (page: StreamedSwapPage) => void
+): Promise<FaceSwapStreamSummary> {
+    try {
+        const formData = new FormData();
+        formData.append("baby_image", babyImage);
+        formData.append("template_urls", JSON.stringify(templateUrls));
+
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+
+        // EventSource cannot POST, so the event stream is read from fetch directly
+        const response = await fetch(`${apiUrl}/face-swap/stream`, {
+            method: "POST",
+            body: formData,
+        });
+
+        if (!response.ok || !response.body) {
+            const retryAfter = response.headers.get("Retry-After");
+            const errorText = await response.text();
+            return {
+                success: false,
+                error: retryAfter ? `Server busy, retry in ${retryAfter}s` : `Upload failed: ${errorText}`,
+            };
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let summary: FaceSwapStreamSummary = { success: false, error: "Stream ended unexpectedly" };
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+                const message = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = "message";
+                let data = "";
+                for (const line of message.split("\n")) {
+                    if (line.startsWith("event: ")) event = line.slice(7);
+                    else if (line.startsWith("data: ")) data += line.slice(6);
+                }
+                if (!data) continue;
+
+                const payload = JSON.parse(data);
+                if (event === "page") onPage(payload);
+                else if (event === "done") summary = payload;
+                else if (event === "error") summary = { success: false, ...payload };
+            }
+        }
+
+        return summary;
+    } catch (error: any) {
+        console.error("Face swap stream error:", error);
+        return { success: false, error: error.message || "An error occurred during face swap" };
+    }
+}